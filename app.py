@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 import threading
 import time
 from datetime import datetime
@@ -25,6 +25,8 @@ crawler_status = {
     "results_file": "",
     "all_results": [],
     "results_file_id": None,
+    "stop_reason": None,
+    "url_reports": [],
     "last_update": time.time()
 }
 
@@ -38,6 +40,8 @@ def run_crawler(config_data):
     try:
         crawler_status["running"] = True
         crawler_status["error"] = None
+        crawler_status["stop_reason"] = None
+        crawler_status["url_reports"] = []
         crawler_status["progress"] = "Đang khởi động crawler..."
         crawler_status["last_update"] = time.time()
 
@@ -50,6 +54,10 @@ def run_crawler(config_data):
         crawler_status["progress"] = "Hoàn thành!"
         crawler_status["total_items"] = result.get("total_items", 0)
         crawler_status["current_url"] = result.get("url", "")
+        crawler_status["url_reports"] = result.get("url_reports", [])
+        # Mọi engine (tuần tự, song song, playwright, scrapy) đều trả url_reports; status_callback thì không
+        reasons = [r.get("stop_reason") for r in crawler_status["url_reports"] if r.get("stop_reason")]
+        crawler_status["stop_reason"] = ", ".join(dict.fromkeys(reasons)) or None
         crawler_status["last_update"] = time.time()
 
         file_id = str(uuid.uuid4())
@@ -99,7 +107,13 @@ def get_status():
         time.sleep(interval)
         waited += interval
 
-    return jsonify(crawler_status)
+    from scraper import chrome_fleet, egress_pool, session_pool
+    return jsonify({
+        **crawler_status,
+        "session_pools": session_pool.pools_stats(),
+        "chrome_fleet": chrome_fleet.fleet_stats(),
+        "egress": egress_pool.pool_stats(),
+    })
 
 
 @app.route('/api/stop', methods=['POST'])
@@ -110,19 +124,106 @@ def stop_crawler():
     return jsonify({"status": "stopped"})
 
 
-@app.route('/download')
-def download_file():
-    file_id = request.args.get("id")
-
-    if not file_id or file_id not in file_map:
-        return jsonify({"error": "File not found"}), 404
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrics của crawler theo định dạng Prometheus text."""
+    from scraper import metrics
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/api/results')
+def api_results():
+    """
+    Truy vấn kho kết quả SQLite với keyset pagination.
+    Query string: province_id, district_id, ward_id, real_estate_type_id, demand_id, sale_type, code,
+    price_min, price_max, area_min, area_max, posted_from, posted_to (YYYY-MM-DD),
+    sort (posted_date|price|area), order (asc|desc), limit, cursor (next_cursor của trang trước).
+    """
+    from scraper import results_db
+
+    args = request.args
+    filter_keys = results_db.EQ_FILTERS + (
+        "code", "price_min", "price_max", "area_min", "area_max", "posted_from", "posted_to",
+    )
+    filters = {key: args.get(key) for key in filter_keys if args.get(key)}
+    try:
+        page = results_db.query(
+            filters,
+            sort=args.get("sort", "posted_date"),
+            order=args.get("order", "desc"),
+            limit=int(args.get("limit", 50)),
+            cursor=args.get("cursor") or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    filepath = file_map[file_id]
+    return jsonify({**page, "count": len(page["data"])})
 
-    if not os.path.exists(filepath):
-        return jsonify({"error": "File missing on disk"}), 404
 
-    return send_file(filepath, as_attachment=True)
+@app.route('/download')
+def download_file():
+    """
+    Tải kết quả dạng stream.
+    Nguồn: id (file của lần chạy) hoặc from / to (YYYY-MM-DD, gộp các file theo ngày; filtered=1 gồm cả output_filtered).
+    format: json (mặc định) | ndjson | csv | parquet. Nén gzip / zstd theo Accept-Encoding; hỗ trợ ETag và Range.
+    """
+    from scraper import download, parquet_export
+
+    args = request.args
+    fmt = args.get("format", "json").lower()
+    if fmt not in download.FORMATS:
+        return jsonify({"error": f"format phải là một trong {', '.join(download.FORMATS)}"}), 400
+    if fmt == "parquet" and not parquet_export.available():
+        return jsonify({"error": "Cần cài pyarrow để tải định dạng parquet"}), 501
+
+    file_id = args.get("id")
+    if file_id:
+        if file_id not in file_map:
+            return jsonify({"error": "File not found"}), 404
+        filepath = file_map[file_id]
+        if not os.path.exists(filepath):
+            return jsonify({"error": "File missing on disk"}), 404
+        files = [pathlib.Path(filepath)]
+        name = pathlib.Path(filepath).stem
+    elif args.get("from"):
+        try:
+            files = download.files_for_range(args["from"], args.get("to"), args.get("filtered") in ("1", "true"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not files:
+            return jsonify({"error": "Không có file kết quả trong khoảng ngày này"}), 404
+        name = f"results_{args['from']}_{args.get('to') or args['from']}"
+    else:
+        return jsonify({"error": "Cần id hoặc from"}), 400
+
+    mimetype, ext = download.FORMATS[fmt]
+    # Parquet đã nén theo cột bên trong, nén thêm không được gì
+    encoding = "identity" if fmt == "parquet" else download.negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    etag = download.etag_for(files, fmt, encoding)
+    filename = f"{name}.{ext}"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+    elif request.range:
+        # Range cần biết trước độ dài: ghi output ra cache theo ETag rồi để send_file xử lý Range / If-Range
+        path = download.spool(download.compress(download.stream(files, fmt), encoding), etag)
+        download.prune_spool()
+        response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename,
+                             etag=etag, conditional=True)
+    else:
+        response = Response(
+            stream_with_context(download.compress(download.stream(files, fmt), encoding)),
+            mimetype=mimetype,
+        )
+        response.set_etag(etag)
+        response.headers.set("Content-Disposition", "attachment", filename=filename)
+
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=5000)
@@ -0,0 +1,223 @@
+"""Benchmark end-to-end: chạy `run_scraper` trên site giả lập (benchmarks/fixture_site.py).
+
+Cần Chrome mở sẵn với --remote-debugging-port (giống khi chạy thật, truyền --debugger-address), hoặc
+truyền --chrome <binary> để script tự mở Chrome headless với profile tạm. Delay lịch sự được giảm bằng
+config.SLEEP_SCALE, output/mapping được chuyển sang thư mục tạm nên không đụng tới dữ liệu thật.
+
+    python benchmarks/bench_crawl.py --chrome google-chrome --listings 100 --pages 3 --items-per-page 20
+    python benchmarks/bench_crawl.py --debugger-address 127.0.0.1:9222 --latency 0.05 --captcha-rate 0.05
+    python benchmarks/bench_crawl.py --engine playwright --contexts 8 --latency 0.05 --output bench.jsonl
+    python benchmarks/bench_crawl.py --engine scrapy --latency 0.05 --output bench.jsonl
+
+Báo cáo: items/giây, số round trip WebDriver mỗi item (đếm qua WebDriver.execute, chỉ với engine selenium),
+thời gian save_results, peak RSS. Engine playwright tự launch Chromium, engine scrapy không dùng browser, nên cả
+hai không cần --chrome / debugger; chạy cùng tham số với các engine (ghi chung --output) để so sánh throughput.
+"""
+import argparse
+import json
+import pathlib
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.fixture_site import FixtureSite, write_mapping_fixture
+from scraper import config
+
+
+@contextmanager
+def count_round_trips():
+    """Đếm mọi command WebDriver (mỗi lệnh là một HTTP round trip tới chromedriver)."""
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    counter: Counter = Counter()
+    original = WebDriver.execute
+
+    def execute(self, driver_command, params=None):
+        counter[driver_command] += 1
+        return original(self, driver_command, params)
+
+    WebDriver.execute = execute
+    try:
+        yield counter
+    finally:
+        WebDriver.execute = original
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def launch_chrome(binary: str, headless: bool = True):
+    """Mở Chrome với remote debugging trên port trống, yield debugger address."""
+    port = _free_port()
+    user_data_dir = tempfile.mkdtemp(prefix="bench-chrome-")
+    cmd = [
+        binary,
+        f"--remote-debugging-port={port}",
+        f"--user-data-dir={user_data_dir}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-extensions",
+        "about:blank",
+    ]
+    if headless:
+        cmd.insert(1, "--headless=new")
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 20
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError(f"Chrome không mở được remote debugging trên port {port}")
+                time.sleep(0.2)
+        yield f"127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+def configure_sandbox(workdir: pathlib.Path, sleep_scale: float):
+    """Chuyển output / mapping / screenshot sang thư mục tạm và giảm delay."""
+    config.OUTPUT_DIR = workdir / "output"
+    config.OUTPUT_DIR_FILTER = config.OUTPUT_DIR / "output_filtered"
+    # Các đường dẫn tính sẵn từ OUTPUT_DIR lúc import config
+    config.RESULTS_DB_PATH = config.OUTPUT_DIR / "results.sqlite3"
+    config.SEEN_DIR = config.OUTPUT_DIR / "seen"
+    config.PARQUET_DIR = config.OUTPUT_DIR / "parquet"
+    config.SCREENSHOT_DIR = str(workdir / "screenshots")
+    config.MAPPING_DIR = write_mapping_fixture(workdir / "mapping")
+    config.SLEEP_SCALE = sleep_scale
+    config.ensure_directories()
+
+
+def run_benchmark(args, debugger_address: str) -> dict:
+    from scraper.runner import run_scraper
+
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="bench-crawl-"))
+    configure_sandbox(workdir, args.sleep_scale)
+    results_file = config.OUTPUT_DIR / "bench.json"
+
+    site = FixtureSite(
+        listings=args.listings,
+        per_page=args.per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        captcha_rate=args.captcha_rate,
+        seed=args.seed,
+        recorded_dir=args.recorded_dir,
+    )
+    try:
+        with site, count_round_trips() as commands:
+            started = time.perf_counter()
+            result = run_scraper(
+                [site.url(f"/{args.category}")],
+                filters={"max_pages": args.pages, "max_items_per_page": args.items_per_page},
+                debugger_address=debugger_address,
+                results_file=results_file,
+                engine=args.engine,
+            )
+            elapsed = time.perf_counter() - started
+
+        with open(result["metrics_file"], "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    items = result["total_items"]
+    round_trips = sum(commands.values())
+    save = summary.get("histograms", {}).get("scraper_save_results_seconds", {}).get("_", {})
+    return {
+        "benchmark": "crawl",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "engine": args.engine,
+        "params": {
+            "contexts": config.PLAYWRIGHT_CONTEXTS if args.engine == "playwright" else None,
+            "listings": args.listings,
+            "per_page": args.per_page,
+            "pages": args.pages,
+            "items_per_page": args.items_per_page,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "captcha_rate": args.captcha_rate,
+            "sleep_scale": args.sleep_scale,
+        },
+        "items": items,
+        "duration_seconds": round(elapsed, 3),
+        "items_per_sec": round(items / elapsed, 3) if elapsed else 0.0,
+        "webdriver_round_trips": round_trips,
+        "round_trips_per_item": round(round_trips / items, 2) if items else None,
+        "top_commands": dict(commands.most_common(10)),
+        "save_calls": save.get("count", 0),
+        "save_seconds_total": save.get("sum", 0.0),
+        "save_seconds_avg": save.get("avg", 0.0),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "site_requests": dict(site.stats),
+        "stop_reasons": [r.get("stop_reason") for r in result.get("url_reports", [])],
+        "workdir": str(workdir) if args.keep else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crawl end-to-end trên site giả lập")
+    parser.add_argument("--engine", choices=("selenium", "playwright", "scrapy"), default="selenium")
+    parser.add_argument("--contexts", type=int, default=None,
+                        help="Số context (và số trang song song) cho engine playwright")
+    parser.add_argument("--debugger-address", default=config.DEBUGGER_ADDRESS)
+    parser.add_argument("--chrome", default=None, help="Tự mở Chrome (đường dẫn binary) thay vì dùng debugger có sẵn")
+    parser.add_argument("--headful", action="store_true", help="Mở Chrome có giao diện (mặc định headless)")
+    parser.add_argument("--category", default="ban-dat")
+    parser.add_argument("--listings", type=int, default=100)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--items-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--sleep-scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--recorded-dir", default=None)
+    parser.add_argument("--keep", action="store_true", help="Giữ thư mục tạm (output, metrics) sau khi chạy")
+    parser.add_argument("--output", default=None, help="Ghi nối kết quả (một dòng JSON) vào file này")
+    args = parser.parse_args()
+
+    if args.contexts:
+        config.PLAYWRIGHT_CONTEXTS = config.PLAYWRIGHT_CONCURRENCY = args.contexts
+
+    if args.chrome and args.engine == "selenium":
+        with launch_chrome(args.chrome, headless=not args.headful) as address:
+            record = run_benchmark(args, address)
+    else:
+        record = run_benchmark(args, args.debugger_address)
+
+    print(json.dumps(record, ensure_ascii=False, indent=2))
+    if args.output:
+        pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Benchmark các hot path CPU của storage / mapping trên dữ liệu giả lập (không cần trình duyệt).
+
+Đo: bỏ trùng của save_results, transform_to_example_format, transform_batch, _parse_number_from_text, _extract_area_number,
+get_mapping, find_ward_key_loose, save_results trọn vẹn và ghi / đọc file kết quả qua serializer, ở các cỡ
+1k/10k/100k item. Mỗi lần chạy ghi nối một dòng / (hàm, cỡ) kèm commit hash vào benchmarks/results/hot_paths.jsonl để so sánh giữa các commit.
+
+    python benchmarks/bench_hot_paths.py                          # 1k, 10k, 100k
+    python benchmarks/bench_hot_paths.py --sizes 1000 --repeat 5
+    python benchmarks/bench_hot_paths.py --history                # bảng per-op theo commit
+"""
+import argparse
+import gc
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.common import RESULTS_DIR, append_results, load_results, run_context
+from benchmarks.fixture_site import write_mapping_fixture
+from benchmarks.synthetic import build_gazetteer, generate_items
+from scraper import config, mapping, serializer, storage
+
+RESULTS_FILE = RESULTS_DIR / "hot_paths.jsonl"
+
+# Các hàm đọc file / tra mapping mỗi lần gọi: mặc định chỉ đo trên một mẫu để 100k không mất hàng giờ
+SLOW_FUNCTIONS = {
+    "transform_to_example_format", "transform_batch", "find_ward_key_loose", "save_results",
+    "serializer.write_results", "serializer.iter_items",
+}
+
+
+def _location_parts(item):
+    return [p.strip() for p in item["location"].split(",") if p.strip()]
+
+
+def _cases(items, workdir: pathlib.Path):
+    """(tên hàm, số op, callable chạy toàn bộ op) cho một tập item."""
+    prices = [it["price"] for it in items]
+    areas = [it["area"] for it in items]
+    provinces = [_location_parts(it)[-1] for it in items]
+
+    def parse_numbers():
+        for text in prices:
+            storage._parse_number_from_text(text)
+
+    def extract_areas():
+        for text in areas:
+            storage._extract_area_number(text)
+
+    def province_lookups():
+        for name in provinces:
+            mapping.get_mapping("province_id", name)
+
+    def dedupe():
+        storage._dedupe_results(items)
+
+    yield "_parse_number_from_text", len(prices), parse_numbers
+    yield "_extract_area_number", len(areas), extract_areas
+    yield "get_mapping", len(provinces), province_lookups
+    yield "_dedupe_results", len(items), dedupe
+
+    def ward_lookups(sample):
+        def run():
+            for it in sample:
+                parts = _location_parts(it)
+                province_id = mapping.get_mapping("province_id", parts[-1])
+                district_id = mapping.find_ward_key_loose("district_mapping.json", name=parts[-2], province_id=province_id)
+                if district_id:
+                    mapping.find_ward_key_loose(
+                        "ward_mapping.json", name=parts[-3], province_id=province_id, district_id=district_id
+                    )
+        return run
+
+    def transform(sample):
+        def run():
+            for it in sample:
+                storage.transform_to_example_format(it)
+        return run
+
+    def transform_batch(sample):
+        def run():
+            storage.transform_batch(sample)
+        return run
+
+    def save(sample):
+        def run():
+            storage.save_results(sample, str(workdir / "bench.json"), set(), set())
+        return run
+
+    def write_results(sample):
+        transformed = storage.transform_batch(sample)
+
+        def run():
+            serializer.write_results(workdir / "serialized.json", transformed)
+        return run
+
+    def read_results(sample):
+        serializer.write_results(workdir / "serialized.json", storage.transform_batch(sample))
+
+        def run():
+            for _ in serializer.iter_items(workdir / "serialized.json"):
+                pass
+        return run
+
+    yield "find_ward_key_loose", None, ward_lookups
+    yield "transform_to_example_format", None, transform
+    yield "transform_batch", None, transform_batch
+    yield "save_results", None, save
+    yield "serializer.write_results", None, write_results
+    yield "serializer.iter_items", None, read_results
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat: int, slow_cap: int, seed: int, only=None):
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="bench-hot-"))
+    try:
+        gazetteer = build_gazetteer()
+        config.MAPPING_DIR = write_mapping_fixture(workdir / "mapping", gazetteer)
+        config.RESULTS_DB_PATH = workdir / "results.sqlite3"
+        mapping._mappings_cache.clear()
+        context = run_context()
+
+        records = []
+        start = time.perf_counter()
+        mapping._load_mappings()
+        records.append({**context, "benchmark": "hot_paths", "function": "_load_mappings", "size": None,
+                        "ops": 1, "seconds": round(time.perf_counter() - start, 6), "sampled": False})
+
+        for size in sizes:
+            items = list(generate_items(size, seed=seed, gazetteer=gazetteer))
+            for name, ops, fn in _cases(items, workdir):
+                if only and name not in only:
+                    continue
+                sampled = False
+                if ops is None:
+                    sample = items
+                    if name in SLOW_FUNCTIONS and slow_cap and size > slow_cap:
+                        sample = items[:slow_cap]
+                        sampled = True
+                    ops, fn = len(sample), fn(sample)
+                seconds = _time(fn, 1 if name in SLOW_FUNCTIONS else repeat)
+                records.append({
+                    **context,
+                    "benchmark": "hot_paths",
+                    "function": name,
+                    "size": size,
+                    "ops": ops,
+                    "sampled": sampled,
+                    "repeat": 1 if name in SLOW_FUNCTIONS else repeat,
+                    "seconds": round(seconds, 6),
+                    "per_op_us": round(seconds / ops * 1e6, 3) if ops else None,
+                    "ops_per_sec": round(ops / seconds, 1) if seconds else None,
+                })
+                r = records[-1]
+                print(f"{name:<30} size={size:<7} ops={ops:<7} {r['seconds']:>10.4f}s  {r['per_op_us']:>10.2f} µs/op"
+                      + ("  (sampled)" if sampled else ""))
+        return records
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_history(path):
+    rows = defaultdict(dict)
+    commits = []
+    for r in load_results(path):
+        if r.get("benchmark") != "hot_paths" or r.get("per_op_us") is None:
+            continue
+        commit = (r.get("commit") or "?") + ("*" if r.get("dirty") else "")
+        if commit not in commits:
+            commits.append(commit)
+        rows[(r["function"], r["size"])][commit] = r["per_op_us"]
+
+    commits = commits[-8:]
+    print(f"{'function':<30}{'size':>8}  " + "".join(f"{c:>12}" for c in commits))
+    for (function, size), values in sorted(rows.items(), key=lambda kv: (kv[0][0], kv[0][1] or 0)):
+        cells = "".join(f"{values[c]:>12.2f}" if c in values else f"{'-':>12}" for c in commits)
+        print(f"{function:<30}{size:>8}  {cells}")
+    print("(µs/op, * = working tree có thay đổi chưa commit)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot path storage / mapping")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--slow-cap", type=int, default=1000,
+                        help="Số item tối đa cho các hàm chậm (transform, find_ward_key_loose, save_results); 0 = không giới hạn")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default=None, help="Chỉ chạy các hàm này (phân tách bằng dấu phẩy)")
+    parser.add_argument("--output", default=str(RESULTS_FILE))
+    parser.add_argument("--no-save", action="store_true", help="Không ghi kết quả vào file")
+    parser.add_argument("--history", action="store_true", help="In bảng kết quả theo commit rồi thoát")
+    args = parser.parse_args()
+
+    if args.history:
+        print_history(args.output)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = {s.strip() for s in args.only.split(",")} if args.only else None
+    records = run(sizes, args.repeat, args.slow_cap, args.seed, only)
+    if not args.no_save:
+        path = append_results(args.output, records)
+        print(f"Đã ghi {len(records)} dòng vào {path}")
+
+
+if __name__ == "__main__":
+    main()
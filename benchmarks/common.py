@@ -0,0 +1,55 @@
+"""Tiện ích chung cho các benchmark: thông tin commit và ghi kết quả dạng JSONL."""
+from __future__ import annotations
+
+import json
+import pathlib
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=30, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def git_revision() -> dict[str, Any]:
+    """{"commit": short hash, "dirty": có thay đổi chưa commit trong file đã track}."""
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def run_context() -> dict[str, Any]:
+    return {
+        **git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def append_results(path, records: list[dict[str, Any]]) -> pathlib.Path:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_results(path) -> list[dict[str, Any]]:
+    path = pathlib.Path(path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,444 @@
+"""Site giả lập batdongsan chạy local cho benchmark / kiểm thử end-to-end.
+
+Trang list (`/<category>`, `/<category>/p<N>`) và trang detail (`/<category>-<slug>-pr<PID>`) dùng đúng cấu
+trúc class `re__*` mà các collector đọc, có phân trang, độ trễ cấu hình được và tỉ lệ trả về trang
+CAPTCHA. Dữ liệu sinh tất định theo seed. Nếu truyền `recorded_dir`, file HTML đã ghi lại trong thư mục
+đó (ví dụ `ban-dat/p2.html`, `ban-dat-xa-abc-pr123.html`) được ưu tiên phục vụ nguyên trạng.
+
+    python benchmarks/fixture_site.py --port 8765 --listings 200 --latency 0.05 --captcha-rate 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+# (tỉnh, [(quận/huyện, [phường/xã, ...]), ...])
+GAZETTEER = [
+    ("Bắc Giang", [
+        ("Huyện Yên Dũng", ["Xã Tân Liễu", "Xã Cảnh Thụy", "Xã Tiến Dũng"]),
+        ("Huyện Lạng Giang", ["Xã Tân Thịnh", "Xã Nghĩa Hòa", "Thị trấn Vôi"]),
+        ("Thành phố Bắc Giang", ["Phường Hoàng Văn Thụ", "Phường Trần Phú"]),
+    ]),
+    ("Hà Nội", [
+        ("Quận Cầu Giấy", ["Phường Dịch Vọng", "Phường Nghĩa Đô", "Phường Yên Hòa"]),
+        ("Huyện Đông Anh", ["Xã Uy Nỗ", "Xã Kim Chung", "Thị trấn Đông Anh"]),
+    ]),
+    ("Hồ Chí Minh", [
+        ("Thành phố Thủ Đức", ["Phường Linh Trung", "Phường An Phú", "Phường Thảo Điền"]),
+        ("Quận 7", ["Phường Tân Phong", "Phường Tân Phú"]),
+    ]),
+]
+
+STREETS = ["Đường Lê Lợi", "Đường Trần Hưng Đạo", "Đường Nguyễn Trãi", "Đường 295B", "Ngõ 12 Phố Huế", ""]
+LEGAL = ["Sổ đỏ/ Sổ hồng", "Hợp đồng mua bán", "Đang chờ sổ"]
+DIRECTIONS = ["Đông", "Tây", "Nam", "Bắc", "Đông - Nam", "Tây - Bắc"]
+NAMES = ["Nguyễn Văn An", "Trần Thị Bình", "Lê Minh Châu", "Phạm Quốc Dũng", "Hoàng Thu Hà"]
+
+# Ranh giới giả lập: phường/xã thứ i của gazetteer là ô chữ nhật WARD_CELL độ trong lưới WARD_COLUMNS cột
+WARD_ORIGIN = (102.5, 8.6)  # (lng, lat)
+WARD_CELL = 0.02
+WARD_COLUMNS = 100
+
+_RE_DETAIL = re.compile(r"^/(?P<category>[a-z0-9-]+?)-(?P<slug>[a-z0-9-]*)-pr(?P<pid>\d+)$")
+_RE_LIST = re.compile(r"^/(?P<category>[a-z0-9-]+)(?:/p(?P<page>\d+))?$")
+
+CAPTCHA_HTML = """<!doctype html><html><head><title>Captcha</title></head>
+<body><div class="captcha-container"><h1>Xác minh captcha</h1><p>Vui lòng xác nhận bạn không phải robot.</p></div></body></html>"""
+
+
+def slugify(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+def iter_gazetteer(gazetteer=None):
+    """Yield (province_id, province, district_id, district, ward_id, ward) cho toàn bộ gazetteer (mặc định GAZETTEER)."""
+    for p_idx, (province, districts) in enumerate(gazetteer or GAZETTEER, start=1):
+        for d_idx, (district, wards) in enumerate(districts, start=1):
+            district_id = p_idx * 100 + d_idx
+            for w_idx, ward in enumerate(wards, start=1):
+                yield p_idx, province, district_id, district, district_id * 100 + w_idx, ward
+
+
+def write_mapping_fixture(directory, gazetteer=None) -> Path:
+    """Ghi map.xlsx + district_mapping.json + ward_mapping.json khớp với gazetteer (mặc định GAZETTEER) vào `directory`."""
+    from openpyxl import Workbook
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    provinces: dict[int, str] = {}
+    districts: dict[str, dict] = {}
+    wards: dict[str, dict] = {}
+    for p_id, province, d_id, district, w_id, ward in iter_gazetteer(gazetteer):
+        provinces[p_id] = province
+        districts[str(d_id)] = {"province_id": p_id, "name": district}
+        wards[str(w_id)] = {"province_id": p_id, "district_id": d_id, "name": ward}
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "province_id"
+    ws.append(["ID", "VALUE", "SLUG"])
+    for p_id, province in provinces.items():
+        ws.append([p_id, province, slugify(province)])
+
+    ws = wb.create_sheet("demand_id")
+    ws.append(["ID", "VALUE", "SLUG"])
+    ws.append([1, "sell", "ban"])
+    ws.append([2, "rent", "cho-thue"])
+
+    ws = wb.create_sheet("real_estate_type_id")
+    ws.append(["ID", "VALUE", "SLUG"])
+    for type_id, (value, slug) in enumerate(
+        [("Đất", "dat-nen-dat-tho-cu"), ("Căn hộ chung cư", "can-ho-chung-cu"), ("Nhà riêng", "nha-ngo-hem")],
+        start=1,
+    ):
+        ws.append([type_id, value, slug])
+
+    wb.save(directory / "map.xlsx")
+    with open(directory / "district_mapping.json", "w", encoding="utf-8") as f:
+        json.dump(districts, f, ensure_ascii=False)
+    with open(directory / "ward_mapping.json", "w", encoding="utf-8") as f:
+        json.dump(wards, f, ensure_ascii=False)
+    return directory
+
+
+def ward_cell(position: int) -> tuple[float, float, float, float]:
+    """Bbox (min_lng, min_lat, max_lng, max_lat) của phường/xã thứ `position` trong iter_gazetteer."""
+    row, col = divmod(position, WARD_COLUMNS)
+    min_lng = WARD_ORIGIN[0] + col * WARD_CELL
+    min_lat = WARD_ORIGIN[1] + row * WARD_CELL
+    return min_lng, min_lat, min_lng + WARD_CELL, min_lat + WARD_CELL
+
+
+def point_in_ward(rng: random.Random, position: int) -> tuple[float, float]:
+    """(lat, lng) ngẫu nhiên nằm hẳn bên trong ô của phường/xã `position`."""
+    min_lng, min_lat, max_lng, max_lat = ward_cell(position)
+    margin = WARD_CELL * 0.05
+    lat = round(rng.uniform(min_lat + margin, max_lat - margin), 6)
+    lng = round(rng.uniform(min_lng + margin, max_lng - margin), 6)
+    return lat, lng
+
+
+def write_boundary_fixture(directory, gazetteer=None) -> Path:
+    """Ghi ward.geojson (mỗi phường/xã một ô chữ nhật, kèm ward_id / district_id / province_id) vào `directory`."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    features = []
+    for position, (p_id, _, d_id, _, w_id, ward) in enumerate(iter_gazetteer(gazetteer)):
+        min_lng, min_lat, max_lng, max_lat = ward_cell(position)
+        ring = [[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]]
+        features.append({
+            "type": "Feature",
+            "properties": {"ward_id": w_id, "district_id": d_id, "province_id": p_id, "name": ward},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    with open(directory / "ward.geojson", "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+    return directory
+
+
+class Listing:
+    """Một tin đăng sinh tất định từ (seed, index)."""
+
+    def __init__(self, seed: int, index: int, category: str, today: date, per_page: int):
+        rng = random.Random(seed * 1_000_003 + index)
+        places = list(iter_gazetteer())
+        position = rng.randrange(len(places))
+        _, province, _, district, _, ward = places[position]
+        street = rng.choice(STREETS)
+
+        self.pid = str(40_000_000 + index)
+        self.category = category
+        self.location = ", ".join(part for part in (street, ward, district, province) if part)
+        self.slug = slugify(f"{ward} {district}")
+        self.area = rng.choice([60, 80, 95.5, 100, 120, 150, 200, 250, 500])
+        self.price_billion = round(rng.uniform(0.8, 25), 1)
+        self.title = f"Bán đất {ward}, {district}, diện tích {self.area:g}m², giá {self.price_billion:g} tỷ".replace(".", ",")
+        self.posted = today - timedelta(days=index // per_page)
+        self.expires = self.posted + timedelta(days=30)
+        self.lat, self.lng = point_in_ward(rng, position)
+        self.images = rng.randint(3, 12)
+        self.bedrooms = rng.choice([None, 2, 3, 4])
+        self.legal = rng.choice(LEGAL)
+        self.direction = rng.choice(DIRECTIONS)
+        self.agent = rng.choice(NAMES)
+        self.description = " ".join(
+            [f"Chính chủ cần bán lô đất tại {self.location}."]
+            + [f"Mặt tiền {rng.randint(4, 12)}m, đường ô tô {rng.randint(3, 10)}m, gần chợ, trường học."] * rng.randint(2, 8)
+        )
+
+    @property
+    def price_text(self) -> str:
+        return f"{self.price_billion:g} tỷ".replace(".", ",")
+
+    @property
+    def path(self) -> str:
+        return f"/{self.category}-{self.slug}-pr{self.pid}"
+
+
+class FixtureSite:
+    """
+    HTTP server giả lập chạy trên thread nền.
+
+    Args:
+        listings: Số tin mỗi category
+        per_page: Số card mỗi trang list
+        latency / jitter: Độ trễ mỗi response (giây) = latency + uniform(0, jitter)
+        captcha_rate: Xác suất trang detail trả về trang CAPTCHA
+        recorded_dir: Thư mục HTML đã ghi lại (được ưu tiên nếu có file khớp path)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        listings: int = 200,
+        per_page: int = 20,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        captcha_rate: float = 0.0,
+        seed: int = 1,
+        recorded_dir: Optional[str] = None,
+    ):
+        self.listings = listings
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.captcha_rate = captcha_rate
+        self.seed = seed
+        self.recorded_dir = Path(recorded_dir) if recorded_dir else None
+        self.today = date.today()
+        self.stats = {"list": 0, "detail": 0, "captcha": 0, "recorded": 0, "not_found": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cache: dict[int, Listing] = {}
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "FixtureSite":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fixture-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    def listing(self, index: int, category: str = "ban-dat") -> Listing:
+        item = self._cache.get(index)
+        if item is None:
+            item = self._cache[index] = Listing(self.seed, index, category, self.today, self.per_page)
+        return item
+
+    def _sleep(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def _handle(self, req: BaseHTTPRequestHandler):
+        path = urlparse(req.path).path.rstrip("/") or "/"
+        self._sleep()
+
+        if self.recorded_dir is not None:
+            recorded = self.recorded_dir / (path.lstrip("/") + ".html")
+            if recorded.is_file():
+                self._count("recorded")
+                return self._send(req, 200, recorded.read_text(encoding="utf-8"))
+
+        m = _RE_DETAIL.match(path)
+        if m:
+            index = int(m.group("pid")) - 40_000_000
+            if not 0 <= index < self.listings:
+                self._count("not_found")
+                return self._send(req, 404, "<html><body>Not found</body></html>")
+            self._count("detail")
+            with self._lock:
+                captcha = self.captcha_rate and self._rng.random() < self.captcha_rate
+            if captcha:
+                self._count("captcha")
+                return self._send(req, 200, CAPTCHA_HTML)
+            return self._send(req, 200, self.render_detail(self.listing(index, m.group("category"))))
+
+        m = _RE_LIST.match(path)
+        if m:
+            self._count("list")
+            return self._send(req, 200, self.render_list(m.group("category"), int(m.group("page") or 1)))
+
+        self._count("not_found")
+        self._send(req, 404, "<html><body>Not found</body></html>")
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _send(req: BaseHTTPRequestHandler, status: int, body: str):
+        data = body.encode("utf-8")
+        req.send_response(status)
+        req.send_header("Content-Type", "text/html; charset=utf-8")
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+
+    # ------------------------------------------------------------------
+    def render_list(self, category: str, page: int) -> str:
+        esc = html.escape
+        pages = max(1, -(-self.listings // self.per_page))
+        start = (page - 1) * self.per_page
+        cards = []
+        for index in range(start, min(start + self.per_page, self.listings)):
+            it = self.listing(index, category)
+            cards.append(
+                f'<div class="js__card re__card-full">'
+                f'<a class="js__product-link-for-product-id" data-product-id="{it.pid}" href="{it.path}">'
+                f'<h3 class="re__card-title"><span class="pr-title js__card-title">{esc(it.title)}</span></h3>'
+                f'<div class="re__card-config"><span class="re__card-config-price">{it.price_text}</span>'
+                f'<span class="re__card-config-area">{it.area:g} m²</span></div>'
+                f'<div class="re__card-location"><span>{esc(it.location)}</span></div>'
+                f'<span class="re__card-published-info-published-at" aria-label="{it.posted:%d/%m/%Y}">'
+                f'{"Đăng hôm nay" if it.posted == self.today else f"Đăng {(self.today - it.posted).days} ngày trước"}'
+                f'</span></a></div>'
+            )
+
+        links = []
+        for p in range(max(1, page - 2), min(pages, page + 3) + 1):
+            href = f"/{category}" if p == 1 else f"/{category}/p{p}"
+            active = " re__actived" if p == page else ""
+            links.append(f'<a class="re__pagination-number{active}" pid="{p}" href="{href}">{p}</a>')
+
+        return (
+            "<!doctype html><html><head><meta charset='utf-8'><title>Mua bán đất</title></head><body>"
+            f'<div class="re__srp-total-count">Hiện có <span id="count-number">{self.listings}</span> bất động sản.</div>'
+            f'<div id="product-lists-web" class="re__srp-list">{"".join(cards)}</div>'
+            f'<div class="re__pagination-group">{"".join(links)}</div>'
+            # Nội dung đệm để collector có chỗ cuộn như trang thật
+            '<div style="height:6000px"></div>'
+            "</body></html>"
+        )
+
+    def render_detail(self, it: Listing) -> str:
+        esc = html.escape
+        price_text = it.price_text
+        per_m2 = f"~{it.price_billion * 1000 / it.area:.1f} triệu/m²".replace(".", ",")
+        specs = [("Diện tích", f"{it.area:g} m²"), ("Mức giá", price_text), ("Hướng nhà", it.direction),
+                 ("Pháp lý", it.legal)]
+        if it.bedrooms:
+            specs.append(("Số phòng ngủ", f"{it.bedrooms} phòng"))
+        spec_html = "".join(
+            f'<div class="re__pr-specs-content-item"><span class="re__pr-specs-content-item-title">{esc(k)}</span>'
+            f'<span class="re__pr-specs-content-item-value">{esc(v)}</span></div>'
+            for k, v in specs
+        )
+        config_html = "".join(
+            f'<div class="re__pr-short-info-item js__pr-config-item"><span class="title">{k}</span>'
+            f'<span class="value">{v}</span></div>'
+            for k, v in [("Ngày đăng", f"{it.posted:%d/%m/%Y}"), ("Ngày hết hạn", f"{it.expires:%d/%m/%Y}"),
+                         ("Loại tin", "Tin thường"), ("Mã tin", it.pid)]
+        )
+        images = "".join(
+            f'<li><img data-src="https://file4.batdongsan.com.vn/resize/200x200/2025/11/20/{it.pid}-{i}.jpg"></li>'
+            for i in range(it.images)
+        )
+        return (
+            "<!doctype html><html><head><meta charset='utf-8'>"
+            f"<title>{esc(it.title)}</title></head><body>"
+            f'<div id="product-detail-web" class="re__pr-info">'
+            f'<h1 class="re__pr-title pr-title js__pr-title">{esc(it.title)}</h1>'
+            f'<span class="re__pr-short-description js__pr-address">{esc(it.location)}</span>'
+            f'<div class="re__media-thumbs"><ul>{images}</ul></div>'
+            f'<div class="re__pr-short-info js__pr-short-info">'
+            f'<div class="re__pr-short-info-item"><span class="title">Mức giá</span>'
+            f'<span class="value">{price_text}</span><span class="ext">{per_m2}</span></div>'
+            f'<div class="re__pr-short-info-item"><span class="title">Diện tích</span>'
+            f'<span class="value">{it.area:g} m²</span></div></div>'
+            f'<div class="re__section re__pr-description"><div class="re__section-body re__detail-content '
+            f'js__section-body js__pr-description">{esc(it.description)}</div></div>'
+            f'<div class="re__pr-specs-content">{spec_html}</div>'
+            f'<div class="re__pr-map"><iframe data-src="https://www.google.com/maps/embed/v1/place?'
+            f'q={it.lat},{it.lng}&amp;key=fixture"></iframe></div>'
+            f'<div class="re__pr-config">{config_html}</div>'
+            f'<div class="re__contact-box"><div kyc-tracking-id="lead-phone-ldp" data-kyc-name="{esc(it.agent)}">'
+            f'<span class="re__btn">0912 345 ***</span></div></div>'
+            "</div>"
+            '<div style="height:6000px"></div>'
+            "</body></html>"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Site batdongsan giả lập cho benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--listings", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--recorded-dir", default=None)
+    args = parser.parse_args()
+
+    site = FixtureSite(
+        host=args.host,
+        port=args.port,
+        listings=args.listings,
+        per_page=args.per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        captcha_rate=args.captcha_rate,
+        seed=args.seed,
+        recorded_dir=args.recorded_dir,
+    )
+    print(f"Fixture site: {site.url('/ban-dat')}  (Ctrl+C để dừng)")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+        print(json.dumps(site.stats))
+
+
+if __name__ == "__main__":
+    main()
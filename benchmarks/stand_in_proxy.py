@@ -0,0 +1,238 @@
+"""Proxy HTTP giả lập chạy local để thử scraper.egress_pool mà không cần proxy thật.
+
+Mỗi StandInProxy là một forward proxy tối giản: GET dạng absolute-URI được chuyển tiếp tới site đích, CONNECT
+được nối ống (HTTPS). Để mô phỏng một IP bị site đánh dấu, proxy có thể tự trả trang CAPTCHA (cùng HTML với
+fixture_site) cho trang detail sau `captcha_after` request hoặc với xác suất `captcha_rate`, và trả 502 với xác
+suất `fail_rate`. Thống kê từng proxy nằm trong `stats`.
+
+    python benchmarks/fixture_site.py --port 8765 &
+    python benchmarks/stand_in_proxy.py --count 3 --base-port 8901 --flag 1 --captcha-after 10
+    SCRAPER_PROXIES=127.0.0.1:8901,127.0.0.1:8902,127.0.0.1:8903 python craw/play_batdongsan.py
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import pathlib
+import random
+import re
+import select
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.fixture_site import CAPTCHA_HTML
+
+_RE_DETAIL_PATH = re.compile(r"-pr\d+/?$")
+_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "proxy-authorization", "transfer-encoding", "upgrade"}
+
+
+class StandInProxy:
+    """
+    Forward proxy chạy trên thread nền.
+
+    Args:
+        captcha_after: Sau N request, mọi trang detail trả về CAPTCHA (IP đã bị đánh dấu); None = không
+        captcha_rate: Xác suất một trang detail trả về CAPTCHA
+        fail_rate: Xác suất trả 502 thay vì chuyển tiếp
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        captcha_after: Optional[int] = None,
+        captcha_rate: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self.captcha_after = captcha_after
+        self.captcha_rate = captcha_rate
+        self.fail_rate = fail_rate
+        self.stats = {"requests": 0, "forwarded": 0, "captcha": 0, "failed": 0, "tunnels": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                proxy._forward(self)
+
+            def do_CONNECT(self):
+                proxy._tunnel(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.address}"
+
+    def start(self) -> "StandInProxy":
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"proxy-{self.address}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    def _count(self, key: str) -> int:
+        with self._lock:
+            self.stats[key] += 1
+            return self.stats[key]
+
+    def _verdict(self, path: str) -> Optional[str]:
+        seen = self._count("requests")
+        with self._lock:
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                return "failed"
+            if _RE_DETAIL_PATH.search(path):
+                if self.captcha_after is not None and seen > self.captcha_after:
+                    return "captcha"
+                if self.captcha_rate and self._rng.random() < self.captcha_rate:
+                    return "captcha"
+        return None
+
+    @staticmethod
+    def _send(req: BaseHTTPRequestHandler, status: int, body: str):
+        data = body.encode("utf-8")
+        req.send_response(status)
+        req.send_header("Content-Type", "text/html; charset=utf-8")
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+
+    def _forward(self, req: BaseHTTPRequestHandler):
+        target = urlsplit(req.path)
+        if not target.hostname:
+            return self._send(req, 400, "<html><body>Cần absolute URI (proxy request)</body></html>")
+        verdict = self._verdict(target.path)
+        if verdict:
+            self._count(verdict)
+            if verdict == "captcha":
+                return self._send(req, 200, CAPTCHA_HTML)
+            return self._send(req, 502, "<html><body>Bad gateway</body></html>")
+
+        headers = {k: v for k, v in req.headers.items() if k.lower() not in _HOP_HEADERS}
+        conn_cls = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(target.hostname, target.port, timeout=30)
+        try:
+            path = target.path or "/"
+            if target.query:
+                path += "?" + target.query
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except OSError as e:
+            self._count("failed")
+            return self._send(req, 502, f"<html><body>{e}</body></html>")
+        finally:
+            conn.close()
+        self._count("forwarded")
+        req.send_response(resp.status)
+        for key, value in resp.getheaders():
+            if key.lower() not in _HOP_HEADERS and key.lower() != "content-length":
+                req.send_header(key, value)
+        req.send_header("Content-Length", str(len(body)))
+        req.end_headers()
+        req.wfile.write(body)
+
+    def _tunnel(self, req: BaseHTTPRequestHandler):
+        host, _, port = req.path.rpartition(":")
+        try:
+            upstream = socket.create_connection((host, int(port or 443)), timeout=30)
+        except (OSError, ValueError):
+            self._count("failed")
+            req.send_error(502)
+            return
+        self._count("tunnels")
+        req.send_response(200, "Connection Established")
+        req.end_headers()
+        client = req.connection
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, 60)
+                if errored or not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is client else client).sendall(data)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+            req.close_connection = True
+
+
+def start_proxies(count: int, host: str = "127.0.0.1", base_port: int = 0, flagged=(), **flag_kwargs) -> List[StandInProxy]:
+    """`count` proxy; proxy có chỉ số trong `flagged` nhận `flag_kwargs` (captcha_after / captcha_rate / fail_rate)."""
+    proxies = []
+    for i in range(count):
+        port = base_port + i if base_port else 0
+        kwargs = flag_kwargs if i in flagged else {}
+        proxies.append(StandInProxy(host, port, seed=i + 1, **kwargs).start())
+    return proxies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy giả lập cho thử nghiệm egress pool")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8901)
+    parser.add_argument("--flag", type=int, nargs="*", default=[], help="Chỉ số proxy bị 'đánh dấu'")
+    parser.add_argument("--captcha-after", type=int, default=None)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    proxies = start_proxies(
+        args.count, host=args.host, base_port=args.base_port, flagged=set(args.flag),
+        captcha_after=args.captcha_after, captcha_rate=args.captcha_rate, fail_rate=args.fail_rate,
+    )
+    print("SCRAPER_PROXIES=" + ",".join(p.address for p in proxies) + "  (Ctrl+C để dừng)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proxy in proxies:
+            proxy.stop()
+            print(proxy.address, json.dumps(proxy.stats))
+
+
+if __name__ == "__main__":
+    main()
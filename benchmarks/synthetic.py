@@ -0,0 +1,164 @@
+"""Sinh dữ liệu giả lập cho benchmark các hot path CPU (storage, mapping).
+
+Item sinh ra có đúng shape của item thô sau bước detail (xem collectors.listing.new_list_item): địa chỉ
+tiếng Việt nhiều cấp, chuỗi giá như "5,2 tỷ", "850 triệu", "15 triệu/tháng", "Thỏa thuận", diện tích
+"1.200 m²", dict specs/config như trang thật, và một tỉ lệ item trùng PID để đo bước bỏ trùng.
+Gazetteer giả lập có kích thước gần thật (~63 tỉnh, ~700 quận/huyện, ~10k phường/xã) để chi phí tra
+mapping sát với dữ liệu thật. Tọa độ map_coords nằm trong ô ranh giới của đúng phường/xã đó
+(xem fixture_site.write_boundary_fixture).
+"""
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from benchmarks.fixture_site import GAZETTEER, LEGAL, DIRECTIONS, NAMES, STREETS, point_in_ward, slugify
+
+SYLLABLES = [
+    "An", "Bình", "Cẩm", "Đông", "Gia", "Hòa", "Hưng", "Kim", "Long", "Minh", "Phú", "Quang", "Tân",
+    "Thanh", "Thuận", "Trung", "Vĩnh", "Xuân", "Yên", "Phước", "Lạc", "Sơn", "Hải", "Đức", "Nghĩa",
+    "Thịnh", "Lộc", "Mỹ", "Hiệp", "Thạnh",
+]
+
+TYPE_SLUGS = [
+    ("ban", "dat-nen-dat-tho-cu"), ("ban", "can-ho-chung-cu"), ("ban", "nha-ngo-hem"),
+    ("ban", "nha-mat-pho-mat-tien"), ("ban", "dat-nen-du-an"), ("cho-thue", "can-ho-chung-cu"),
+    ("cho-thue", "nha-ngo-hem"), ("cho-thue", "phong-tro"), ("cho-thue", "van-phong"),
+]
+
+
+def _unique_name(rng: random.Random, prefix: str, used: set[str]) -> str:
+    while True:
+        name = f"{prefix} {rng.choice(SYLLABLES)} {rng.choice(SYLLABLES)}"
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def build_gazetteer(
+    provinces: int = 63,
+    districts_per_province: int = 11,
+    wards_per_district: int = 15,
+    seed: int = 7,
+) -> list:
+    """Gazetteer cùng format với fixture_site.GAZETTEER, giữ nguyên các tỉnh thật ở đầu danh sách."""
+    rng = random.Random(seed)
+    gazetteer = [(p, [(d, list(ws)) for d, ws in ds]) for p, ds in GAZETTEER]
+    used_provinces = {p for p, _ in gazetteer}
+    while len(gazetteer) < provinces:
+        province = _unique_name(rng, "Tỉnh", used_provinces)
+        used_districts: set[str] = set()
+        districts = []
+        for _ in range(districts_per_province):
+            district = _unique_name(rng, rng.choice(["Huyện", "Quận", "Thị xã"]), used_districts)
+            used_wards: set[str] = set()
+            wards = [
+                _unique_name(rng, rng.choice(["Xã", "Phường", "Thị trấn"]), used_wards)
+                for _ in range(wards_per_district)
+            ]
+            districts.append((district, wards))
+        gazetteer.append((province, districts))
+    return gazetteer
+
+
+def _price_text(rng: random.Random, rent: bool) -> str:
+    if rent:
+        return rng.choice([
+            f"{rng.randint(3, 60)} triệu/tháng",
+            f"{rng.randint(3, 60)},{rng.randint(1, 9)} triệu/tháng",
+            "Thỏa thuận",
+        ])
+    return rng.choice([
+        f"{rng.randint(1, 40)},{rng.randint(1, 9)} tỷ",
+        f"{rng.randint(1, 40)} tỷ",
+        f"{rng.randint(300, 990)} triệu",
+        f"{rng.randint(1, 9)}.{rng.randint(1, 9)} tỷ",
+        "Thỏa thuận",
+    ])
+
+
+def _area_text(rng: random.Random) -> str:
+    return rng.choice([
+        f"{rng.randint(30, 300)} m²",
+        f"{rng.randint(30, 300)},{rng.randint(1, 9)} m²",
+        f"{rng.randint(1, 9)}.{rng.randint(100, 999)} m²",
+        f"{rng.randint(40, 500)}m2",
+    ])
+
+
+def generate_items(
+    n: int,
+    seed: int = 1,
+    gazetteer: Optional[list] = None,
+    duplicate_rate: float = 0.05,
+    today: Optional[date] = None,
+) -> Iterator[dict]:
+    """Yield `n` item thô; khoảng `duplicate_rate` item lặp lại PID của một item trước đó."""
+    rng = random.Random(seed)
+    places = []
+    for province, districts in gazetteer or GAZETTEER:
+        for district, wards in districts:
+            for ward in wards:
+                places.append((province, district, ward))
+    today = today or date.today()
+    issued: list[str] = []
+
+    for i in range(n):
+        if issued and rng.random() < duplicate_rate:
+            pid = rng.choice(issued)
+        else:
+            pid = str(30_000_000 + i)
+            issued.append(pid)
+
+        demand, type_slug = rng.choice(TYPE_SLUGS)
+        rent = demand == "cho-thue"
+        position = rng.randrange(len(places))
+        province, district, ward = places[position]
+        street = rng.choice(STREETS)
+        location = ", ".join(part for part in (street, ward, district, province) if part)
+        price = _price_text(rng, rent)
+        area = _area_text(rng)
+        posted = today - timedelta(days=rng.randint(0, 60))
+        bedrooms = rng.choice([None, 1, 2, 3, 4, 5])
+
+        specs = {"Diện tích": area, "Mức giá": price, "Hướng nhà": rng.choice(DIRECTIONS), "Pháp lý": rng.choice(LEGAL)}
+        if bedrooms:
+            specs["Số phòng ngủ"] = f"{bedrooms} phòng"
+            specs["Số toilet"] = f"{max(1, bedrooms - 1)} phòng"
+        if rng.random() < 0.4:
+            specs["Mặt tiền"] = f"{rng.randint(3, 15)} m"
+            specs["Đường vào"] = f"{rng.randint(2, 12)} m"
+        if rng.random() < 0.3:
+            specs["Số tầng"] = f"{rng.randint(1, 7)} tầng"
+            specs["Nội thất"] = rng.choice(["Đầy đủ", "Cơ bản", "Không nội thất"])
+
+        lat, lng = point_in_ward(rng, position)
+        yield {
+            "href": f"https://batdongsan.com.vn/{demand}-{type_slug}-{slugify(ward + ' ' + district)}-pr{pid}",
+            "pid": pid,
+            "title": f"{'Cho thuê' if rent else 'Bán'} {type_slug.replace('-', ' ')} {ward}, {district}, {area}",
+            "price": price,
+            "area": area,
+            "price_per_m2": "" if rent else f"~{rng.randint(10, 300)} triệu/m²",
+            "location": location,
+            "description": f"Chính chủ cần {'cho thuê' if rent else 'bán'} tại {location}. " * rng.randint(1, 6),
+            "thumbnail": "",
+            "posted_date": f"{posted:%d/%m/%Y}",
+            "expiration_date": f"{posted + timedelta(days=30):%d/%m/%Y}",
+            "agent_name": rng.choice(NAMES),
+            "agent_phone": "",
+            "images": [
+                f"https://file4.batdongsan.com.vn/2025/11/20/{pid}-{k}.jpg" for k in range(rng.randint(0, 12))
+            ],
+            "specs": specs,
+            "config": {
+                "Ngày đăng": f"{posted:%d/%m/%Y}",
+                "Ngày hết hạn": f"{posted + timedelta(days=30):%d/%m/%Y}",
+                "Loại tin": rng.choice(["Tin thường", "Tin VIP Bạc", "Tin VIP Vàng"]),
+                "Mã tin": pid,
+            },
+            "map_coords": f"{lat},{lng}" if rng.random() < 0.8 else "",
+            "map_link": "",
+            "map_dms": "",
+        }
@@ -0,0 +1,44 @@
+"""Script CLI để crawl chỉ mục địa điểm (tỉnh → quận → phường) từ sidebar và lưu ra JSON."""
+import argparse
+import pathlib
+import sys
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config
+from scraper.browser import init_driver
+from scraper.locations import crawl_location_index, load_location_index, save_location_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl chỉ mục địa điểm từ sidebar batdongsan.com.vn")
+    parser.add_argument("paths", nargs="*", help="Path loại BĐS (mặc định: tất cả trong config.PROPERTY_TYPE_PATHS)")
+    parser.add_argument("--max-level", type=int, default=config.LOCATION_INDEX_MAX_LEVEL,
+                        help="1 = tỉnh, 2 = quận, 3 = phường")
+    parser.add_argument("--output", default=str(config.LOCATION_INDEX_FILE))
+    parser.add_argument("--debugger-address", default=config.DEBUGGER_ADDRESS)
+    args = parser.parse_args()
+
+    driver, _ = init_driver(args.debugger_address, config.PAGE_LOAD_TIMEOUT, config.WAIT_TIMEOUT)
+    try:
+        # Giữ lại các path đã crawl trước đó, chỉ crawl lại các path được yêu cầu
+        index = crawl_location_index(
+            driver,
+            property_paths=args.paths or None,
+            max_level=args.max_level,
+            existing=load_location_index(args.output),
+        )
+    finally:
+        driver.quit()
+
+    path = save_location_index(index, args.output)
+    total = sum(len(entries) for entries in index["paths"].values())
+    print(f"\n{'='*60}")
+    print(f"Đã lưu {total} địa điểm cho {len(index['paths'])} loại BĐS vào {path}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Script CLI nạp các file kết quả JSON sẵn có vào kho SQLite (config.RESULTS_DB_PATH) để truy vấn qua /api/results."""
+import argparse
+import pathlib
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, results_db
+from scraper.reexport import discover_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill kho SQLite từ output/YYYY-MM/*.json")
+    parser.add_argument("paths", nargs="*", help=f"Thư mục hoặc file JSON (mặc định: {config.OUTPUT_DIR})")
+    parser.add_argument("--db", default=str(config.RESULTS_DB_PATH))
+    args = parser.parse_args()
+
+    # File cũ trước để bản ghi của ngày mới hơn thắng khi upsert
+    files = sorted(discover_files(args.paths or [config.OUTPUT_DIR]), key=lambda p: p.name)
+    start = time.perf_counter()
+    written = results_db.backfill_from_files(files, path=args.db)
+    print(f"Đã ghi {written} records từ {len(files)} file trong {time.perf_counter() - start:.2f}s")
+    print(f"Tổng trong {args.db}: {results_db.count(args.db)} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Script CLI chạy đội Chrome headless (scraper.chrome_fleet) ở foreground cho các job crawl dùng chung.
+
+    python craw/chrome_fleet.py --size 4                  # Chrome ở 127.0.0.1:9300..9303, Ctrl+C để dừng
+    python craw/chrome_fleet.py --size 2 --memory-mb 1000 --headful
+    python craw/chrome_fleet.py --size 4 --once --json    # launch, in trạng thái khi sẵn sàng rồi dừng
+
+Job crawl ở process khác trỏ vào fleet qua danh sách debugger address (form web: phân cách bằng dấu phẩy).
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config
+from scraper.chrome_fleet import ChromeFleet
+
+
+def _print_stats(stats):
+    print(f"{time.strftime('%H:%M:%S')}  {stats['ready']}/{stats['size']} sẵn sàng")
+    for s in stats["instances"]:
+        rss = f"{s['rss_mb']} MB" if s["rss_mb"] is not None else "-"
+        line = f"  #{s['index']} {s['address']:<16} {s['state']:<8} pid={s['pid']} rss={rss} restarts={s['restarts']}"
+        if s["last_exit"]:
+            line += f"  ({s['last_exit']})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đội Chrome headless được giám sát cho crawler")
+    parser.add_argument("--size", type=int, default=config.FLEET_SIZE or 2, help="Số Chrome")
+    parser.add_argument("--base-port", type=int, default=config.FLEET_BASE_PORT, help="Cổng debugger của Chrome đầu tiên")
+    parser.add_argument("--profile-dir", default=str(config.FLEET_PROFILE_DIR), help="Thư mục chứa các profile chrome-<i>")
+    parser.add_argument("--binary", default=None, help="Đường dẫn Chrome / Chromium (mặc định tìm trong PATH)")
+    parser.add_argument("--memory-mb", type=int, default=config.FLEET_MEMORY_MB, help="Trần RSS mỗi Chrome (0 = không giới hạn)")
+    parser.add_argument("--check-interval", type=float, default=config.FLEET_CHECK_INTERVAL, help="Giây giữa hai vòng giám sát")
+    parser.add_argument("--headful", action="store_true", help="Mở cửa sổ Chrome thay vì headless")
+    parser.add_argument("--stats-every", type=float, default=30.0, help="In trạng thái mỗi N giây")
+    parser.add_argument("--once", action="store_true", help="Chờ sẵn sàng, in trạng thái rồi dừng")
+    parser.add_argument("--json", action="store_true", help="In trạng thái dạng JSON")
+    args = parser.parse_args()
+
+    fleet = ChromeFleet(
+        size=args.size,
+        binary=args.binary,
+        base_port=args.base_port,
+        profile_dir=args.profile_dir,
+        headless=not args.headful,
+        memory_mb=args.memory_mb,
+        check_interval=args.check_interval,
+    )
+    show = (lambda s: print(json.dumps(s, ensure_ascii=False, indent=2))) if args.json else _print_stats
+    fleet.start()
+    try:
+        print("Debugger address:", ",".join(fleet.addresses(ready_only=False)))
+        show(fleet.stats())
+        while not args.once:
+            time.sleep(args.stats_every)
+            show(fleet.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.stop()
+
+
+if __name__ == "__main__":
+    main()
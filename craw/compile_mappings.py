@@ -0,0 +1,36 @@
+"""Script CLI để compile map.xlsx ra cache pickle (map.cache.pickle) cho lần load sau chỉ mất vài ms."""
+import argparse
+import pathlib
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile map.xlsx → cache pickle")
+    parser.add_argument("--xlsx", default=str(pathlib.Path(config.MAPPING_DIR) / "map.xlsx"))
+    parser.add_argument("--force", action="store_true", help="Compile lại kể cả khi cache còn khớp")
+    args = parser.parse_args()
+
+    xlsx_path = pathlib.Path(args.xlsx)
+    start = time.perf_counter()
+    cache_path = mapping.compile_mappings(xlsx_path, force=args.force)
+    if cache_path is None:
+        sys.exit(1)
+    print(f"Cache: {cache_path} ({time.perf_counter() - start:.2f}s)")
+
+    # Đo thời gian load từ cache
+    config.MAPPING_DIR = xlsx_path.parent
+    mapping._mappings_cache.clear()
+    start = time.perf_counter()
+    sheets = mapping._load_mappings()
+    print(f"Load từ cache: {(time.perf_counter() - start) * 1000:.1f} ms, {len(sheets)} sheets")
+
+
+if __name__ == "__main__":
+    main()
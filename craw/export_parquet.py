@@ -0,0 +1,90 @@
+"""Script CLI export các file kết quả JSON sẵn có sang dataset Parquet, hoặc truy vấn nhanh dataset đó.
+
+    python craw/export_parquet.py                                # backfill toàn bộ output/
+    python craw/export_parquet.py output/2025-11
+    python craw/export_parquet.py --query --where province_id=24 --where "price<5000000000"
+    python craw/export_parquet.py --compact 2025-11-20
+"""
+import argparse
+import json
+import pathlib
+import re
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, parquet_export
+from scraper.reexport import discover_files
+
+_WHERE_RE = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|=|<|>)\s*(.+?)\s*$")
+
+
+def _parse_where(text):
+    match = _WHERE_RE.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Điều kiện không hợp lệ: {text!r} (ví dụ province_id=24)")
+    column, op, raw = match.groups()
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return column, op, value
+
+
+def backfill(paths):
+    files = discover_files(paths or [config.OUTPUT_DIR])
+    total = 0
+    start = time.perf_counter()
+    for path in sorted(files):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = data.get("data", []) if isinstance(data, dict) else data
+        written = parquet_export.append_records(records, parquet_export.date_for_results_file(path))
+        total += written
+        print(f"  {path}: +{written}")
+    seconds = time.perf_counter() - start
+    print(f"\nĐã export {total} records từ {len(files)} file trong {seconds:.2f}s → {config.PARQUET_DIR}")
+
+
+def query(filters, columns, limit):
+    start = time.perf_counter()
+    table = parquet_export.read_table(filters, columns=columns)
+    seconds = time.perf_counter() - start
+    print(f"{table.num_rows} rows ({seconds * 1000:.1f} ms)")
+    for row in table.slice(0, limit).to_pylist():
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / truy vấn dataset Parquet")
+    parser.add_argument("paths", nargs="*", help=f"Thư mục hoặc file JSON (mặc định: {config.OUTPUT_DIR})")
+    parser.add_argument("--parquet-dir", default=None, help=f"Thư mục dataset (mặc định: {config.PARQUET_DIR})")
+    parser.add_argument("--query", action="store_true", help="Truy vấn dataset thay vì export")
+    parser.add_argument("--compact", metavar="YYYY-MM-DD", action="append", default=[],
+                        help="Gộp các file part của ngày này (có thể lặp lại)")
+    parser.add_argument("--where", action="append", type=_parse_where, default=[], help="Điều kiện, ví dụ province_id=24")
+    parser.add_argument("--columns", default="real_estate_code,date,province_id,district_id,price,area,title")
+    parser.add_argument("--limit", type=int, default=10, help="Số dòng in ra khi --query")
+    args = parser.parse_args()
+
+    if not parquet_export.available():
+        print("❌ Cần cài pyarrow: pip install pyarrow")
+        sys.exit(1)
+    if args.parquet_dir:
+        config.PARQUET_DIR = pathlib.Path(args.parquet_dir)
+
+    if args.compact:
+        for date in args.compact:
+            print(f"{date}: {parquet_export.compact(date)} rows")
+    elif args.query:
+        columns = [c.strip() for c in args.columns.split(",") if c.strip()] or None
+        query(args.where, columns, args.limit)
+    else:
+        backfill(args.paths)
+
+
+if __name__ == "__main__":
+    main()
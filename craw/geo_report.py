@@ -0,0 +1,133 @@
+"""Script CLI so sánh id hành chính lấy từ tọa độ (ranh giới offline) với id parse từ chuỗi địa chỉ.
+
+Đọc các file kết quả JSON (`{"data": [...]}` có lat_long + address_detail), với mỗi item chạy cả hai nhánh
+(geo.resolve_ids và storage._resolve_location_text), in tốc độ từng nhánh và tỉ lệ khớp theo cấp.
+
+    python craw/geo_report.py output/2025-11/*.json
+    python craw/geo_report.py output/2025-11 --boundaries output/boundaries
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+from collections import Counter
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, geo, storage
+
+LEVEL_KEYS = (("province", 0), ("district", 1), ("ward", 2))
+
+
+def _iter_files(paths):
+    for raw in paths:
+        path = pathlib.Path(raw)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.json"))
+        elif path.exists():
+            yield path
+
+
+def _iter_items(paths):
+    for path in _iter_files(paths):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Bỏ qua {path}: {e}")
+            continue
+        items = data.get("data", []) if isinstance(data, dict) else data
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict):
+                yield item
+
+
+def _text_ids(location):
+    try:
+        return storage._resolve_location_text(location)
+    except (IndexError, TypeError, ValueError, UnboundLocalError):
+        return None, None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh reverse geocoding (lat_long) với parse địa chỉ")
+    parser.add_argument("paths", nargs="+", help="File hoặc thư mục kết quả JSON")
+    parser.add_argument("--boundaries", default=None, help="Thư mục GeoJSON ranh giới (mặc định theo config)")
+    parser.add_argument("--mapping-dir", default=None, help="Thư mục map.xlsx / *_mapping.json (mặc định theo config)")
+    parser.add_argument("--limit", type=int, default=0, help="Chỉ xét tối đa N item (0 = tất cả)")
+    parser.add_argument("--show", type=int, default=10, help="In N ví dụ lệch cấp phường")
+    args = parser.parse_args()
+
+    if args.mapping_dir:
+        config.MAPPING_DIR = pathlib.Path(args.mapping_dir)
+    if args.boundaries:
+        config.BOUNDARIES_DIR = args.boundaries
+    if geo.get_resolver() is None:
+        print(f"❌ Không có file ranh giới trong {geo.boundaries_dir()}")
+        sys.exit(1)
+
+    items = [it for it in _iter_items(args.paths) if it.get("lat_long")]
+    if args.limit:
+        items = items[: args.limit]
+    if not items:
+        print("Không có item nào có lat_long")
+        return
+
+    start = time.perf_counter()
+    geo_rows = [geo.resolve_ids(it["lat_long"]) for it in items]
+    geo_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text_rows = [_text_ids(it.get("address_detail", "")) for it in items]
+    text_seconds = time.perf_counter() - start
+
+    counts = Counter()
+    mismatches = []
+    for item, geo_ids, text_ids in zip(items, geo_rows, text_rows):
+        if geo_ids is None:
+            counts["geo_miss"] += 1
+            continue
+        counts["geo_hit"] += 1
+        g_ids = storage._coerce_geo_ids(geo_ids)
+        if g_ids[1] is None or g_ids[2] is None:
+            # Trúng tỉnh nhưng thiếu quận / phường: transform điền cấp thiếu từ text nếu cùng tỉnh
+            counts["geo_partial"] += 1
+            if storage._fill_missing_levels(g_ids, text_ids)[1]:
+                counts["geo_partial_filled"] += 1
+        for level, i in LEVEL_KEYS:
+            if g_ids[i] is None:
+                counts[f"{level}_geo_missing"] += 1
+            elif text_ids[i] is None:
+                counts[f"{level}_text_missing"] += 1
+            elif str(text_ids[i]) == str(g_ids[i]):
+                counts[f"{level}_match"] += 1
+            else:
+                counts[f"{level}_mismatch"] += 1
+                if level == "ward" and len(mismatches) < args.show:
+                    mismatches.append((item.get("address_detail", ""), text_ids, g_ids))
+
+    n = len(items)
+    print(f"\n{'='*60}")
+    print(f"Item có lat_long: {n}")
+    print(f"Geo : {geo_seconds * 1e6 / n:8.1f} µs/item ({n / geo_seconds:,.0f} item/s), trúng {counts['geo_hit']}, trượt {counts['geo_miss']}")
+    print(f"      trúng một phần (thiếu quận / phường) {counts['geo_partial']}, điền được từ text {counts['geo_partial_filled']}")
+    print(f"Text: {text_seconds * 1e6 / n:8.1f} µs/item ({n / text_seconds:,.0f} item/s)")
+    hits = counts["geo_hit"] or 1
+    for level, _ in LEVEL_KEYS:
+        print(
+            f"  {level:<9} khớp {counts[f'{level}_match'] / hits:6.1%}  lệch {counts[f'{level}_mismatch'] / hits:6.1%}"
+            f"  text không ra {counts[f'{level}_text_missing'] / hits:6.1%}"
+            f"  geo không ra {counts[f'{level}_geo_missing'] / hits:6.1%}"
+        )
+    if mismatches:
+        print("\nVí dụ lệch cấp phường (địa chỉ | text | geo):")
+        for address, text_ids, g_ids in mismatches:
+            print(f"  {address} | {text_ids} | {g_ids}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Script CLI để lập kế hoạch shard (band giá/diện tích) cho category lớn và crawl/resume các shard."""
+import argparse
+import json
+import pathlib
+import sys
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config
+from scraper.browser import init_driver
+from scraper.sharding import (
+    coverage_report,
+    crawl_shard_plan,
+    load_done_shards,
+    load_plan,
+    make_driver_probe,
+    plan_shards,
+    save_plan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard planner cho category lớn")
+    parser.add_argument("--debugger-address", default=config.DEBUGGER_ADDRESS)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_plan = sub.add_parser("plan", help="Probe số kết quả và lập plan shard")
+    p_plan.add_argument("base_url")
+    p_plan.add_argument("--max-results", type=int, default=config.SHARD_MAX_RESULTS)
+    p_plan.add_argument("--output", default=None)
+
+    p_crawl = sub.add_parser("crawl", help="Crawl các shard chưa xong của plan")
+    p_crawl.add_argument("plan")
+    p_crawl.add_argument("--worker-index", type=int, default=0)
+    p_crawl.add_argument("--worker-count", type=int, default=1)
+    p_crawl.add_argument("--max-pages", type=int, default=None, help="Mặc định: không giới hạn (crawl hết shard)")
+    p_crawl.add_argument("--max-items-per-page", type=int, default=None, help="Mặc định: không giới hạn")
+    p_crawl.add_argument("--incremental", action="store_true")
+
+    p_report = sub.add_parser("report", help="In báo cáo độ phủ và tiến độ")
+    p_report.add_argument("plan")
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        driver, _ = init_driver(args.debugger_address, config.PAGE_LOAD_TIMEOUT, config.WAIT_TIMEOUT)
+        try:
+            plan = plan_shards(args.base_url, make_driver_probe(driver), max_results=args.max_results)
+        finally:
+            driver.quit()
+        path = save_plan(plan, args.output)
+        print(json.dumps(plan["report"], ensure_ascii=False, indent=2))
+        print(f"Đã lưu plan {len(plan['shards'])} shard vào {path}")
+
+    elif args.command == "crawl":
+        result = crawl_shard_plan(
+            args.plan,
+            filters={"max_pages": args.max_pages, "max_items_per_page": args.max_items_per_page},
+            debugger_address=args.debugger_address,
+            worker_index=args.worker_index,
+            worker_count=args.worker_count,
+            incremental=args.incremental,
+        )
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    elif args.command == "report":
+        plan = load_plan(args.plan)
+        report = coverage_report(plan)
+        report["done"] = len(load_done_shards(args.plan))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
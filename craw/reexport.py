@@ -0,0 +1,60 @@
+"""Script CLI re-export các file kết quả cũ bằng process pool (xem scraper/reexport.py)."""
+import argparse
+import pathlib
+import sys
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, reexport
+
+
+def _print_result(result):
+    if result["status"] == "ok":
+        rate = result["items"] / result["seconds"] if result["seconds"] else 0
+        print(f"  ✅ {result['source']}: {result['items']} item, {result['seconds']:.2f}s ({rate:,.0f} item/s)")
+    else:
+        print(f"  ❌ {result['source']}: {result.get('error')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-export output/YYYY-MM/*.json sau khi transform / mapping thay đổi")
+    parser.add_argument("paths", nargs="*", help=f"Thư mục hoặc file kết quả (mặc định: {config.OUTPUT_DIR})")
+    parser.add_argument("--dest", default=None, help="Ghi ra thư mục khác thay vì ghi đè tại chỗ")
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định: số CPU)")
+    parser.add_argument("--mapping-dir", default=None, help="Thư mục map.xlsx / *_mapping.json (mặc định theo config)")
+    parser.add_argument("--boundaries", default=None, help="Thư mục GeoJSON ranh giới (mặc định theo config)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=0, help="Chỉ export tối đa N file (0 = tất cả)")
+    parser.add_argument("--no-resume", action="store_true", help="Export lại cả các file đã xong trong manifest")
+    parser.add_argument("--manifest", default=None, help=f"File manifest (mặc định: <dest hoặc root>/{reexport.MANIFEST_NAME})")
+    args = parser.parse_args()
+
+    if args.mapping_dir:
+        config.MAPPING_DIR = pathlib.Path(args.mapping_dir)
+    if args.boundaries:
+        config.BOUNDARIES_DIR = args.boundaries
+
+    summary = reexport.reexport(
+        roots=args.paths,
+        dest=args.dest,
+        workers=args.workers,
+        resume=not args.no_resume,
+        chunk_size=args.chunk_size,
+        limit=args.limit,
+        manifest=args.manifest,
+        on_result=_print_result,
+    )
+    print(f"\n{'='*60}")
+    print(f"File: {summary['files_ok']} ok, {summary['files_failed']} lỗi, {summary['files_skipped']} bỏ qua (đã xong)")
+    if summary.get("items_per_sec") is not None:
+        print(f"Item: {summary['items']} trong {summary['seconds']:.2f}s ({summary['items_per_sec']:,.0f} item/s)")
+    print(f"Manifest: {summary['manifest']}")
+    print(f"{'='*60}")
+    if summary["files_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Script CLI quản lý index pid / href đã scrape (Bloom filter + SQLite, config.SEEN_DIR).
+
+    python craw/seen_index.py sync                  # index các file kết quả mới / đã đổi
+    python craw/seen_index.py rebuild --capacity 2000000
+    python craw/seen_index.py stats --probes 200000 # kích thước, độ đầy, tỉ lệ dương tính giả ước tính / đo được
+    python craw/seen_index.py check 12345678 https://batdongsan.com.vn/...
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scraper import config, seen_set
+
+
+def _print_stats(index: seen_set.SeenIndex, probes: int):
+    stats = index.stats()
+    print(f"Thư mục: {stats['directory']}  ({stats['sources']} file kết quả đã index, SQLite {stats['db_bytes'] / 1e6:.2f} MB)")
+    for kind in seen_set.KINDS:
+        s = stats[kind]
+        line = (
+            f"  {kind:<5} {s['keys']:>10} key / capacity {s['capacity']:<10} Bloom {s['bloom_bytes'] / 1e6:.2f} MB, "
+            f"k={s['k']}, đầy {s['fill_ratio']:.1%}, FP ước tính {s['estimated_fp_rate']:.4%}"
+        )
+        if probes:
+            line += f", FP đo được {index.measure_fp_rate(kind, probes):.4%} ({probes} probe)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index pid / href đã scrape (Bloom filter + SQLite)")
+    parser.add_argument("command", choices=("sync", "rebuild", "stats", "check"))
+    parser.add_argument("keys", nargs="*", help="pid hoặc href cần kiểm tra (lệnh check)")
+    parser.add_argument("--dir", default=str(config.SEEN_DIR), help="Thư mục index")
+    parser.add_argument("--output-dir", default=str(config.OUTPUT_DIR), help="Thư mục file kết quả")
+    parser.add_argument("--capacity", type=int, default=None, help="Capacity Bloom khi rebuild (mặc định 2× số key)")
+    parser.add_argument("--fp-rate", type=float, default=None, help=f"Tỉ lệ dương tính giả mục tiêu (mặc định {config.SEEN_FP_RATE})")
+    parser.add_argument("--probes", type=int, default=100_000, help="Số key ngẫu nhiên để đo FP (stats; 0 = bỏ qua)")
+    parser.add_argument("--json", action="store_true", help="In stats dạng JSON")
+    args = parser.parse_args()
+
+    index = seen_set.SeenIndex(args.dir, fp_rate=args.fp_rate)
+    try:
+        start = time.perf_counter()
+        if args.command in ("sync", "rebuild"):
+            if args.command == "sync":
+                result = index.sync(args.output_dir)
+            else:
+                result = index.rebuild(args.output_dir, capacity=args.capacity)
+            print(f"{args.command}: +{result['keys']} key từ {result['files']} file trong {time.perf_counter() - start:.2f}s")
+            _print_stats(index, 0)
+        elif args.command == "stats":
+            if args.json:
+                stats = index.stats()
+                for kind in seen_set.KINDS:
+                    stats[kind]["measured_fp_rate"] = index.measure_fp_rate(kind, args.probes) if args.probes else None
+                print(json.dumps(stats, ensure_ascii=False, indent=2))
+            else:
+                _print_stats(index, args.probes)
+        else:
+            for key in args.keys:
+                kind = "href" if "/" in key else "pid"
+                print(f"{key}: {'đã scrape' if key in index.sets[kind] else 'chưa có'} ({kind})")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -87,12 +87,21 @@ def run_crawler_with_config(config_data, status_callback=None):
     filters["max_pages"] = int(config_data.get("max_pages", config.MAX_PAGES))
     filters["max_items_per_page"] = int(config_data.get("max_items_per_page", config.MAX_ITEMS_PER_PAGE))
     
+    # Nhiều Chrome: địa chỉ phân cách bằng dấu phẩy; để trống → fleet (SCRAPER_FLEET) hoặc config.DEBUGGER_ADDRESS
+    addresses = [a.strip() for a in (config_data.get("debugger_address") or "").split(",") if a.strip()]
+    debugger_address = addresses if len(addresses) > 1 else (addresses[0] if addresses else None)
+
     # Chạy scraper với filter
     result = run_scraper(
         base_urls=base_urls,
         filters=filters,
-        debugger_address=config_data.get("debugger_address", config.DEBUGGER_ADDRESS),
-        status_callback=status_callback
+        debugger_address=debugger_address,
+        status_callback=status_callback,
+        incremental=bool(config_data.get("incremental")),
+        sitemap_source=(config_data.get("sitemap_source") or "").strip() or None,
+        trace=bool(config_data.get("trace")) or None,
+        profile=config_data.get("profile") or None,
+        engine=(config_data.get("engine") or "").strip() or None,
     )
     
     
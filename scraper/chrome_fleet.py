@@ -0,0 +1,421 @@
+"""Đội Chrome headless do scraper tự launch và giám sát (engine selenium, nhiều worker).
+
+Engine selenium vốn gắn vào một Chrome mở tay ở config.DEBUGGER_ADDRESS: một process, chết là dừng job, bộ nhớ
+phình không ai để ý. ChromeFleet launch N Chrome, mỗi cái một cổng remote-debugging (FLEET_BASE_PORT + i) và một
+--user-data-dir riêng (cookie / cache không dùng chung), rồi một thread giám sát mỗi FLEET_CHECK_INTERVAL giây:
+
+  - process đã thoát → launch lại (backoff 1, 2, 4 ... 60 giây nếu chết liên tục);
+  - /json/version không trả lời trong FLEET_START_TIMEOUT sau khi launch → kill rồi launch lại;
+  - RSS cả cây process (browser + renderer + GPU, đọc /proc) vượt FLEET_MEMORY_MB hai lần liên tiếp → restart.
+    Không dùng RLIMIT_AS: Chrome giữ trước hàng chục GB địa chỉ ảo, giới hạn đó làm Chrome không khởi động được.
+
+Có cấu hình proxy (scraper.egress_pool) thì mỗi Chrome launch với --proxy-server là proxy dính với address của
+nó; proxy bị cho nghỉ / cách ly (CAPTCHA) → Chrome được launch lại qua proxy khác, hết proxy khả dụng thì chờ
+backoff. --proxy-server không nhận user / password: proxy cần xác thực phải đặt sau một forwarder cục bộ.
+
+Chrome restart đổi id browser trên /json/version nên session_pool tự kết nối lại phiên ở lần probe kế tiếp.
+addresses() trả danh sách debugger address đang sẵn sàng, run_scraper dùng làm tập worker
+(xem runner.scrape_urls_parallel).
+
+    with ChromeFleet(size=4) as fleet:
+        run_scraper(urls, debugger_address=fleet.addresses())
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import config, egress_pool, metrics
+from .session_pool import debugger_browser_id
+
+CHROME_CANDIDATES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def find_chrome_binary() -> Optional[str]:
+    """config.FLEET_CHROME_BINARY nếu có, không thì Chrome / Chromium đầu tiên tìm thấy trong PATH."""
+    if config.FLEET_CHROME_BINARY:
+        return config.FLEET_CHROME_BINARY
+    for name in CHROME_CANDIDATES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """Tổng RSS (MB) của process và mọi process con, đọc từ /proc; None nếu không đọc được (không phải Linux)."""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # comm nằm trong ngoặc và có thể chứa khoảng trắng: ppid là trường thứ hai sau dấu ')' cuối
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            if current == pid:
+                return None
+            continue
+        stack.extend(children.get(current, ()))
+    return round(total / (1024 * 1024), 1)
+
+
+class ChromeInstance:
+    def __init__(self, index: int, port: int, profile_dir: Path):
+        self.index = index
+        self.port = port
+        self.profile_dir = profile_dir
+        self.process: Optional[subprocess.Popen] = None
+        self.state = "stopped"        # starting | ready | backoff | stopped
+        self.started_at: Optional[float] = None
+        self.next_start_at = 0.0
+        self.restarts = 0
+        self.consecutive_failures = 0
+        self.over_memory = 0          # số lần kiểm tra liên tiếp vượt trần RSS
+        self.rss_mb: Optional[float] = None
+        self.browser_id: Optional[str] = None
+        self.last_exit: Optional[str] = None
+        self.proxy: Optional[str] = None
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "address": self.address,
+            "pid": self.process.pid if self.process is not None else None,
+            "state": self.state,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.state == "ready" else None,
+            "rss_mb": self.rss_mb,
+            "proxy": self.proxy,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+        }
+
+
+class ChromeFleet:
+    """
+    N Chrome headless, mỗi cái một cổng debugger và một profile, được giám sát và launch lại khi chết / phình RAM.
+
+        fleet = ChromeFleet(size=4).start()
+        try:
+            addresses = fleet.addresses()   # ["127.0.0.1:9300", ...]
+        finally:
+            fleet.stop()
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        binary: Optional[str] = None,
+        base_port: Optional[int] = None,
+        profile_dir=None,
+        headless: Optional[bool] = None,
+        memory_mb: Optional[int] = None,
+        check_interval: Optional[float] = None,
+        extra_args: Optional[List[str]] = None,
+    ):
+        self.size = config.FLEET_SIZE if size is None else size
+        if self.size < 1:
+            raise ValueError(f"size phải >= 1, nhận được: {self.size}")
+        self.binary = binary or find_chrome_binary()
+        if not self.binary:
+            raise FileNotFoundError(
+                f"Không tìm thấy Chrome ({', '.join(CHROME_CANDIDATES)}); đặt SCRAPER_CHROME_BINARY hoặc truyền binary="
+            )
+        self.base_port = config.FLEET_BASE_PORT if base_port is None else base_port
+        self.profile_dir = Path(profile_dir or config.FLEET_PROFILE_DIR)
+        self.headless = config.FLEET_HEADLESS if headless is None else headless
+        self.memory_mb = config.FLEET_MEMORY_MB if memory_mb is None else memory_mb
+        self.check_interval = config.FLEET_CHECK_INTERVAL if check_interval is None else check_interval
+        self.extra_args = list(extra_args or [])
+        self.instances = [
+            ChromeInstance(i, self.base_port + i, self.profile_dir / f"chrome-{i}") for i in range(self.size)
+        ]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+
+    # -----------------------------------------------------------------------
+    # Vòng đời
+    # -----------------------------------------------------------------------
+
+    def command(self, instance: ChromeInstance) -> List[str]:
+        args = [
+            self.binary,
+            f"--remote-debugging-port={instance.port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={instance.profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-dev-shm-usage",
+            "--disable-blink-features=AutomationControlled",
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        if instance.proxy:
+            args.append(f"--proxy-server={instance.proxy}")
+        if self.memory_mb:
+            # Heap V8 của mỗi renderer; trần cả cây process do vòng giám sát giữ
+            args.append(f"--js-flags=--max-old-space-size={max(self.memory_mb // 2, 128)}")
+        return args + self.extra_args + ["about:blank"]
+
+    def start(self, wait: bool = True) -> "ChromeFleet":
+        """Launch mọi Chrome và thread giám sát; `wait=True` chờ tới khi tất cả sẵn sàng (hoặc hết FLEET_START_TIMEOUT)."""
+        self._stop.clear()
+        with self._lock:
+            for instance in self.instances:
+                self._launch(instance)
+        self._supervisor = threading.Thread(target=self._supervise, name="chrome-fleet", daemon=True)
+        self._supervisor.start()
+        if wait:
+            self.wait_ready()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=self.check_interval + 5)
+            self._supervisor = None
+        egress = egress_pool.shared_pool()
+        with self._lock:
+            processes = []
+            for instance in self.instances:
+                processes.append(instance.process)
+                instance.process = None
+                instance.state = "stopped"
+                if egress is not None:
+                    egress.release(instance.address)
+        for process in processes:
+            self._kill(process)
+
+    def __enter__(self) -> "ChromeFleet":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> List[str]:
+        """Chờ mọi Chrome trả lời /json/version; trả về các address đã sẵn sàng khi hết giờ."""
+        deadline = time.monotonic() + (config.FLEET_START_TIMEOUT if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            with self._lock:
+                if all(instance.state == "ready" for instance in self.instances):
+                    break
+                starting = [(i, i.process) for i in self.instances if i.state == "starting"]
+            for instance, process in starting:
+                self._check_ready(instance, process)
+            time.sleep(0.2)
+        ready = self.addresses()
+        if len(ready) < self.size:
+            print(f"[ChromeFleet] {len(ready)}/{self.size} Chrome sẵn sàng sau khi chờ")
+        return ready
+
+    def addresses(self, ready_only: bool = True) -> List[str]:
+        with self._lock:
+            return [i.address for i in self.instances if i.state == "ready" or not ready_only]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "ready": sum(1 for i in self.instances if i.state == "ready"),
+                "memory_mb": self.memory_mb,
+                "instances": [i.stats() for i in self.instances],
+            }
+
+    # -----------------------------------------------------------------------
+    # Process
+    # -----------------------------------------------------------------------
+
+    def _launch(self, instance: ChromeInstance) -> None:
+        egress = egress_pool.shared_pool()
+        if egress is not None:
+            try:
+                instance.proxy = egress.assign(instance.address).server
+            except egress_pool.EgressUnavailable as e:
+                instance.last_exit = f"egress: {e}"
+                self._schedule_restart(instance)
+                return
+        instance.profile_dir.mkdir(parents=True, exist_ok=True)
+        # Chrome bị kill để lại SingletonLock trỏ về pid cũ, lần launch sau sẽ từ chối profile
+        for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+            try:
+                (instance.profile_dir / name).unlink()
+            except OSError:
+                pass
+        try:
+            instance.process = subprocess.Popen(
+                self.command(instance),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,  # nhóm process riêng: kill cả renderer / GPU cùng lúc
+            )
+        except OSError as e:
+            instance.process = None
+            instance.last_exit = f"launch: {e}"[:300]
+            self._schedule_restart(instance)
+            return
+        instance.state = "starting"
+        instance.started_at = time.time()
+        instance.browser_id = None
+        instance.over_memory = 0
+        instance.rss_mb = None
+
+    @staticmethod
+    def _kill(process: Optional[subprocess.Popen], grace: float = 5.0) -> None:
+        """SIGTERM cả nhóm process, SIGKILL sau `grace` giây. Gọi ngoài self._lock (có thể chờ vài giây)."""
+        if process is None or process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+        except ProcessLookupError:
+            pass
+
+    def _schedule_restart(self, instance: ChromeInstance) -> None:
+        instance.consecutive_failures += 1
+        delay = min(2 ** (instance.consecutive_failures - 1), 60)
+        instance.state = "backoff"
+        instance.next_start_at = time.monotonic() + delay
+        print(f"[ChromeFleet] {instance.address}: {instance.last_exit}; launch lại sau {delay}s")
+
+    def _restart(self, instance: ChromeInstance, process: subprocess.Popen, reason: str) -> None:
+        """Đưa instance về backoff (không còn trong addresses()) rồi kill `process` ngoài lock."""
+        with self._lock:
+            if instance.process is not process:
+                return  # đã được launch lại / dừng trong lúc kiểm tra
+            instance.process = None
+            instance.restarts += 1
+            instance.last_exit = reason
+            self._schedule_restart(instance)
+        metrics.inc("scraper_fleet_restarts_total", reason=reason.split(":", 1)[0])
+        self._kill(process)
+
+    def _check_ready(self, instance: ChromeInstance, process: subprocess.Popen) -> bool:
+        browser_id = debugger_browser_id(instance.address, config.SESSION_PROBE_TIMEOUT)
+        if browser_id is None:
+            return False
+        with self._lock:
+            if instance.process is process and instance.state == "starting":
+                instance.state = "ready"
+                instance.browser_id = browser_id
+                instance.consecutive_failures = 0
+        return True
+
+    # -----------------------------------------------------------------------
+    # Giám sát
+    # -----------------------------------------------------------------------
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            for instance in self.instances:
+                if self._stop.is_set():
+                    return
+                try:
+                    self._check(instance)
+                except Exception as e:  # giám sát không được chết vì một instance
+                    print(f"[ChromeFleet] {instance.address}: lỗi giám sát: {e}")
+
+    def _check(self, instance: ChromeInstance) -> None:
+        # Chỉ đọc / ghi trạng thái dưới lock; probe HTTP, quét /proc và kill nằm ngoài để addresses() / stats()
+        # (/api/status, runner.worker_addresses) không phải chờ
+        with self._lock:
+            if instance.state == "backoff":
+                if time.monotonic() >= instance.next_start_at:
+                    self._launch(instance)
+                return
+            state, process, started_at, proxy = instance.state, instance.process, instance.started_at, instance.proxy
+        if process is None:
+            return
+        code = process.poll()
+        if code is not None:
+            self._restart(instance, process, f"exit: mã {code}")
+            return
+        if state == "starting":
+            if not self._check_ready(instance, process) and time.time() - started_at > config.FLEET_START_TIMEOUT:
+                self._restart(instance, process, "start: /json/version không trả lời")
+            return
+
+        egress = egress_pool.shared_pool()
+        if egress is not None and not egress.usable(instance.address):
+            self._restart(instance, process, f"egress: proxy {proxy} đang nghỉ / bị cách ly")
+            return
+
+        rss_mb = process_tree_rss_mb(process.pid)
+        reason = None
+        with self._lock:
+            if instance.process is not process:
+                return
+            instance.rss_mb = rss_mb
+            if self.memory_mb and rss_mb is not None and rss_mb > self.memory_mb:
+                instance.over_memory += 1
+                if instance.over_memory >= 2:
+                    reason = f"memory: {rss_mb} MB > {self.memory_mb} MB"
+            else:
+                instance.over_memory = 0
+        if reason is None and debugger_browser_id(instance.address, config.SESSION_PROBE_TIMEOUT) is None:
+            reason = "probe: /json/version không trả lời"
+        if reason is not None:
+            self._restart(instance, process, reason)
+
+
+_shared: Optional[ChromeFleet] = None
+_shared_lock = threading.Lock()
+
+
+def shared_fleet() -> ChromeFleet:
+    """Fleet dùng chung trong process (config.FLEET_SIZE Chrome), launch khi gọi lần đầu, dừng lúc thoát."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ChromeFleet().start()
+        return _shared
+
+
+def fleet_stats() -> Optional[Dict[str, Any]]:
+    with _shared_lock:
+        return _shared.stats() if _shared is not None else None
+
+
+@atexit.register
+def stop_shared() -> None:
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.stop()
+            _shared = None
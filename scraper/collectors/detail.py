@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import os
 import re
+from contextlib import contextmanager
 from typing import Callable
 
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from .. import utils
+from .. import egress_pool, metrics, tracing, utils
 
 
 def clean_image_url(url: str | None):
@@ -25,16 +26,56 @@ def _scroll_detail(driver, steps: int, human_sleep: Callable[[float, float], Non
         human_sleep(0.5, 2.0)
 
 
-def _extract_short_info(driver):
+_RE_AREA = re.compile(r'\b[0-9]+(?:[.,][0-9]+)?\s*(m²|m2|m)\b', re.IGNORECASE)
+_RE_PRICE_PER_M2 = re.compile(r'(tỷ|triệu|đ|vnđ|dong)[^/]*(/m2|/m²|/m)', re.IGNORECASE)
+_RE_PRICE = re.compile(r'\b[0-9]+(?:[.,][0-9]+)?\s*(tỷ|triệu|đ|vnđ)\b', re.IGNORECASE)
+
+
+def classify_short_info(rows):
+    """
+    (price, area, price_per_m2) từ các ô short info, mỗi ô là (value, ext, full_text) đã lower().
+    Dùng chung cho Selenium và engine Playwright (scraper.playwright_engine).
+    """
     price = ""
     price_per_m2 = ""
     area = ""
 
-    # Regex nhận dạng
-    re_area = re.compile(r'\b[0-9]+(?:[.,][0-9]+)?\s*(m²|m2|m)\b', re.IGNORECASE)
-    re_price_per_m2 = re.compile(r'(tỷ|triệu|đ|vnđ|dong)[^/]*(/m2|/m²|/m)', re.IGNORECASE)
-    re_price = re.compile(r'\b[0-9]+(?:[.,][0-9]+)?\s*(tỷ|triệu|đ|vnđ)\b', re.IGNORECASE)
+    for value, ext, full_text in rows:
+        candidates = [value, ext, full_text]
+
+        # =======================
+        #    DIỆN TÍCH (area)
+        # =======================
+        if not area:
+            for text in candidates:
+                m = _RE_AREA.search(text)
+                if m:
+                    area = m.group(0)
+                    break
+
+        # =======================
+        #    GIÁ/M² (price_per_m2)
+        # =======================
+        if not price_per_m2:
+            for text in candidates:
+                if _RE_PRICE_PER_M2.search(text) or "/m" in text:
+                    price_per_m2 = text.strip()
+                    break
+
+        # =======================
+        #    GIÁ TỔNG (price)
+        # =======================
+        if not price:
+            for text in candidates:
+                # phải chứa đơn vị tiền nhưng KHÔNG được chứa /m
+                if _RE_PRICE.search(text) and "/m" not in text:
+                    price = text.strip()
+                    break
+
+    return price, area, price_per_m2
+
 
+def _iter_short_info_rows(driver):
     try:
         items = driver.find_elements(By.CSS_SELECTOR, ".re__pr-short-info .re__pr-short-info-item")
 
@@ -52,41 +93,14 @@ def _extract_short_info(driver):
             except:
                 ext = ""
 
-            candidates = [value, ext, full_text]
-
-            # =======================
-            #    DIỆN TÍCH (area)
-            # =======================
-            if not area:
-                for text in candidates:
-                    m = re_area.search(text)
-                    if m:
-                        area = m.group(0)
-                        break
-
-            # =======================
-            #    GIÁ/M² (price_per_m2)
-            # =======================
-            if not price_per_m2:
-                for text in candidates:
-                    if re_price_per_m2.search(text) or "/m" in text:
-                        price_per_m2 = text.strip()
-                        break
-
-            # =======================
-            #    GIÁ TỔNG (price)
-            # =======================
-            if not price:
-                for text in candidates:
-                    # phải chứa đơn vị tiền nhưng KHÔNG được chứa /m
-                    if re_price.search(text) and "/m" not in text:
-                        price = text.strip()
-                        break
+            yield value, ext, full_text
 
     except:
         pass
 
-    return price, area, price_per_m2
+
+def _extract_short_info(driver):
+    return classify_short_info(_iter_short_info_rows(driver))
 
 
 
@@ -176,54 +190,55 @@ def _extract_phone(driver, wait, human_sleep: Callable[[float, float], None]):
     return "", contact_name
 
 
-def _extract_map(driver, wait):
-    map_coords = ""
-    map_link = ""
-    map_dms = ""
+def parse_map_link(map_link: str):
+    """(map_coords, map_link, map_dms) từ src của iframe Google Maps ("" nếu không đọc được tọa độ)."""
+    if not map_link:
+        return "", "", ""
+
+    # Pattern 1: Google Maps embed với !3d và !4d (ví dụ: ...!3d21.1136798508057!4d105.495305786485)
+    match = re.search(r'!3d([0-9\.\-]+)!4d([0-9\.\-]+)', map_link)
+    if match:
+        lat_str, lng_str = match.group(1), match.group(2)
+    else:
+        # Pattern 2: Google Maps embed với q=lat,lng (ví dụ: ...?q=21.1136798508057,105.495305786485&key=...)
+        match2 = re.search(r'q=([0-9\.\-]+),([0-9\.\-]+)', map_link)
+        if match2:
+            lat_str, lng_str = match2.group(1), match2.group(2)
+        else:
+            return "", map_link, ""
+
+    # Chuyển đổi sang float và kiểm tra tính hợp lệ
+    try:
+        lat = float(lat_str)
+        lng = float(lng_str)
+    except (ValueError, TypeError):
+        # Không thể chuyển đổi sang float
+        return "", map_link, ""
+
+    # Kiểm tra phạm vi hợp lệ (lat: -90 đến 90, lng: -180 đến 180)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        # Tọa độ ngoài phạm vi hợp lệ
+        return "", map_link, ""
+
+    map_coords = f"{lat},{lng}"
+    try:
+        map_dms = utils.format_dms(lat, lng)
+    except Exception:
+        map_dms = ""
+    return map_coords, map_link, map_dms
+
 
+def _extract_map(driver, wait):
     try:
         iframe = wait.until(EC.presence_of_element_located(
             (By.CSS_SELECTOR, "div.re__pr-map iframe")
         ))
-
         map_link = iframe.get_attribute("src") or iframe.get_attribute("data-src") or ""
-        
-        if not map_link:
-            return "", "", ""
-
-        # Pattern 1: Google Maps embed với !3d và !4d (ví dụ: ...!3d21.1136798508057!4d105.495305786485)
-        match = re.search(r'!3d([0-9\.\-]+)!4d([0-9\.\-]+)', map_link)
-        if match:
-            lat_str, lng_str = match.group(1), match.group(2)
-        else:
-            # Pattern 2: Google Maps embed với q=lat,lng (ví dụ: ...?q=21.1136798508057,105.495305786485&key=...)
-            match2 = re.search(r'q=([0-9\.\-]+),([0-9\.\-]+)', map_link)
-            if match2:
-                lat_str, lng_str = match2.group(1), match2.group(2)
-            else:
-                return "", map_link, ""
-
-        # Chuyển đổi sang float và kiểm tra tính hợp lệ
-        try:
-            lat = float(lat_str)
-            lng = float(lng_str)
-            
-            # Kiểm tra phạm vi hợp lệ (lat: -90 đến 90, lng: -180 đến 180)
-            if -90 <= lat <= 90 and -180 <= lng <= 180:
-                map_coords = f"{lat},{lng}"
-                map_dms = utils.format_dms(lat, lng)
-            else:
-                # Tọa độ ngoài phạm vi hợp lệ
-                return "", map_link, ""
-        except (ValueError, TypeError):
-            # Không thể chuyển đổi sang float
-            return "", map_link, ""
-
     except Exception:
         # Không tìm thấy iframe hoặc lỗi khác
-        pass
+        return "", "", ""
 
-    return map_coords, map_link, map_dms
+    return parse_map_link(map_link)
 
 
 
@@ -264,12 +279,90 @@ def _extract_pricing(driver, wait):
 
 
 
+def is_captcha_page(url: str, page_source: str) -> bool:
+    return "captcha" in (url or "").lower() or "captcha" in (page_source or "")[:3000].lower()
+
+
+def fill_item_from_snapshot(item: dict, snapshot: dict) -> dict:
+    """
+    Điền item từ snapshot trang detail đọc một lần bằng JS (engine Playwright), cùng selector và cùng quy tắc
+    như các hàm _extract_* dùng với Selenium. Khóa của snapshot:
+        title, address, description, contact_name, map_link: str
+        short_info: [[value, ext, full_text], ...]   specs, config: {tiêu đề: giá trị}   images: [src, ...]
+    """
+    item["title"] = snapshot.get("title") or ""
+
+    specs_map = snapshot.get("specs") or {}
+    price, area, price_per_m2 = classify_short_info(
+        (value.lower(), ext.lower(), full_text.lower()) for value, ext, full_text in snapshot.get("short_info") or []
+    )
+    if not price and ("Khoảng giá" in specs_map):
+        price = specs_map.get("Khoảng giá", "")
+    if not area and ("Diện tích" in specs_map):
+        area = specs_map.get("Diện tích", "")
+    if not price_per_m2 and ("Giá/m²" in specs_map):
+        price_per_m2 = specs_map.get("Giá/m²", "")
+    item["price"] = price
+    item["area"] = area
+    item["price_per_m2"] = price_per_m2
+
+    item["location"] = snapshot.get("address") or ""
+    item["description"] = snapshot.get("description") or ""
+
+    images: list[str] = []
+    for src in snapshot.get("images") or []:
+        clean_src = clean_image_url(src)
+        if clean_src and clean_src not in images:
+            images.append(clean_src)
+    item["images"] = images
+
+    config = snapshot.get("config") or {}
+    item["config"] = config
+    item["posted_date"] = config.get("Ngày đăng", "")
+    item["expiration_date"] = config.get("Ngày hết hạn", "")
+
+    item["specs"] = specs_map
+    item["agent_phone"] = ""
+    item["agent_name"] = snapshot.get("contact_name") or ""
+
+    item["map_coords"], item["map_link"], item["map_dms"] = parse_map_link(snapshot.get("map_link") or "")
+    return item
+
+
 def open_detail_and_extract(
     driver,
     wait,
     item: dict,
     *,
-    current_list_url: str,
+    current_list_url: str | None,
+    screenshot_dir: str,
+    detail_scroll_steps: int,
+    human_sleep: Callable[[float, float], None],
+):
+    with metrics.timer("scraper_detail_seconds"):
+        return _open_detail_and_extract(
+            driver,
+            wait,
+            item,
+            current_list_url=current_list_url,
+            screenshot_dir=screenshot_dir,
+            detail_scroll_steps=detail_scroll_steps,
+            human_sleep=human_sleep,
+        )
+
+
+@contextmanager
+def _extractor_timer(name: str):
+    with tracing.span(name), metrics.timer("scraper_detail_extractor_seconds", extractor=name):
+        yield
+
+
+def _open_detail_and_extract(
+    driver,
+    wait,
+    item: dict,
+    *,
+    current_list_url: str | None,
     screenshot_dir: str,
     detail_scroll_steps: int,
     human_sleep: Callable[[float, float], None],
@@ -278,36 +371,45 @@ def open_detail_and_extract(
     pid = item["pid"]
     print(f"  -> Opening detail: {href}")
 
-    try:
-        driver.get(href)
-    except WebDriverException:
-        driver.get(href)
+    with tracing.span("navigate"), metrics.timer("scraper_page_load_seconds", kind="detail"):
+        try:
+            driver.get(href)
+        except WebDriverException:
+            egress_pool.report(driver, "error")
+            driver.get(href)
     human_sleep(3, 5)
 
-    _scroll_detail(driver, detail_scroll_steps, human_sleep)
-
-    cur_url = driver.current_url.lower()
-    page_source = driver.page_source.lower()
+    with _extractor_timer("_scroll_detail"):
+        _scroll_detail(driver, detail_scroll_steps, human_sleep)
 
-    if "captcha" in cur_url or "captcha" in page_source[:3000]:
+    if is_captcha_page(driver.current_url, driver.page_source):
         fname = os.path.join(screenshot_dir, f"captcha_detail_{pid}.png")
         try:
             driver.save_screenshot(fname)
         except Exception:
             pass
         print("CAPTCHA detected:", href)
-        driver.get(current_list_url)
-        human_sleep(2, 4)
+        metrics.inc("scraper_captcha_total", stage="detail")
+        # Hạ điểm / cho nghỉ proxy của phiên này; Chrome của fleet sẽ được launch lại qua proxy khác
+        egress_pool.report(driver, "captcha")
+        if current_list_url:
+            with tracing.span("back", captcha=True):
+                driver.get(current_list_url)
+                human_sleep(2, 4)
         return item
+    egress_pool.report(driver, "ok")
 
-    try:
-        title_el = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.re__pr-title")))
-        item["title"] = title_el.text.strip()
-    except Exception:
-        item["title"] = ""
+    with _extractor_timer("title"):
+        try:
+            title_el = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.re__pr-title")))
+            item["title"] = title_el.text.strip()
+        except Exception:
+            item["title"] = ""
 
-    price, area, price_per_m2 = _extract_short_info(driver)
-    specs_map = _extract_specs(driver)
+    with _extractor_timer("_extract_short_info"):
+        price, area, price_per_m2 = _extract_short_info(driver)
+    with _extractor_timer("_extract_specs"):
+        specs_map = _extract_specs(driver)
 
     if not price and ("Khoảng giá" in specs_map):
         price = specs_map.get("Khoảng giá", "")
@@ -320,37 +422,43 @@ def open_detail_and_extract(
     item["area"] = area
     item["price_per_m2"] = price_per_m2
 
-    try:
-        addr_el = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "#product-detail-web span.re__pr-short-description.js__pr-address"))
-        )
-        item["location"] = addr_el.text.strip()
-    except Exception:
-        item["location"] = ""
+    with _extractor_timer("address"):
+        try:
+            addr_el = wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "#product-detail-web span.re__pr-short-description.js__pr-address"))
+            )
+            item["location"] = addr_el.text.strip()
+        except Exception:
+            item["location"] = ""
 
-    try:
-        desc_el = wait.until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.re__section-body.re__detail-content.js__section-body.js__pr-description")
+    with _extractor_timer("description"):
+        try:
+            desc_el = wait.until(
+                EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, "div.re__section-body.re__detail-content.js__section-body.js__pr-description")
+                )
             )
-        )
-        item["description"] = desc_el.text.strip()
-    except Exception:
-        item["description"] = ""
+            item["description"] = desc_el.text.strip()
+        except Exception:
+            item["description"] = ""
 
-    item["images"] = _extract_images(driver)
+    with _extractor_timer("_extract_images"):
+        item["images"] = _extract_images(driver)
 
-    config = _extract_config(driver)
+    with _extractor_timer("_extract_config"):
+        config = _extract_config(driver)
     item["config"] = config
     item["posted_date"] = config.get("Ngày đăng", "")
     item["expiration_date"] = config.get("Ngày hết hạn", "")
 
     item["specs"] = specs_map
-    phone_text, contact_name = _extract_phone(driver, wait, human_sleep)
+    with _extractor_timer("_extract_phone"):
+        phone_text, contact_name = _extract_phone(driver, wait, human_sleep)
     item["agent_phone"] = phone_text
     item["agent_name"] = contact_name
 
-    map_coords, map_link, map_dms = _extract_map(driver, wait)
+    with _extractor_timer("_extract_map"):
+        map_coords, map_link, map_dms = _extract_map(driver, wait)
     item["map_coords"] = map_coords
     item["map_link"] = map_link
     item["map_dms"] = map_dms
@@ -358,11 +466,13 @@ def open_detail_and_extract(
     # item["pricing_info"] = _extract_pricing(driver, wait)
 
     human_sleep(2, 4)
-    try:
-        driver.get(current_list_url)
-        human_sleep(2, 4)
-    except Exception:
-        pass
+    if current_list_url:
+        with tracing.span("back"):
+            try:
+                driver.get(current_list_url)
+                human_sleep(2, 4)
+            except Exception:
+                pass
 
     return item
 
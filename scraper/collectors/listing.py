@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import time
-from typing import List, Tuple
+from datetime import date
+from typing import Container, Iterable, Iterator, List, Tuple
 
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from .. import utils
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -17,19 +20,140 @@ def _scroll_listing(driver, steps: int):
         pass
 
 
+def new_list_item(href: str, pid: str | None) -> dict:
+    """Item rỗng với meta từ trang list, các trường còn lại được điền ở trang detail."""
+    return {
+        "href": href,
+        "pid": pid,
+        "title": "",
+        "price": "",
+        "area": "",
+        "price_per_m2": "",
+        "location": "",
+        "description": "",
+        "thumbnail": "",
+        "posted_date": "",
+        "agent_name": "",
+        "agent_phone": "",
+        "images": [],
+        "specs": {},
+        "config": {},
+        "map_coords": "",
+        "map_link": "",
+        "map_dms":""
+        # "pricing_info": {},
+    }
+
+
+def _read_card_date(el) -> date | None:
+    """Đọc ngày đăng hiển thị trên card (aria-label chứa DD/MM/YYYY, text là "Đăng hôm nay"...)."""
+    try:
+        spans = el.find_elements(By.CSS_SELECTOR, ".re__card-published-info-published-at")
+    except Exception:
+        return None
+    for span in spans:
+        try:
+            for text in (span.get_attribute("aria-label"), span.get_attribute("textContent")):
+                parsed = utils.parse_card_date(text)
+                if parsed:
+                    return parsed
+        except StaleElementReferenceException:
+            return None
+    return None
+
+
+def select_cards(
+    cards: Iterable[Tuple[str | None, str | None, date | None]],
+    scraped_pids: Container[str],
+    scraped_hrefs: Container[str],
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> Tuple[list[dict], dict]:
+    """
+    Lọc card (pid, href, ngày đăng hoặc None) của một trang list, không phụ thuộc driver (Selenium / Playwright).
+
+    Trả về (items, stats) với stats gồm skipped_pid, skipped_href và các khóa mô tả ở collect_list_items.
+    """
+    out: List[dict] = []
+    skipped_pid = skipped_href = 0
+    cards_dated = cards_older = skipped_date = 0
+    tail_older = False
+    known_flags: list[bool] = []
+    for pid, href, card_date in cards:
+        if not href:
+            continue
+
+        # Ngày được đọc trước khi bỏ qua item đã có để biết cả trang có cũ hơn date_from không
+        if card_date:
+            cards_dated += 1
+            tail_older = bool(date_from and card_date < date_from)
+            if tail_older:
+                cards_older += 1
+
+        if pid and pid in scraped_pids:
+            skipped_pid += 1
+            known_flags.append(True)
+            continue
+        if (not pid) and href in scraped_hrefs:
+            skipped_href += 1
+            known_flags.append(True)
+            continue
+        known_flags.append(False)
+        if card_date and ((date_from and card_date < date_from) or (date_to and card_date > date_to)):
+            skipped_date += 1
+            continue
+
+        out.append(new_list_item(href, pid))
+
+    return out, {
+        "skipped_pid": skipped_pid,
+        "skipped_href": skipped_href,
+        "cards_dated": cards_dated,
+        "cards_older": cards_older,
+        "skipped_date": skipped_date,
+        "tail_older": tail_older,
+        "known_flags": known_flags,
+    }
+
+
+def _iter_cards(els, check_dates: bool) -> Iterator[Tuple[str | None, str | None, date | None]]:
+    for el in els:
+        try:
+            pid = el.get_attribute("data-product-id")
+            href = el.get_attribute("href")
+            if not href:
+                continue
+            yield pid, href, (_read_card_date(el) if check_dates else None)
+        except StaleElementReferenceException as e:
+            print(e)
+            continue
+
+
 def collect_list_items(
     driver,
-    scraped_pids: set[str],
-    scraped_hrefs: set[str],
+    scraped_pids: Container[str],
+    scraped_hrefs: Container[str],
     max_items: int,
     scroll_steps: int,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    stats: dict | None = None,
 ) -> Tuple[list[dict], int, int, int]:
     """
     Return (items, total_cards, skipped_pid, skipped_href).
+
+    scraped_pids / scraped_hrefs chỉ cần hỗ trợ `in`: set thường hoặc seen_set.SeenSet (Bloom + SQLite).
+
+    Nếu có date_from/date_to, card có ngày đăng nằm ngoài khoảng bị bỏ qua ngay trên trang list
+    (không mở detail). Khi truyền `stats`, dict được điền:
+        cards_dated: số card đọc được ngày đăng
+        cards_older: số card cũ hơn date_from
+        skipped_date: số card bị bỏ qua do ngày đăng
+        tail_older: card có ngày cuối cùng trên trang cũ hơn date_from
+        known_flags: theo thứ tự card, True nếu card đã có trong scraped_pids/scraped_hrefs
     """
     _scroll_listing(driver, scroll_steps)
 
-    out: List[dict] = []
     els = []
     for _ in range(20):
         els = driver.find_elements(By.CSS_SELECTOR, "#product-lists-web a.js__product-link-for-product-id")
@@ -37,50 +161,19 @@ def collect_list_items(
             break
         time.sleep(1)
 
-    skipped_pid = skipped_href = 0
-    for el in els:
-        try:
-            pid = el.get_attribute("data-product-id")
-            href = el.get_attribute("href")
-            if not href:
-                continue
-            if pid and pid in scraped_pids:
-                skipped_pid += 1
-                continue
-            if (not pid) and href in scraped_hrefs:
-                skipped_href += 1
-                continue
+    check_dates = bool(date_from or date_to)
+    out, page_stats = select_cards(
+        _iter_cards(els, check_dates), scraped_pids, scraped_hrefs, date_from, date_to
+    )
+    skipped_pid = page_stats.pop("skipped_pid")
+    skipped_href = page_stats.pop("skipped_href")
 
-            out.append(
-                {
-                    "href": href,
-                    "pid": pid,
-                    "title": "",
-                    "price": "",
-                    "area": "",
-                    "price_per_m2": "",
-                    "location": "",
-                    "description": "",
-                    "thumbnail": "",
-                    "posted_date": "",
-                    "agent_name": "",
-                    "agent_phone": "",
-                    "images": [],
-                    "specs": {},
-                    "config": {},
-                    "map_coords": "",
-                    "map_link": "",
-                    "map_dms":""
-                    # "pricing_info": {},
-                }
-            )
-        except StaleElementReferenceException as e:
-            print(e)
-            continue
+    if stats is not None:
+        stats.update(page_stats)
 
     if not out:
         print(
-            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_pid} by pid and {skipped_href} by href."
+            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_pid} by pid, "
+            f"{skipped_href} by href and {page_stats['skipped_date']} by posted date."
         )
     return out[:max_items], len(els), skipped_pid, skipped_href
-
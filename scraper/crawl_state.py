@@ -0,0 +1,225 @@
+"""Trạng thái lần crawl với bộ nhớ không phụ thuộc số item của ngày.
+
+Thay cho list `all_results` (giữ mọi item thô kèm mô tả, specs, ảnh... suốt lần chạy), CrawlState chỉ giữ:
+  - key bỏ trùng (pid / real_estate_code, xem storage.result_key) + fingerprint 64 bit của từng tin đã có
+    trong file kết quả,
+  - các item mới của trang hiện tại (chưa save).
+
+Mỗi item mới được ghi nối ngay vào journal `<results_file>.pending.jsonl` (fsync), nên crash giữa hai lần save
+không mất tin: lần chạy sau replay journal. save() transform các item đang chờ rồi gộp với file kết quả bằng
+cách đọc stream file cũ → ghi file mới (serializer.write_results, atomic), cùng ngữ nghĩa với save_results cũ:
+tin trùng key được thay tại vị trí cũ, tin mới nối vào cuối. Tin không đổi (cùng fingerprint) không làm ghi lại
+file; parquet / SQLite chỉ nhận các tin mới hoặc đã đổi.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from . import metrics, parquet_export, profiling, results_db, serializer, storage
+
+JOURNAL_SUFFIX = ".pending.jsonl"
+
+
+def _fingerprint(record: Dict[str, Any]) -> int:
+    digest = hashlib.blake2b(serializer.dumps(record, indent=False), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def journal_path_for(results_file) -> Path:
+    path = Path(results_file)
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+class CrawlState:
+    """Key + fingerprint của các tin đã lưu, item mới được spill ra journal cho tới lần save kế tiếp."""
+
+    def __init__(self, results_file, scraped_pids: Optional[Set[str]] = None,
+                 scraped_hrefs: Optional[Set[str]] = None):
+        self.results_file = Path(results_file)
+        self.journal_file = journal_path_for(results_file)
+        self.scraped_pids = scraped_pids if scraped_pids is not None else set()
+        self.scraped_hrefs = scraped_hrefs if scraped_hrefs is not None else set()
+        # key → fingerprint của bản đang nằm trong file kết quả
+        self._saved: Dict[str, int] = {}
+        self._saved_keyless = 0
+        # key → item thô chưa save (dict giữ thứ tự thêm vào, item sau cùng key thắng); item không có key
+        # nào dùng số thứ tự (int) làm key để không bị gộp
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._pending_new = 0
+        self._keyless_seq = 0
+        self._journal = None
+        # append / save / close từ nhiều worker (runner.scrape_urls_parallel) đi qua một lock
+        self._lock = threading.RLock()
+
+    # -----------------------------------------------------------------------
+    # Nạp
+    # -----------------------------------------------------------------------
+
+    def load(self) -> int:
+        """Đọc key / fingerprint từ file kết quả của ngày (stream) và replay journal còn sót. Trả về số tin."""
+        if self.results_file.exists():
+            try:
+                for record in serializer.iter_items(self.results_file):
+                    if isinstance(record, dict):
+                        self._remember(record)
+            except serializer.CorruptFileError as e:
+                # File hỏng sẽ bị lần save tiếp theo ghi đè: đổi tên để giữ lại, tiếp tục với các tin đọc được
+                moved = serializer.quarantine(self.results_file)
+                print(f"⚠️ File kết quả hỏng: {e}")
+                print(f"   → đã chuyển sang {moved}, giữ lại {len(self)} item đọc được")
+                if moved is not None:
+                    serializer.write_results(self.results_file, self._read_salvaged(moved))
+
+        replayed = 0
+        if self.journal_file.exists():
+            with open(self.journal_file, "rb") as f:
+                for line in f:
+                    try:
+                        item = serializer.loads(line)
+                    except ValueError:
+                        continue  # dòng ghi dở khi bị kill
+                    if isinstance(item, dict):
+                        self._queue(item)
+                        replayed += 1
+            if replayed:
+                print(f"[State] Replay {replayed} item chưa lưu từ {self.journal_file}")
+        return len(self)
+
+    def _remember(self, record: Dict[str, Any]) -> None:
+        storage._update_sets_from_items((record,), self.scraped_pids, self.scraped_hrefs)
+        key = storage.result_key(record)
+        if key is None:
+            self._saved_keyless += 1
+        else:
+            self._saved[key] = _fingerprint(record)
+
+    @staticmethod
+    def _read_salvaged(path: Path) -> Iterator[Dict[str, Any]]:
+        try:
+            for record in serializer.iter_items(path):
+                if isinstance(record, dict):
+                    yield record
+        except serializer.CorruptFileError:
+            return
+
+    # -----------------------------------------------------------------------
+    # Thêm item
+    # -----------------------------------------------------------------------
+
+    def _queue(self, item: Dict[str, Any]) -> None:
+        key = storage.result_key(item)
+        if key is None:
+            self._keyless_seq += 1
+            key = self._keyless_seq
+        if key not in self._pending and key not in self._saved:
+            self._pending_new += 1
+        self._pending[key] = item
+        storage._update_sets_from_items((item,), self.scraped_pids, self.scraped_hrefs)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        """Thêm một item thô vừa scrape: ghi journal (fsync) rồi giữ trong bộ nhớ tới lần save kế tiếp."""
+        with self._lock:
+            if self._journal is None:
+                self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = open(self.journal_file, "ab")
+            self._journal.write(serializer.dumps(item, indent=False) + b"\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._queue(item)
+
+    def __len__(self) -> int:
+        return len(self._saved) + self._saved_keyless + self._pending_new
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # -----------------------------------------------------------------------
+    # Save
+    # -----------------------------------------------------------------------
+
+    def _merged(self, changed: Dict[str, Dict[str, Any]], new: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        if self.results_file.exists():
+            try:
+                for record in serializer.iter_items(self.results_file):
+                    if not isinstance(record, dict):
+                        continue
+                    key = storage.result_key(record)
+                    yield changed.pop(key, record) if key is not None else record
+            except serializer.CorruptFileError as e:
+                moved = serializer.quarantine(self.results_file)
+                print(f"⚠️ File kết quả hỏng khi save: {e} → {moved}")
+        yield from changed.values()
+        yield from new
+
+    @metrics.timed("scraper_save_results_seconds")
+    @profiling.hot
+    def save(self) -> int:
+        """Gộp các item đang chờ vào file kết quả. Trả về số tin mới / đã đổi được ghi."""
+        with self._lock:
+            return self._save()
+
+    def _save(self) -> int:
+        if not self._pending:
+            return 0
+        raw_items = list(self._pending.values())
+        records = storage.transform_batch(raw_items)
+
+        changed: Dict[str, Dict[str, Any]] = {}
+        new: List[Dict[str, Any]] = []
+        written_raw: List[Dict[str, Any]] = []
+        written: List[Dict[str, Any]] = []
+        fingerprints: Dict[str, int] = {}
+        keyless = 0
+        for key, raw, record in zip(self._pending, raw_items, records):
+            if isinstance(key, int):
+                keyless += 1
+                new.append(record)
+            else:
+                fingerprint = _fingerprint(record)
+                if self._saved.get(key) == fingerprint:
+                    continue  # đã có trong file, không đổi
+                if key in self._saved:
+                    changed[key] = record
+                else:
+                    new.append(record)
+                fingerprints[key] = fingerprint
+            written_raw.append(raw)
+            written.append(record)
+
+        if written:
+            serializer.write_results(self.results_file, self._merged(changed, new))
+        self._saved.update(fingerprints)
+        self._saved_keyless += keyless
+        self._pending.clear()
+        self._pending_new = 0
+        self._truncate_journal()
+
+        print(f"Saved {len(self)} items to {self.results_file}")
+        if written:
+            parquet_export.export_results(written, self.results_file)
+            results_db.store_results(written_raw, written, self.results_file)
+        profiling.memory_snapshot(f"save-{len(self)}")
+        return len(written)
+
+    def _truncate_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.seek(0)
+            self._journal.truncate()
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        elif self.journal_file.exists():
+            self.journal_file.unlink()
+
+    def close(self) -> None:
+        """Đóng journal; xóa file journal nếu không còn item chờ."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if not self._pending and self.journal_file.exists() and self.journal_file.stat().st_size == 0:
+                self.journal_file.unlink()
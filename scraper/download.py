@@ -0,0 +1,289 @@
+"""Stream kết quả cho endpoint /download: đổi định dạng, nén và ETag, không dựng cả list trong bộ nhớ.
+
+Định dạng: json (`{"data": [...]}`, compact), ndjson, csv, parquet (cần pyarrow). Nén theo Accept-Encoding:
+zstd (cần `zstandard`), gzip, hoặc không nén. Nhiều file (một khoảng ngày) được gộp qua
+storage.iter_result_files: file mới đọc trước, tin trùng ở file cũ hơn bị bỏ.
+
+Các hàm ở đây không phụ thuộc Flask; app.py chỉ nối chúng vào Response.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import config, parquet_export, serializer, storage
+
+FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CHUNK_SIZE = 64 * 1024
+MAX_RANGE_DAYS = 366
+SPOOL_DIR_NAME = ".download-cache"
+
+# Cột CSV: cùng thứ tự với schema Parquet, list / struct được ghi dạng JSON
+CSV_COLUMNS = [name for name, _ in parquet_export.SCHEMA_FIELDS if name not in ("lat", "lng", "exported_at")]
+CSV_COLUMNS.insert(CSV_COLUMNS.index("district_id"), "province_id")
+
+
+# ---------------------------------------------------------------------------
+# Chọn file
+# ---------------------------------------------------------------------------
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Ngày không hợp lệ: {value!r} (định dạng YYYY-MM-DD)") from None
+
+
+def files_for_range(date_from: str, date_to: Optional[str] = None, include_filtered: bool = False) -> List[Path]:
+    """Các file kết quả của từng ngày trong [date_from, date_to] (output/YYYY-MM/YYYY-MM-DD.json, tùy chọn cả output_filtered)."""
+    start = _parse_date(date_from)
+    end = _parse_date(date_to) if date_to else start
+    if end < start:
+        raise ValueError("to phải >= from")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"Khoảng ngày tối đa {MAX_RANGE_DAYS} ngày")
+
+    files: List[Path] = []
+    day = start
+    while day <= end:
+        month = day.strftime("%Y-%m")
+        stem = day.strftime("%Y-%m-%d")
+        path = Path(config.OUTPUT_DIR) / month / f"{stem}.json"
+        if path.exists():
+            files.append(path)
+        if include_filtered:
+            files.extend(sorted((Path(config.OUTPUT_DIR_FILTER) / month).glob(f"{stem}_*.json")))
+        day += timedelta(days=1)
+    return files
+
+
+# ---------------------------------------------------------------------------
+# ETag / nén
+# ---------------------------------------------------------------------------
+
+def etag_for(files: Sequence[Path], fmt: str, encoding: str) -> str:
+    """ETag mạnh theo (đường dẫn, size, mtime) của các file nguồn + định dạng + encoding."""
+    digest = hashlib.sha256(f"{fmt}|{encoding}".encode())
+    for path in files:
+        st = os.stat(path)
+        digest.update(f"|{path}|{st.st_size}|{st.st_mtime_ns}".encode())
+    return digest.hexdigest()[:32]
+
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Chọn encoding tốt nhất mà client chấp nhận (q=0 bị loại)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    if accepted.get("zstd", 0) > 0 and _zstd_available():
+        return "zstd"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return "identity"
+
+
+def compress(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Nén stream theo encoding (gzip / zstd / identity), gom output thành các khối ~CHUNK_SIZE."""
+    if encoding == "identity":
+        yield from _rechunk(chunks)
+        return
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        finish = compressor.flush
+    elif encoding == "zstd":
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        finish = compressor.flush
+    else:
+        raise ValueError(f"Encoding không hỗ trợ: {encoding}")
+    yield from _rechunk(_compressed(chunks, compressor.compress, finish))
+
+
+def _compressed(chunks, compress_fn, finish) -> Iterator[bytes]:
+    for chunk in chunks:
+        out = compress_fn(chunk)
+        if out:
+            yield out
+    tail = finish()
+    if tail:
+        yield tail
+
+
+def _rechunk(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) >= CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+# ---------------------------------------------------------------------------
+# Encoder theo định dạng
+# ---------------------------------------------------------------------------
+
+def encode_json(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    yield b'{"data":['
+    first = True
+    for item in items:
+        yield (b"" if first else b",") + serializer.dumps(item, indent=False)
+        first = False
+    yield b"]}"
+
+
+def encode_ndjson(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for item in items:
+        yield serializer.dumps(item, indent=False) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+def encode_csv(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM để Excel đọc đúng tiếng Việt
+    yield "\ufeff".encode("utf-8")
+    writer.writerow(CSV_COLUMNS)
+    for item in items:
+        writer.writerow([_csv_value(item.get(column)) for column in CSV_COLUMNS])
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like chỉ ghi, giữ các byte vừa được ghi để generator lấy ra dần."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def encode_parquet(dated_items: Iterable[tuple], batch_size: int = 5000) -> Iterator[bytes]:
+    """(date, record) → file Parquet (schema của parquet_export), mỗi batch là một row group."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_export.schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    rows: List[Dict[str, Any]] = []
+    exported_at = datetime.now()
+    try:
+        for date, record in dated_items:
+            rows.append(parquet_export.to_row(record, date, exported_at))
+            if len(rows) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                rows.clear()
+                yield sink.drain()
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream(files: Sequence[Path], fmt: str, dedupe: bool = True) -> Iterator[bytes]:
+    """Byte (chưa nén) của các file ở định dạng `fmt`."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format phải là một trong {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        return encode_parquet(
+            (parquet_export.date_for_results_file(path), item)
+            for path, item in storage.iter_result_files(files, dedupe)
+        )
+    items = storage.iter_result_items(files, dedupe)
+    return {"json": encode_json, "ndjson": encode_ndjson, "csv": encode_csv}[fmt](items)
+
+
+# ---------------------------------------------------------------------------
+# Spool cho Range request
+# ---------------------------------------------------------------------------
+
+def spool_path(etag: str) -> Path:
+    return Path(config.OUTPUT_DIR) / SPOOL_DIR_NAME / etag
+
+
+def spool(chunks: Iterable[bytes], etag: str) -> Path:
+    """Ghi output đã mã hóa ra file cache theo ETag (atomic) để phục vụ Range / tải tiếp; dùng lại nếu đã có."""
+    path = spool_path(etag)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{etag}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+
+def prune_spool(keep: int = 20) -> None:
+    """Giữ lại `keep` file cache mới nhất."""
+    directory = Path(config.OUTPUT_DIR) / SPOOL_DIR_NAME
+    if not directory.is_dir():
+        return
+    entries = sorted((p for p in directory.iterdir() if not p.name.startswith(".")),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in entries[keep:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
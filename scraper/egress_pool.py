@@ -0,0 +1,288 @@
+"""Pool proxy đầu ra (egress) với ngân sách tốc độ và điểm sức khỏe riêng cho từng proxy.
+
+Mọi request vốn đi ra từ một Chrome / một IP, nên độ lịch sự (human_sleep, PAGE_COOLDOWN_SECONDS) là trần
+thông lượng của cả job. EgressPool giữ danh sách proxy (config.EGRESS_PROXIES / EGRESS_PROXY_FILE) và:
+
+  - token bucket mỗi proxy: EGRESS_RATE request/giây, dồn tối đa EGRESS_BURST; reserve() trừ token ngay và trả
+    về số giây phải chờ, nên các phiên dùng chung proxy xếp hàng công bằng mà không giữ lock khi ngủ;
+  - điểm sức khỏe 0..1: trang bình thường kéo điểm lên, lỗi mạng kéo xuống, CAPTCHA (open_detail_and_extract,
+    engine Playwright / Scrapy) giảm một nửa và cho proxy nghỉ EGRESS_CAPTCHA_COOLDOWN giây (gấp đôi mỗi lần
+    CAPTCHA liên tiếp). Điểm dưới EGRESS_MIN_HEALTH → cách ly EGRESS_QUARANTINE_SECONDS (gấp đôi mỗi lần bị
+    cách ly), hết hạn thì quay lại với điểm thử việc;
+  - gán dính (sticky) theo phiên: một Chrome của fleet, một context Playwright, một phiên HTTP của Scrapy giữ
+    nguyên proxy (cookie, IP nhất quán) tới khi proxy đó nghỉ / bị cách ly, lúc đó assign() chuyển phiên sang
+    proxy khỏe nhất đang ít phiên nhất.
+
+Không cấu hình proxy nào thì shared_pool() là None và mọi hàm ở mức module là no-op: hành vi như trước.
+Thử cục bộ với proxy giả lập: benchmarks/stand_in_proxy.py.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from . import config, metrics
+
+OUTCOMES = ("ok", "captcha", "error")
+
+
+class EgressUnavailable(RuntimeError):
+    """Mọi proxy đang nghỉ / bị cách ly."""
+
+
+class Proxy:
+    def __init__(self, url: str, rate: float, burst: float):
+        if "://" not in url:
+            url = "http://" + url
+        self.url = url
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.username = parts.username
+        self.password = parts.password
+        self.label = f"{self.scheme}://{self.host}:{self.port}" if self.port else f"{self.scheme}://{self.host}"
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.health = 1.0
+        self.cooldown_until = 0.0
+        self.quarantined_until = 0.0
+        self.quarantines = 0
+        self.captcha_streak = 0
+        self.sessions: set = set()
+        self.requests = 0
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.waited_seconds = 0.0
+
+    @property
+    def server(self) -> str:
+        """Proxy không kèm user / password (cho --proxy-server của Chrome)."""
+        return self.label
+
+    def state(self, now: float) -> str:
+        if now < self.quarantined_until:
+            return "quarantined"
+        if now < self.cooldown_until:
+            return "cooldown"
+        return "ok"
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        self.tokens -= 1
+        self.requests += 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        self.waited_seconds += delay
+        return delay
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "proxy": self.label,
+            "state": self.state(now),
+            "health": round(self.health, 3),
+            "sessions": len(self.sessions),
+            "requests": self.requests,
+            "outcomes": dict(self.outcomes),
+            "quarantines": self.quarantines,
+            "available_in": round(max(self.cooldown_until, self.quarantined_until) - now, 1)
+            if self.state(now) != "ok" else 0,
+            "waited_seconds": round(self.waited_seconds, 1),
+        }
+
+
+class EgressPool:
+    """
+    Proxy cho từng phiên, token bucket và điểm sức khỏe theo proxy.
+
+        proxy = pool.assign("127.0.0.1:9300")      # dính với phiên tới khi proxy nghỉ / bị cách ly
+        time.sleep(pool.reserve("127.0.0.1:9300"))  # hoặc pool.throttle(...)
+        ...
+        pool.report("127.0.0.1:9300", "captcha")
+    """
+
+    def __init__(
+        self,
+        proxies: List[str],
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        captcha_cooldown: Optional[float] = None,
+        quarantine_seconds: Optional[float] = None,
+        min_health: Optional[float] = None,
+    ):
+        if not proxies:
+            raise ValueError("EgressPool cần ít nhất một proxy")
+        rate = config.EGRESS_RATE if rate is None else rate
+        burst = config.EGRESS_BURST if burst is None else burst
+        self.proxies = [Proxy(url, rate, burst) for url in proxies]
+        self.captcha_cooldown = config.EGRESS_CAPTCHA_COOLDOWN if captcha_cooldown is None else captcha_cooldown
+        self.quarantine_seconds = config.EGRESS_QUARANTINE_SECONDS if quarantine_seconds is None else quarantine_seconds
+        self.min_health = config.EGRESS_MIN_HEALTH if min_health is None else min_health
+        self._assigned: Dict[str, Proxy] = {}
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------------------------
+    # Gán proxy cho phiên
+    # -----------------------------------------------------------------------
+
+    def _usable(self, proxy: Proxy, now: float) -> bool:
+        if proxy.quarantined_until and now >= proxy.quarantined_until:
+            # Hết cách ly: thử việc với điểm vừa trên ngưỡng, CAPTCHA tiếp theo là cách ly lại (lâu hơn)
+            proxy.quarantined_until = 0.0
+            proxy.health = max(proxy.health, min(1.0, self.min_health * 1.5))
+        return proxy.state(now) == "ok"
+
+    def assign(self, session_key: str) -> Proxy:
+        """Proxy của phiên; gán (lại) proxy khỏe nhất, ít phiên nhất nếu phiên chưa có hoặc proxy cũ đang nghỉ."""
+        now = time.monotonic()
+        with self._lock:
+            current = self._assigned.get(session_key)
+            if current is not None and self._usable(current, now):
+                return current
+            candidates = [p for p in self.proxies if self._usable(p, now)]
+            if not candidates:
+                soonest = min(max(p.cooldown_until, p.quarantined_until) for p in self.proxies) - now
+                raise EgressUnavailable(f"Mọi proxy đang nghỉ / bị cách ly, sớm nhất sau {soonest:.0f}s")
+            proxy = min(candidates, key=lambda p: (len(p.sessions), -p.health))
+            if current is not None:
+                current.sessions.discard(session_key)
+                metrics.inc("scraper_egress_reassignments_total")
+            proxy.sessions.add(session_key)
+            self._assigned[session_key] = proxy
+            return proxy
+
+    def proxy_for(self, session_key) -> Optional[Proxy]:
+        """Proxy đang gán cho phiên (không gán mới); None nếu phiên không đi qua pool."""
+        with self._lock:
+            return self._assigned.get(session_key)
+
+    def usable(self, session_key) -> bool:
+        """False nếu proxy của phiên đang nghỉ / bị cách ly (phiên nên được gán lại qua assign())."""
+        now = time.monotonic()
+        with self._lock:
+            proxy = self._assigned.get(session_key)
+            return proxy is None or self._usable(proxy, now)
+
+    def release(self, session_key) -> None:
+        with self._lock:
+            proxy = self._assigned.pop(session_key, None)
+            if proxy is not None:
+                proxy.sessions.discard(session_key)
+
+    # -----------------------------------------------------------------------
+    # Ngân sách tốc độ
+    # -----------------------------------------------------------------------
+
+    def reserve(self, session_key) -> float:
+        """Lấy một token của proxy đang gán cho phiên; trả về số giây phải chờ trước khi gửi request."""
+        with self._lock:
+            proxy = self._assigned.get(session_key)
+            if proxy is None:
+                return 0.0
+            return proxy.reserve(time.monotonic())
+
+    def throttle(self, session_key) -> None:
+        delay = self.reserve(session_key)
+        if delay:
+            time.sleep(delay)
+            metrics.inc("scraper_sleep_seconds_total", delay, kind="egress")
+
+    # -----------------------------------------------------------------------
+    # Sức khỏe
+    # -----------------------------------------------------------------------
+
+    def report(self, session_key, outcome: str) -> None:
+        """Ghi kết quả một trang của phiên: "ok", "captcha" hoặc "error"."""
+        if outcome not in OUTCOMES:
+            raise ValueError(f"outcome phải là một trong {OUTCOMES}, nhận được: {outcome!r}")
+        now = time.monotonic()
+        with self._lock:
+            proxy = self._assigned.get(session_key)
+            if proxy is None:
+                return
+            proxy.outcomes[outcome] += 1
+            if outcome == "ok":
+                proxy.health += (1.0 - proxy.health) * 0.1
+                proxy.captcha_streak = 0
+            elif outcome == "error":
+                proxy.health *= 0.8
+            else:
+                proxy.health *= 0.5
+                proxy.captcha_streak += 1
+                pause = min(self.captcha_cooldown * 2 ** (proxy.captcha_streak - 1), self.quarantine_seconds)
+                proxy.cooldown_until = max(proxy.cooldown_until, now + pause)
+            if outcome != "ok" and proxy.health < self.min_health and now >= proxy.quarantined_until:
+                pause = min(self.quarantine_seconds * 2 ** proxy.quarantines, 24 * 3600)
+                proxy.quarantined_until = now + pause
+                proxy.quarantines += 1
+                metrics.inc("scraper_egress_quarantines_total")
+                print(f"[Egress] {proxy.label}: cách ly {pause:.0f}s (health {proxy.health:.2f})")
+        metrics.inc("scraper_egress_outcomes_total", outcome=outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            for proxy in self.proxies:
+                self._usable(proxy, now)
+            return {
+                "proxies": [p.stats(now) for p in self.proxies],
+                "available": sum(1 for p in self.proxies if p.state(now) == "ok"),
+                "sessions": {key: proxy.label for key, proxy in self._assigned.items()},
+            }
+
+
+def load_proxies() -> List[str]:
+    """config.EGRESS_PROXIES + các dòng của config.EGRESS_PROXY_FILE (bỏ dòng trống / bắt đầu bằng #)."""
+    proxies = list(config.EGRESS_PROXIES)
+    if config.EGRESS_PROXY_FILE:
+        for line in Path(config.EGRESS_PROXY_FILE).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                proxies.append(line)
+    return list(dict.fromkeys(proxies))
+
+
+_shared: Optional[EgressPool] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> Optional[EgressPool]:
+    """Pool dùng chung trong process theo config; None nếu không cấu hình proxy."""
+    global _shared, _shared_loaded
+    with _shared_lock:
+        if not _shared_loaded:
+            proxies = load_proxies()
+            _shared = EgressPool(proxies) if proxies else None
+            _shared_loaded = True
+        return _shared
+
+
+def session_key(driver_or_key) -> Optional[str]:
+    """Khóa phiên egress: chuỗi truyền thẳng, hoặc thuộc tính egress_key của driver (session_pool gắn sẵn)."""
+    if driver_or_key is None or isinstance(driver_or_key, str):
+        return driver_or_key
+    return getattr(driver_or_key, "egress_key", None)
+
+
+def throttle(driver_or_key) -> None:
+    pool = shared_pool()
+    key = session_key(driver_or_key)
+    if pool is not None and key is not None:
+        pool.throttle(key)
+
+
+def report(driver_or_key, outcome: str) -> None:
+    pool = shared_pool()
+    key = session_key(driver_or_key)
+    if pool is not None and key is not None:
+        pool.report(key, outcome)
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    with _shared_lock:
+        return _shared.stats() if _shared is not None else None
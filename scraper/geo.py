@@ -0,0 +1,208 @@
+"""Reverse geocoding offline: lat_long → province_id / district_id / ward_id bằng polygon ranh giới hành chính.
+
+Ranh giới được đọc từ các file GeoJSON trong thư mục boundaries (mặc định `<MAPPING_DIR>/boundaries`):
+
+    ward.geojson       properties: ward_id, district_id, province_id (+ name)
+    district.geojson   properties: district_id, province_id
+    province.geojson   properties: province_id
+
+Chỉ cần có ít nhất một file. Polygon (Polygon / MultiPolygon, có lỗ) được đưa vào grid index theo bbox,
+truy vấn một điểm chỉ kiểm tra point-in-polygon với vài polygon trong ô chứa điểm đó.
+"""
+from __future__ import annotations
+
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import config
+
+LEVELS = ("ward", "district", "province")
+ID_FIELDS = ("province_id", "district_id", "ward_id")
+# Các id mà một layer có thể cung cấp (ward thường mang cả id cấp trên)
+LEVEL_FIELDS = {"ward": ID_FIELDS, "district": ID_FIELDS[:2], "province": ID_FIELDS[:1]}
+RELOAD_CHECK_SECONDS = 5.0
+DEFAULT_CELL_SIZE = 0.05  # độ (~5.5 km)
+
+Ring = List[Tuple[float, float]]
+
+
+class _Shape:
+    __slots__ = ("props", "bbox", "polygons")
+
+    def __init__(self, props: Dict[str, Any], polygons: List[List[Ring]]):
+        self.props = props
+        self.polygons = polygons
+        xs = [x for poly in polygons for x, _ in poly[0]]
+        ys = [y for poly in polygons for _, y in poly[0]]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+        for poly in self.polygons:
+            if _point_in_ring(x, y, poly[0]) and not any(_point_in_ring(x, y, hole) for hole in poly[1:]):
+                return True
+        return False
+
+
+def _point_in_ring(x: float, y: float, ring: Ring) -> bool:
+    """Ray casting (even-odd)."""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y2 > y) != (y1 > y) and x < (x1 - x2) * (y - y2) / (y1 - y2) + x2:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _polygons_from_geometry(geometry: Dict[str, Any]) -> List[List[Ring]]:
+    gtype = (geometry or {}).get("type")
+    coords = (geometry or {}).get("coordinates") or []
+    if gtype == "Polygon":
+        polys = [coords]
+    elif gtype == "MultiPolygon":
+        polys = coords
+    else:
+        return []
+    out = []
+    for poly in polys:
+        rings = [[(float(p[0]), float(p[1])) for p in ring] for ring in poly if len(ring) >= 3]
+        if rings:
+            out.append(rings)
+    return out
+
+
+class GridIndex:
+    """Grid index đơn giản: mỗi ô (cell_size độ) giữ danh sách shape có bbox giao với ô."""
+
+    def __init__(self, shapes: Iterable[_Shape], cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[_Shape]] = {}
+        self.size = 0
+        for shape in shapes:
+            self.size += 1
+            min_x, min_y, max_x, max_y = shape.bbox
+            for cx in range(self._cell(min_x), self._cell(max_x) + 1):
+                for cy in range(self._cell(min_y), self._cell(max_y) + 1):
+                    self.cells.setdefault((cx, cy), []).append(shape)
+
+    def _cell(self, v: float) -> int:
+        return math.floor(v / self.cell_size)
+
+    def query(self, x: float, y: float) -> Optional[_Shape]:
+        for shape in self.cells.get((self._cell(x), self._cell(y)), ()):
+            if shape.contains(x, y):
+                return shape
+        return None
+
+
+def _load_layer(path: Path) -> List[_Shape]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    features = data.get("features", []) if isinstance(data, dict) else []
+    shapes = []
+    for feature in features:
+        polygons = _polygons_from_geometry(feature.get("geometry"))
+        if polygons:
+            shapes.append(_Shape(feature.get("properties") or {}, polygons))
+    return shapes
+
+
+class GeoResolver:
+    """Tra (lat, lng) → dict id hành chính theo các layer ranh giới có sẵn."""
+
+    def __init__(self, directory, cell_size: float = DEFAULT_CELL_SIZE):
+        self.directory = Path(directory)
+        self.layers: Dict[str, GridIndex] = {}
+        for level in LEVELS:
+            for suffix in (".geojson", ".json"):
+                path = self.directory / f"{level}{suffix}"
+                if path.exists():
+                    self.layers[level] = GridIndex(_load_layer(path), cell_size)
+                    break
+
+    def __bool__(self) -> bool:
+        return bool(self.layers)
+
+    def lookup(self, lat: float, lng: float) -> Optional[Dict[str, Any]]:
+        """Trả về {"province_id", "district_id", "ward_id"} (có thể None từng cấp) hoặc None nếu không trúng polygon nào."""
+        result: Dict[str, Any] = {field: None for field in ID_FIELDS}
+        hit = False
+        for level in LEVELS:
+            index = self.layers.get(level)
+            if index is None:
+                continue
+            if all(result[field] is not None for field in LEVEL_FIELDS[level]):
+                continue
+            shape = index.query(lng, lat)
+            if shape is None:
+                continue
+            hit = True
+            for field in ID_FIELDS:
+                if result[field] is None and shape.props.get(field) is not None:
+                    result[field] = shape.props[field]
+        return result if hit else None
+
+    def stats(self) -> Dict[str, int]:
+        return {level: index.size for level, index in self.layers.items()}
+
+
+# ---------------------------------------------------------------------------
+# Resolver dùng chung (cache theo thư mục + mtime các file ranh giới)
+# ---------------------------------------------------------------------------
+
+_resolver_cache: Dict[str, Any] = {"key": None, "resolver": None, "checked_at": 0.0, "dir": None}
+
+
+def boundaries_dir() -> Path:
+    return Path(config.BOUNDARIES_DIR) if config.BOUNDARIES_DIR else Path(config.MAPPING_DIR) / "boundaries"
+
+
+def get_resolver() -> Optional[GeoResolver]:
+    directory = boundaries_dir()
+    now = time.monotonic()
+    if _resolver_cache["dir"] == directory and now - _resolver_cache["checked_at"] < RELOAD_CHECK_SECONDS:
+        return _resolver_cache["resolver"]
+    _resolver_cache.update(dir=directory, checked_at=now)
+
+    key: Tuple = (str(directory),)
+    if directory.is_dir():
+        key += tuple(
+            (p.name, p.stat().st_mtime_ns)
+            for p in sorted(directory.iterdir())
+            if p.suffix in (".geojson", ".json")
+        )
+    if _resolver_cache["key"] != key:
+        resolver = GeoResolver(directory) if len(key) > 1 else None
+        if resolver is not None:
+            print(f"[Geo] Loaded boundaries {resolver.stats()} from {directory}")
+        _resolver_cache.update(key=key, resolver=resolver or None)
+    return _resolver_cache["resolver"]
+
+
+def parse_lat_long(lat_long: Optional[str]) -> Optional[Tuple[float, float]]:
+    if not lat_long or "," not in lat_long:
+        return None
+    try:
+        lat, lng = (float(p) for p in lat_long.split(",", 1))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def resolve_ids(lat_long: Optional[str]) -> Optional[Dict[str, Any]]:
+    """lat_long dạng "lat,lng" → dict id hành chính, hoặc None nếu không có ranh giới / không trúng."""
+    point = parse_lat_long(lat_long)
+    if point is None:
+        return None
+    resolver = get_resolver()
+    if resolver is None:
+        return None
+    return resolver.lookup(*point)
@@ -0,0 +1,283 @@
+"""Chỉ mục địa điểm offline (tỉnh → quận → phường) lấy từ sidebar của từng loại BĐS.
+
+Chỉ mục được crawl một lần (hoặc định kỳ) và lưu ra JSON. Khi scrape, location filter
+được khớp trong process với chỉ mục này nên không cần dùng ô tìm kiếm / sidebar trên web.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse
+
+from . import config
+from .utils import human_sleep as _default_human_sleep
+from .utils import normalize_text
+
+_RE_COUNT = re.compile(r'\s*\(\d[\d.,]*\)\s*')
+_RE_PAGE_SUFFIX = re.compile(r'/p\d+/?$')
+
+# Cache chỉ mục đã load: (path, mtime) -> index
+_index_cache: dict[str, Any] = {}
+
+
+# ---------------------------------------------------------------------------
+# Scoring (dùng chung với runner.find_exact_url_from_sidebar)
+# ---------------------------------------------------------------------------
+
+def clean_link_text(text: str) -> str:
+    """Bỏ phần số lượng tin "(123)" khỏi text của link sidebar."""
+    return _RE_COUNT.sub('', text or '').strip()
+
+
+def score_location_match(candidate: str, location_filter: str) -> int:
+    """
+    Chấm điểm độ khớp giữa tên địa điểm và location filter.
+
+    100 = khớp tuyệt đối, 95 = khớp tập từ, 80+ = chung >= 2 từ, 20 = chung 1 từ.
+    """
+    candidate_norm = normalize_text(candidate)
+    location_norm = normalize_text(location_filter)
+
+    if candidate_norm == location_norm:
+        return 100
+
+    candidate_words = set(candidate_norm.split())
+    location_words = set(location_norm.split())
+    if candidate_words == location_words:
+        return 95
+
+    cnt = len(candidate_words.intersection(location_words))
+    if cnt >= 2:
+        return 80 + (cnt - 2) * 5
+    if cnt == 1:
+        return 20
+    return 0
+
+
+def property_path_from_url(url: str) -> str:
+    """Lấy path loại BĐS từ URL (bỏ query và hậu tố /pN)."""
+    path = urlparse(url).path or "/"
+    path = _RE_PAGE_SUFFIX.sub('', path)
+    return path.rstrip("/") or "/"
+
+
+def absolute_url(href: str) -> str:
+    if href.startswith("http"):
+        return href
+    return f"{config.BASE_DOMAIN}{href}"
+
+
+# ---------------------------------------------------------------------------
+# Đọc sidebar
+# ---------------------------------------------------------------------------
+
+def pick_sidebar_box(driver, property_type_path: str):
+    """Chọn box `.re__product-count-box` phù hợp với loại BĐS, mặc định box đầu tiên."""
+    from selenium.webdriver.common.by import By
+
+    sidebar_boxes = driver.find_elements(By.CSS_SELECTOR, ".re__product-count-box")
+    if not sidebar_boxes:
+        return None
+
+    property_keywords = property_type_path.replace("/ban-", "").replace("/cho-thue-", "").replace("-", " ").split()
+
+    for box in sidebar_boxes:
+        try:
+            title = box.find_element(By.CSS_SELECTOR, ".re__sidebar-box-title")
+            title_text = title.text.lower()
+            matches = sum(1 for kw in property_keywords if kw in title_text)
+
+            if matches >= 2 or "bán" in title_text or "cho thuê" in title_text:
+                return box
+        except Exception:
+            continue
+
+    return sidebar_boxes[0]
+
+
+def expand_sidebar_box(driver, box, human_sleep: Callable[[float, float], None] = _default_human_sleep) -> bool:
+    """Click "Xem thêm" trong box (link bị ẩn nên cần mở). Trả về True nếu đã click."""
+    from selenium.webdriver.common.by import By
+
+    try:
+        view_more_btn = box.find_element(By.CSS_SELECTOR, ".re__sidebar-box-content .re__view-more")
+        if view_more_btn.is_displayed():
+            driver.execute_script("arguments[0].click();", view_more_btn)
+            human_sleep(1, 2)
+            return True
+    except Exception:
+        pass
+    return False
+
+
+def read_sidebar_links(
+    driver,
+    property_type_path: str,
+    human_sleep: Callable[[float, float], None] = _default_human_sleep,
+) -> list[tuple[str, str]]:
+    """Đọc danh sách (tên, URL tuyệt đối) các link địa điểm trong sidebar của trang hiện tại."""
+    from selenium.webdriver.common.by import By
+
+    box = pick_sidebar_box(driver, property_type_path)
+    if box is None:
+        return []
+    expand_sidebar_box(driver, box, human_sleep)
+
+    out: list[tuple[str, str]] = []
+    for link in box.find_elements(By.CSS_SELECTOR, "a.re__link-se"):
+        try:
+            name = clean_link_text(link.get_attribute("textContent") or link.text)
+            href = link.get_attribute("href")
+        except Exception:
+            continue
+        if name and href:
+            out.append((name, absolute_url(href)))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Crawl chỉ mục
+# ---------------------------------------------------------------------------
+
+def crawl_location_index(
+    driver,
+    property_paths: Optional[list[str]] = None,
+    max_level: int = config.LOCATION_INDEX_MAX_LEVEL,
+    human_sleep: Callable[[float, float], None] = _default_human_sleep,
+    existing: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """
+    Duyệt sidebar theo chiều rộng cho từng loại BĐS: trang loại BĐS → tỉnh → quận → phường.
+
+    Args:
+        driver: Selenium driver
+        property_paths: Danh sách path loại BĐS (mặc định config.PROPERTY_TYPE_PATHS)
+        max_level: Cấp sâu nhất cần lấy (1 = tỉnh, 2 = quận, 3 = phường)
+        existing: Chỉ mục cũ, các path đã có sẽ được crawl lại và ghi đè
+
+    Returns:
+        Dict chỉ mục {"built_at", "max_level", "paths": {path: [entry, ...]}}
+    """
+    property_paths = property_paths or config.PROPERTY_TYPE_PATHS
+    index = existing or {"paths": {}}
+    index.setdefault("paths", {})
+
+    for property_path in property_paths:
+        property_path = property_path_from_url(property_path)
+        print(f"[LocationIndex] Crawl sidebar cho {property_path}")
+
+        entries: list[dict[str, Any]] = []
+        seen_urls: set[str] = set()
+        queue = deque([(f"{config.BASE_DOMAIN}{property_path}", 1, [])])
+
+        while queue:
+            page_url, level, parents = queue.popleft()
+            try:
+                driver.get(page_url)
+                human_sleep(2, 4)
+            except Exception as e:
+                print(f"[LocationIndex] Lỗi load {page_url}: {e}")
+                continue
+
+            links = read_sidebar_links(driver, property_path, human_sleep)
+            for name, url in links:
+                url_path = property_path_from_url(url)
+                if url_path in seen_urls or url_path == property_path:
+                    continue
+                seen_urls.add(url_path)
+
+                entries.append({
+                    "name": name,
+                    "url": url_path,
+                    "level": level,
+                    "parents": parents,
+                })
+                if level < max_level:
+                    queue.append((url, level + 1, parents + [name]))
+
+            print(f"[LocationIndex] {page_url}: {len(links)} link (tổng {len(entries)})")
+
+        index["paths"][property_path] = entries
+
+    index["built_at"] = datetime.now().isoformat(timespec="seconds")
+    index["max_level"] = max_level
+    return index
+
+
+def save_location_index(index: dict[str, Any], path=None) -> str:
+    path = str(path or config.LOCATION_INDEX_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    _index_cache.clear()
+    return path
+
+
+def load_location_index(path=None) -> dict[str, Any]:
+    """Load chỉ mục từ file JSON (cache theo mtime). Trả về {} nếu chưa có."""
+    path = str(path or config.LOCATION_INDEX_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+
+    cached = _index_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except Exception as e:
+        print(f"[LocationIndex] Không đọc được {path}: {e}")
+        return {}
+
+    _index_cache[path] = (mtime, index)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Resolve
+# ---------------------------------------------------------------------------
+
+def resolve_location_url(
+    location_filter: str,
+    base_url: str,
+    index: Optional[dict[str, Any]] = None,
+    min_score: int = 50,
+) -> Optional[str]:
+    """
+    Tìm URL địa điểm chính xác cho location filter trong chỉ mục offline.
+
+    Mỗi entry được chấm điểm theo tên riêng và theo tên đầy đủ (tỉnh + quận + phường),
+    lấy điểm cao hơn. Trả về None nếu chỉ mục không có loại BĐS này hoặc không đủ điểm.
+    """
+    if not location_filter or not location_filter.strip():
+        return None
+
+    index = index if index is not None else load_location_index()
+    entries = (index.get("paths") or {}).get(property_path_from_url(base_url))
+    if not entries:
+        return None
+
+    best_entry = None
+    best_score = 0
+    for entry in entries:
+        full_name = " ".join(entry.get("parents", []) + [entry["name"]])
+        score = max(
+            score_location_match(entry["name"], location_filter),
+            score_location_match(full_name, location_filter),
+        )
+        if score > best_score:
+            best_score = score
+            best_entry = entry
+
+    if best_entry and best_score >= min_score:
+        print(f"[LocationIndex] '{location_filter}' → {best_entry['url']} (score={best_score})")
+        return absolute_url(best_entry["url"])
+
+    return None
@@ -1,152 +1,244 @@
 """Module để load và sử dụng mapping từ file xlsx."""
+import hashlib
 import os
+import pickle
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from . import config
 from .utils import normalize_text
 import json
 # Cache cho mappings
 _mappings_cache: Dict[str, Dict[str, Any]] = {}
+# Cache cho district/ward JSON: path -> (mtime_ns, data)
+_json_cache: Dict[Path, Tuple[int, Dict[str, Any]]] = {}
+# Đổi khi format entry trong cache thay đổi để buộc compile lại
+CACHE_VERSION = 1
      # thư mục của file .py
 
 
-def _load_mappings():
-    """Load tất cả mappings từ file xlsx và cache lại."""
-    global _mappings_cache
-    
-    if _mappings_cache:
-        return _mappings_cache
+def _parse_workbook(xlsx_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Đọc toàn bộ sheet của map.xlsx bằng openpyxl (chậm, kết quả được compile ra cache)."""
+    from openpyxl import load_workbook
+
+    mappings: Dict[str, Dict[str, Any]] = {}
+    wb = load_workbook(xlsx_path, data_only=True)
+
+    def get_safe_int(v):
+        if v is None:
+            return None
+        try:
+            if isinstance(v, float):
+                return int(v) if v.is_integer() else v
+            if isinstance(v, str) and v.replace('.', '').isdigit():
+                f = float(v)
+                return int(f) if f.is_integer() else f
+            return int(v)
+        except:
+            return None
     
-    try:
-        from openpyxl import load_workbook
-        from pathlib import Path
+    for sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+        mapping = {}
         
-        # Tìm file xlsx
-        project_root = Path(__file__).resolve().parents[1]
-        xlsx_path = project_root / "output" / "map.xlsx"
+        rows = list(ws.iter_rows(values_only=True))
+        if len(rows) < 2:
+            continue
         
-        if not xlsx_path.exists():
-            print(f"[Mapping] File {xlsx_path} không tồn tại")
-            return {}
+        # Tìm header row
+        header_row_idx = None
+        for idx, row in enumerate(rows):
+            if row and any(cell and str(cell).upper() in ["ID", "VALUE", "SLUG"]
+                           for cell in row):
+                header_row_idx = idx
+                break
         
-        wb = load_workbook(xlsx_path, data_only=True)
+        if header_row_idx is None:
+            continue
+        
+        header_row = rows[header_row_idx]
+        col_mapping = {}
+        for col_idx, cell in enumerate(header_row):
+            if cell is not None:
+                col_mapping[str(cell).upper().strip()] = col_idx
+        
+        if "ID" not in col_mapping or "VALUE" not in col_mapping:
+            print(f"[Mapping] Sheet '{sheet_name}' thiếu cột ID hoặc VALUE, bỏ qua.")
+            continue
+        
+        id_col_idx = col_mapping["ID"]
+        value_col_idx = col_mapping["VALUE"]
+        slug_col_idx = col_mapping.get("SLUG")
 
-        def get_safe_int(v):
-            if v is None:
-                return None
-            try:
-                if isinstance(v, float):
-                    return int(v) if v.is_integer() else v
-                if isinstance(v, str) and v.replace('.', '').isdigit():
-                    f = float(v)
-                    return int(f) if f.is_integer() else f
-                return int(v)
-            except:
-                return None
+        print(f"[Mapping] Sheet '{sheet_name}': ID@{id_col_idx+1}, "
+              f"Value@{value_col_idx+1}, Slug@{slug_col_idx+1 if slug_col_idx else 'N/A'}")
         
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            mapping = {}
-            
-            rows = list(ws.iter_rows(values_only=True))
-            if len(rows) < 2:
-                continue
-            
-            # Tìm header row
-            header_row_idx = None
-            for idx, row in enumerate(rows):
-                if row and any(cell and str(cell).upper() in ["ID", "VALUE", "SLUG"]
-                               for cell in row):
-                    header_row_idx = idx
-                    break
-            
-            if header_row_idx is None:
+        # Parse data rows
+        for row in rows[header_row_idx + 1:]:
+            if not row or not any(row):
                 continue
             
-            header_row = rows[header_row_idx]
-            col_mapping = {}
-            for col_idx, cell in enumerate(header_row):
-                if cell is not None:
-                    col_mapping[str(cell).upper().strip()] = col_idx
-            
-            if "ID" not in col_mapping or "VALUE" not in col_mapping:
-                print(f"[Mapping] Sheet '{sheet_name}' thiếu cột ID hoặc VALUE, bỏ qua.")
-                continue
-            
-            id_col_idx = col_mapping["ID"]
-            value_col_idx = col_mapping["VALUE"]
-            slug_col_idx = col_mapping.get("SLUG")
-
-            print(f"[Mapping] Sheet '{sheet_name}': ID@{id_col_idx+1}, "
-                  f"Value@{value_col_idx+1}, Slug@{slug_col_idx+1 if slug_col_idx else 'N/A'}")
-            
-            # Parse data rows
-            for row in rows[header_row_idx + 1:]:
-                if not row or not any(row):
+            try:
+                # ID
+                id_cell = row[id_col_idx] if id_col_idx < len(row) else None
+                if id_cell is None:
                     continue
+                id_val = get_safe_int(id_cell)
                 
-                try:
-                    # ID
-                    id_cell = row[id_col_idx] if id_col_idx < len(row) else None
-                    if id_cell is None:
-                        continue
-                    id_val = get_safe_int(id_cell)
-                    
-                    # VALUE
-                    value_cell = row[value_col_idx] if value_col_idx < len(row) else None
-                    value = str(value_cell).strip() if value_cell else None
-                    if not value:
-                        continue
-                    
-                    # SLUG optional
-                    slug = None
-                    if slug_col_idx is not None and slug_col_idx < len(row):
-                        slug_cell = row[slug_col_idx]
-                        slug = str(slug_cell).strip() if slug_cell else None
-                    
-                    # --------- TẠO ENTRY MỞ RỘNG -----------
-                    entry = {"id": id_val}
-
-                    # district_id → cần province_id
-                    if sheet_name.lower() == "district_id":
-                        if "PROVINCE_ID" in col_mapping:
-                            pidx = col_mapping["PROVINCE_ID"]
-                            entry["province_id"] = get_safe_int(row[pidx]) if pidx < len(row) else None
-
-                    # ward_id → cần district_id + province_id
-                    if sheet_name.lower() == "ward_id":
-                        if "DISTRICT_ID" in col_mapping:
-                            didx = col_mapping["DISTRICT_ID"]
-                            entry["district_id"] = get_safe_int(row[didx]) if didx < len(row) else None
-                        if "PROVINCE_ID" in col_mapping:
-                            pidx = col_mapping["PROVINCE_ID"]
-                            entry["province_id"] = get_safe_int(row[pidx]) if pidx < len(row) else None
-                    
-                    # --------- LƯU MAPPING THEO NHIỀU KEY -----------
-                    def store_key(k):
-                        if k:
-                            mapping[k] = entry
-                    
-                    value_lower = value.lower()
-                    normalized_value = normalize_text(value)
-                    
-                    store_key(value_lower)
-                    store_key(normalized_value)
-
-                    if slug:
-                        slug_lower = slug.lower()
-                        normalized_slug = normalize_text(slug)
-                        store_key(slug_lower)
-                        store_key(normalized_slug)
-                
-                except Exception as e:
-                    print(f"[Mapping] Lỗi parse row trong sheet '{sheet_name}': {e}")
+                # VALUE
+                value_cell = row[value_col_idx] if value_col_idx < len(row) else None
+                value = str(value_cell).strip() if value_cell else None
+                if not value:
                     continue
+                
+                # SLUG optional
+                slug = None
+                if slug_col_idx is not None and slug_col_idx < len(row):
+                    slug_cell = row[slug_col_idx]
+                    slug = str(slug_cell).strip() if slug_cell else None
+                
+                # --------- TẠO ENTRY MỞ RỘNG -----------
+                entry = {"id": id_val}
+
+                # district_id → cần province_id
+                if sheet_name.lower() == "district_id":
+                    if "PROVINCE_ID" in col_mapping:
+                        pidx = col_mapping["PROVINCE_ID"]
+                        entry["province_id"] = get_safe_int(row[pidx]) if pidx < len(row) else None
+
+                # ward_id → cần district_id + province_id
+                if sheet_name.lower() == "ward_id":
+                    if "DISTRICT_ID" in col_mapping:
+                        didx = col_mapping["DISTRICT_ID"]
+                        entry["district_id"] = get_safe_int(row[didx]) if didx < len(row) else None
+                    if "PROVINCE_ID" in col_mapping:
+                        pidx = col_mapping["PROVINCE_ID"]
+                        entry["province_id"] = get_safe_int(row[pidx]) if pidx < len(row) else None
+                
+                # --------- LƯU MAPPING THEO NHIỀU KEY -----------
+                def store_key(k):
+                    if k:
+                        mapping[k] = entry
+                
+                value_lower = value.lower()
+                normalized_value = normalize_text(value)
+                
+                store_key(value_lower)
+                store_key(normalized_value)
+
+                if slug:
+                    slug_lower = slug.lower()
+                    normalized_slug = normalize_text(slug)
+                    store_key(slug_lower)
+                    store_key(normalized_slug)
             
-            if mapping:
-                _mappings_cache[sheet_name] = mapping
-                print(f"[Mapping] Loaded {len(mapping)} entries from sheet '{sheet_name}'")
+            except Exception as e:
+                print(f"[Mapping] Lỗi parse row trong sheet '{sheet_name}': {e}")
+                continue
         
-        wb.close()
+        if mapping:
+            mappings[sheet_name] = mapping
+            print(f"[Mapping] Loaded {len(mapping)} entries from sheet '{sheet_name}'")
+    
+    wb.close()
+    return mappings
+
+
+def _xlsx_path() -> Path:
+    return Path(config.MAPPING_DIR) / "map.xlsx"
+
+
+def cache_path_for(xlsx_path) -> Path:
+    xlsx_path = Path(xlsx_path)
+    return xlsx_path.with_name(f"{xlsx_path.stem}.cache.pickle")
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_cache(xlsx_path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Trả về mappings từ cache nếu cache còn khớp với xlsx (mtime + size, hoặc sha256 khi mtime đổi)."""
+    cache_path = cache_path_for(xlsx_path)
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"[Mapping] Cache {cache_path} hỏng, build lại: {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != CACHE_VERSION:
+        return None
+
+    source = payload.get("source", {})
+    st = xlsx_path.stat()
+    if source.get("size") != st.st_size:
+        return None
+    if source.get("mtime_ns") != st.st_mtime_ns and source.get("sha256") != _file_sha256(xlsx_path):
+        return None
+    return payload["mappings"]
+
+
+def _write_cache(xlsx_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Parse xlsx và ghi cache pickle (atomic) cạnh file xlsx, trả về mappings vừa parse."""
+    st = xlsx_path.stat()
+    mappings = _parse_workbook(xlsx_path)
+    payload = {
+        "version": CACHE_VERSION,
+        "source": {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _file_sha256(xlsx_path)},
+        "mappings": mappings,
+    }
+    cache_path = cache_path_for(xlsx_path)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    print(f"[Mapping] Compiled {sum(len(m) for m in mappings.values())} entries → {cache_path}")
+    return mappings
+
+
+def compile_mappings(xlsx_path=None, force: bool = False) -> Optional[Path]:
+    """
+    Compile map.xlsx ra cache pickle cạnh file xlsx.
+    Không làm gì nếu cache còn khớp, trừ khi force=True. Trả về đường dẫn cache hoặc None nếu không có xlsx.
+    """
+    xlsx_path = Path(xlsx_path) if xlsx_path else _xlsx_path()
+    if not xlsx_path.exists():
+        print(f"[Mapping] File {xlsx_path} không tồn tại")
+        return None
+    if force or _read_cache(xlsx_path) is None:
+        _write_cache(xlsx_path)
+    return cache_path_for(xlsx_path)
+
+
+def _load_mappings():
+    """Load tất cả mappings (từ cache pickle nếu còn khớp, nếu không thì parse xlsx và compile lại)."""
+    global _mappings_cache
+    
+    if _mappings_cache:
+        return _mappings_cache
+    
+    try:
+        xlsx_path = _xlsx_path()
+        if not xlsx_path.exists():
+            print(f"[Mapping] File {xlsx_path} không tồn tại")
+            return {}
+
+        mappings = _read_cache(xlsx_path)
+        if mappings is None:
+            try:
+                mappings = _write_cache(xlsx_path)
+            except OSError as e:
+                # Thư mục chỉ đọc: vẫn dùng được kết quả parse, chỉ không ghi cache
+                print(f"[Mapping] Không ghi được cache: {e}")
+                mappings = _parse_workbook(xlsx_path)
+        else:
+            print(f"[Mapping] Loaded {len(mappings)} sheets from {cache_path_for(xlsx_path)}")
+        _mappings_cache.update(mappings)
         return _mappings_cache
     
     except ImportError:
@@ -157,12 +249,21 @@ def _load_mappings():
         return {}
 
 
-
-def find_ward_key_loose(json_file = "", name = "", province_id=None, district_id=None):
-    project_root = Path(__file__).resolve().parents[1]
-    json_path = project_root / "output" / json_file
+def _load_json_mapping(json_file: str) -> Dict[str, Any]:
+    """Đọc district/ward mapping JSON một lần, đọc lại khi file đổi mtime."""
+    json_path = Path(config.MAPPING_DIR) / json_file
+    mtime = json_path.stat().st_mtime_ns
+    cached = _json_cache.get(json_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
+    _json_cache[json_path] = (mtime, data)
+    return data
+
+
+def find_ward_key_loose(json_file = "", name = "", province_id=None, district_id=None):
+    data = _load_json_mapping(json_file)
 
     name_norm = name.strip().lower()
 
@@ -0,0 +1,230 @@
+"""Metrics nhẹ (counter + histogram) cho từng bước của crawler.
+
+Giá trị được ghi vào hai nơi: registry cộng dồn của process (xuất ra `/metrics` theo định dạng
+Prometheus text) và registry của lần chạy hiện tại (reset bởi `start_run`, ghi ra file
+`<results_file>.metrics.json` bởi `write_run_summary`).
+"""
+from __future__ import annotations
+
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HELP = {
+    "scraper_page_load_seconds": "Thời gian driver.get một trang (list, detail, pagination)",
+    "scraper_listing_harvest_seconds": "Thời gian đọc card trên trang list (collect_list_items)",
+    "scraper_detail_seconds": "Thời gian xử lý trọn một trang detail",
+    "scraper_detail_extractor_seconds": "Thời gian từng extractor trên trang detail",
+    "scraper_sleep_seconds_total": "Tổng thời gian ngủ (human_sleep, cooldown)",
+    "scraper_save_results_seconds": "Thời gian save_results",
+    "scraper_transform_seconds": "Thời gian transform một lô item (parse giá / diện tích, tra mapping)",
+    "scraper_captcha_total": "Số lần gặp CAPTCHA",
+    "scraper_items_total": "Số item đã scrape",
+    "scraper_items_per_minute": "Tốc độ item/phút của lần chạy hiện tại",
+}
+
+_lock = threading.Lock()
+
+
+class _Registry:
+    def __init__(self):
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, dict[str, Any]]] = {}
+
+    def inc(self, name: str, key: tuple, value: float):
+        series = self.counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, key: tuple, value: float):
+        series = self.histograms.setdefault(name, {})
+        h = series.get(key)
+        if h is None:
+            h = series[key] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(DEFAULT_BUCKETS)}
+        h["count"] += 1
+        h["sum"] += value
+        if value > h["max"]:
+            h["max"] = value
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                h["buckets"][i] += 1
+
+
+_process = _Registry()
+_run = _Registry()
+_run_started_at: float | None = None
+_run_started_wall: datetime | None = None
+
+
+def _key(labels: dict[str, Any]) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = _key(labels)
+    with _lock:
+        _process.inc(name, key, value)
+        _run.inc(name, key, value)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    key = _key(labels)
+    with _lock:
+        _process.observe(name, key, value)
+        _run.observe(name, key, value)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Đo thời gian khối lệnh và ghi vào histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name: str, **labels) -> Callable:
+    """Decorator tương đương `timer` cho cả hàm."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Run summary
+# ---------------------------------------------------------------------------
+
+def start_run() -> None:
+    """Reset registry của lần chạy hiện tại."""
+    global _run, _run_started_at, _run_started_wall
+    with _lock:
+        _run = _Registry()
+        _run_started_at = time.perf_counter()
+        _run_started_wall = datetime.now()
+
+
+def _items_per_minute(registry: _Registry) -> float:
+    if _run_started_at is None:
+        return 0.0
+    elapsed = time.perf_counter() - _run_started_at
+    items = sum(registry.counters.get("scraper_items_total", {}).values())
+    return round(items / (elapsed / 60), 3) if elapsed > 0 else 0.0
+
+
+def _labels_str(key: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in key) or "_"
+
+
+def peak_rss_mb() -> float | None:
+    """RSS lớn nhất của process (MB); None nếu hệ điều hành không hỗ trợ (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_summary() -> dict[str, Any]:
+    with _lock:
+        elapsed = time.perf_counter() - _run_started_at if _run_started_at is not None else 0.0
+        summary: dict[str, Any] = {
+            "started_at": _run_started_wall.isoformat(timespec="seconds") if _run_started_wall else None,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "duration_seconds": round(elapsed, 3),
+            "items": int(sum(_run.counters.get("scraper_items_total", {}).values())),
+            "items_per_minute": _items_per_minute(_run),
+            "peak_rss_mb": peak_rss_mb(),
+            "counters": {},
+            "histograms": {},
+        }
+        for name, series in _run.counters.items():
+            summary["counters"][name] = {_labels_str(k): round(v, 4) for k, v in series.items()}
+        for name, series in _run.histograms.items():
+            summary["histograms"][name] = {
+                _labels_str(k): {
+                    "count": h["count"],
+                    "sum": round(h["sum"], 4),
+                    "avg": round(h["sum"] / h["count"], 4) if h["count"] else 0.0,
+                    "max": round(h["max"], 4),
+                }
+                for k, h in series.items()
+            }
+    return summary
+
+
+def summary_path_for(results_file) -> Path:
+    path = Path(results_file)
+    return path.with_name(f"{path.stem}.metrics.json")
+
+
+def write_run_summary(results_file, extra: dict[str, Any] | None = None) -> str:
+    """Ghi summary của lần chạy ra file JSON cạnh file kết quả."""
+    summary = run_summary()
+    if extra:
+        summary.update(extra)
+    path = summary_path_for(results_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"[Metrics] Run summary: {path}")
+    return str(path)
+
+
+# ---------------------------------------------------------------------------
+# Prometheus
+# ---------------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Xuất registry cộng dồn của process theo định dạng Prometheus text 0.0.4."""
+    lines: list[str] = []
+    with _lock:
+        for name, series in sorted(_process.counters.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_prom_labels(key)} {value:g}")
+
+        for name, series in sorted(_process.histograms.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                for bound, count in zip(DEFAULT_BUCKETS, h["buckets"]):
+                    lines.append(f"{name}_bucket{_prom_labels(key, (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_prom_labels(key, (('le', '+Inf'),))} {h['count']}")
+                lines.append(f"{name}_sum{_prom_labels(key)} {h['sum']:.6f}")
+                lines.append(f"{name}_count{_prom_labels(key)} {h['count']}")
+
+        name = "scraper_items_per_minute"
+        lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_items_per_minute(_run)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,352 @@
+"""Export kết quả đã transform ra Parquet (cần `pyarrow`, tùy chọn) bên cạnh file JSON.
+
+Dataset nằm ở config.PARQUET_DIR, partition kiểu hive theo ngày và tỉnh:
+
+    output/parquet/date=2025-11-20/province_id=24/part-<timestamp>-<n>.parquet
+
+Schema cố định (SCHEMA_FIELDS): giá / diện tích / id là số, images và các trường infomation_* là list,
+other_info là struct. Mỗi lần save_results chỉ ghi thêm file part chứa các item chưa export của ngày đó
+(theo real_estate_code), nên gọi sau mỗi trang là an toàn; compact(date) gộp các part nhỏ của một ngày.
+Đọc lại bằng read_table với filter (partition pruning theo date / province_id + pushdown theo thống kê
+row group cho các cột khác).
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from . import config, storage
+
+# (tên cột, kiểu): int / float / str / list<int> / list<str> / other_info
+SCHEMA_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("real_estate_code", "str"),
+    ("real_estate_type_id", "int"),
+    ("sale_type", "str"),
+    ("demand_id", "int"),
+    ("project_id", "int"),
+    ("district_id", "int"),
+    ("ward_id", "int"),
+    ("address_detail", "str"),
+    ("lat_long", "str"),
+    ("lat", "float"),
+    ("lng", "float"),
+    ("year_built", "int"),
+    ("handover_year", "int"),
+    ("area", "float"),
+    ("area_unit", "str"),
+    ("price", "int"),
+    ("price_unit", "int"),
+    ("bedroom", "int"),
+    ("bathroom", "int"),
+    ("floor", "int"),
+    ("length", "float"),
+    ("width", "float"),
+    ("lane_width", "float"),
+    ("title", "str"),
+    ("content", "str"),
+    ("contact_type", "int"),
+    ("contact_name", "str"),
+    ("contact_phone_number", "str"),
+    ("paper_no", "str"),
+    ("lot_no", "str"),
+    ("status", "int"),
+    ("brokerage_cooperation", "int"),
+    ("images", "list<str>"),
+    ("infomation_legal_docs_id", "list<int>"),
+    ("infomation_hourse_status_id", "list<int>"),
+    ("infomation_usage_condition_id", "list<int>"),
+    ("infomation_location_type_id", "list<int>"),
+    ("land_info_utilities_id", "list<int>"),
+    ("land_info_security_id", "list<int>"),
+    ("land_info_road_type_id", "int"),
+    ("other_info", "other_info"),
+    ("exported_at", "timestamp"),
+)
+
+_lock = threading.Lock()
+# date → real_estate_code đã có trong dataset (nạp từ đĩa lần đầu gặp ngày đó)
+_exported: Dict[str, Set[str]] = {}
+_warned = False
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pa():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return pa, ds
+
+
+def _arrow_type(pa, kind: str):
+    return {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+        "list<int>": pa.list_(pa.int64()),
+        "list<str>": pa.list_(pa.string()),
+        "other_info": pa.struct([("pid", pa.string()), ("href", pa.string())]),
+        "timestamp": pa.timestamp("ms"),
+    }[kind]
+
+
+def schema(include_partitions: bool = True):
+    """pyarrow.Schema của dataset (mặc định gồm cả cột partition date / province_id)."""
+    pa, _ = _pa()
+    fields = [pa.field(name, _arrow_type(pa, kind)) for name, kind in SCHEMA_FIELDS]
+    if include_partitions:
+        fields += [pa.field("date", pa.string()), pa.field("province_id", pa.int64())]
+    return pa.schema(fields)
+
+
+def _partitioning():
+    pa, ds = _pa()
+    return ds.partitioning(pa.schema([("date", pa.string()), ("province_id", pa.int64())]), flavor="hive")
+
+
+# ---------------------------------------------------------------------------
+# Chuẩn hóa record → row đúng kiểu
+# ---------------------------------------------------------------------------
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or value == "" or isinstance(value, (list, dict)):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_price(value: Any) -> Optional[int]:
+    # transform lưu giá "Thỏa thuận" / không parse được là 0: null để filter ("price", "<", x) không khớp
+    price = _to_int(value)
+    return price if price is not None and price > 0 else None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _to_list(value: Any, convert) -> List[Any]:
+    # infomation_* có thể là một id đơn lẻ hoặc list (theo example.json)
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [v for v in (convert(x) for x in values) if v is not None]
+
+
+def _lat_lng(lat_long: Any) -> Tuple[Optional[float], Optional[float]]:
+    if not lat_long or "," not in str(lat_long):
+        return None, None
+    lat, lng = str(lat_long).split(",", 1)
+    return _to_float(lat.strip()), _to_float(lng.strip())
+
+
+def to_row(record: Dict[str, Any], date: str, exported_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Record format example.json → dict đúng SCHEMA_FIELDS (+ date, province_id)."""
+    row: Dict[str, Any] = {}
+    for name, kind in SCHEMA_FIELDS:
+        value = record.get(name)
+        if name == "price":
+            row[name] = _to_price(value)
+        elif kind == "int":
+            row[name] = _to_int(value)
+        elif kind == "float":
+            row[name] = _to_float(value)
+        elif kind == "str":
+            row[name] = _to_str(value)
+        elif kind == "list<int>":
+            row[name] = _to_list(value, _to_int)
+        elif kind == "list<str>":
+            row[name] = _to_list(value, _to_str)
+        elif kind == "other_info":
+            info = value if isinstance(value, dict) else {}
+            row[name] = {"pid": _to_str(info.get("pid")), "href": _to_str(info.get("href"))}
+    row["lat"], row["lng"] = _lat_lng(record.get("lat_long"))
+    row["exported_at"] = exported_at or datetime.now()
+    row["date"] = date
+    row["province_id"] = _to_int(record.get("province_id"))
+    return row
+
+
+def date_for_results_file(results_file) -> str:
+    """Ngày của file kết quả (`YYYY-MM-DD[_filter].json`), mặc định hôm nay."""
+    stem = Path(results_file).name[:10]
+    try:
+        return datetime.strptime(stem, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return datetime.now().strftime("%Y-%m-%d")
+
+
+# ---------------------------------------------------------------------------
+# Ghi
+# ---------------------------------------------------------------------------
+
+def _base_dir(base_dir=None) -> Path:
+    return Path(base_dir or config.PARQUET_DIR)
+
+
+def _existing_codes(base: Path, date: str) -> Set[str]:
+    if not (base / f"date={date}").exists():
+        return set()
+    table = read_table([("date", "=", date)], columns=["real_estate_code"], base_dir=base)
+    return {code for code in table.column("real_estate_code").to_pylist() if code}
+
+
+def append_records(records: Iterable[Dict[str, Any]], date: str, base_dir=None) -> int:
+    """Ghi thêm các record chưa export của `date` thành file part mới. Trả về số record đã ghi."""
+    pa, ds = _pa()
+    base = _base_dir(base_dir)
+    with _lock:
+        cache_key = f"{base}|{date}"
+        if cache_key not in _exported:
+            _exported[cache_key] = _existing_codes(base, date)
+        seen = _exported[cache_key]
+
+        now = datetime.now()
+        rows = []
+        keys = []
+        for record in records:
+            key = storage.result_key(record)
+            if key is not None and key in seen:
+                continue
+            rows.append(to_row(record, date, now))
+            keys.append(key)
+        if not rows:
+            return 0
+
+        table = pa.Table.from_pylist(rows, schema=schema())
+        ds.write_dataset(
+            table,
+            base,
+            format="parquet",
+            partitioning=_partitioning(),
+            basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        seen.update(k for k in keys if k is not None)
+        return len(rows)
+
+
+def compact(date: str, base_dir=None) -> int:
+    """Gộp các file part của một ngày thành một file / province_id (sau nhiều lần append theo trang)."""
+    _, ds = _pa()
+    base = _base_dir(base_dir)
+    part_dir = base / f"date={date}"
+    with _lock:
+        if not part_dir.exists():
+            return 0
+        table = read_table([("date", "=", date)], base_dir=base)
+        stamp = time.time_ns()
+        tmp_dir = base / f".compact-{stamp}"
+        old_dir = base / f".old-{stamp}"
+        ds.write_dataset(
+            table,
+            tmp_dir,
+            format="parquet",
+            partitioning=_partitioning(),
+            basename_template=f"part-{stamp}-{{i}}.parquet",
+        )
+        os.replace(part_dir, old_dir)
+        os.replace(tmp_dir / f"date={date}", part_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return table.num_rows
+
+
+def export_results(records: Sequence[Dict[str, Any]], results_file) -> int:
+    """Hook cho save_results: export nếu config.PARQUET_ENABLED; thiếu pyarrow thì cảnh báo một lần và bỏ qua."""
+    global _warned
+    if not config.PARQUET_ENABLED:
+        return 0
+    if not available():
+        if not _warned:
+            print("[Parquet] pyarrow chưa được cài đặt, bỏ qua export Parquet (pip install pyarrow)")
+            _warned = True
+        return 0
+    try:
+        written = append_records(records, date_for_results_file(results_file))
+    except Exception as e:
+        print(f"[Parquet] Lỗi khi export: {e}")
+        return 0
+    if written:
+        print(f"[Parquet] +{written} records → {config.PARQUET_DIR}")
+    return written
+
+
+def finish_run(results_file) -> None:
+    """Cuối lần chạy: gộp các part đã append trong ngày của `results_file` (nếu export Parquet đang bật)."""
+    if not config.PARQUET_ENABLED or not available():
+        return
+    date = date_for_results_file(results_file)
+    try:
+        rows = compact(date)
+    except Exception as e:
+        print(f"[Parquet] Lỗi khi compact {date}: {e}")
+        return
+    if rows:
+        print(f"[Parquet] Compacted {rows} records cho {date}")
+
+
+# ---------------------------------------------------------------------------
+# Đọc
+# ---------------------------------------------------------------------------
+
+_OPS = ("=", "==", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+
+def filters_to_expression(filters: Optional[Sequence[Tuple[str, str, Any]]]):
+    """[("province_id", "=", 24), ("date", ">=", "2025-11-01"), ("price", "<", 5e9)] → pyarrow expression (AND)."""
+    _, ds = _pa()
+    expr = None
+    for column, op, value in filters or ():
+        field = ds.field(column)
+        if op in ("=", "=="):
+            cond = field == value
+        elif op == "!=":
+            cond = field != value
+        elif op == "<":
+            cond = field < value
+        elif op == "<=":
+            cond = field <= value
+        elif op == ">":
+            cond = field > value
+        elif op == ">=":
+            cond = field >= value
+        elif op == "in":
+            cond = field.isin(list(value))
+        elif op == "not in":
+            cond = ~field.isin(list(value))
+        else:
+            raise ValueError(f"Toán tử không hỗ trợ: {op!r} (hỗ trợ: {', '.join(_OPS)})")
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def dataset(base_dir=None):
+    _, ds = _pa()
+    return ds.dataset(_base_dir(base_dir), format="parquet", schema=schema(), partitioning=_partitioning())
+
+
+def read_table(filters=None, columns: Optional[List[str]] = None, base_dir=None):
+    """Đọc dataset thành pyarrow.Table; filter trên date / province_id chỉ mở các partition khớp."""
+    return dataset(base_dir).to_table(columns=columns, filter=filters_to_expression(filters))
@@ -0,0 +1,513 @@
+"""Engine crawl bất đồng bộ bằng Playwright: một browser, nhiều context cô lập chạy song song.
+
+Thay cho một Chrome điều khiển tuần tự qua Selenium (scraper.runner), engine này mở một Chromium (hoặc gắn vào
+Chrome ở DEBUGGER_ADDRESS qua CDP khi config.PLAYWRIGHT_CDP) với config.PLAYWRIGHT_CONTEXTS context, mỗi context
+có cookie / cache riêng và một page. Mỗi URL list là một task asyncio; các trang detail của một trang list chạy
+thành task song song, giới hạn bởi semaphore config.PLAYWRIGHT_CONCURRENCY. Lịch sự được giữ theo từng context:
+hai lần điều hướng liên tiếp trên cùng một context cách nhau uniform(*config.PLAYWRIGHT_CONTEXT_DELAY) giây
+(nhân SLEEP_SCALE), nên tốc độ tổng tăng theo số context thay vì bỏ delay.
+
+Selector và quy tắc trích xuất dùng chung với collectors/ (select_cards, fill_item_from_snapshot): trang list và
+trang detail được đọc bằng một lần `page.evaluate` thay vì hàng chục round trip WebDriver. Kết quả đi vào cùng
+CrawlState / seen-set / file kết quả như engine Selenium. Chọn engine qua run_scraper(engine="playwright") hoặc
+env SCRAPER_ENGINE=playwright; cần `pip install playwright && playwright install chromium`.
+
+Có cấu hình proxy (scraper.egress_pool) thì mỗi context đi qua proxy dính với nó, chờ token bucket của proxy trước
+mỗi lần điều hướng và báo CAPTCHA / thành công về proxy đó; proxy bị cho nghỉ thì context được tạo lại qua proxy khác.
+
+Khác engine Selenium: filter địa điểm chỉ dùng chỉ mục offline (craw/build_location_index.py), không nhập ô tìm kiếm.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from random import uniform
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+from . import config, egress_pool, locations, metrics, tracing, utils
+from .collectors.detail import fill_item_from_snapshot, is_captcha_page
+from .collectors.listing import select_cards
+
+LIST_CARDS_JS = """
+() => Array.from(document.querySelectorAll("#product-lists-web a.js__product-link-for-product-id")).map(a => [
+    a.getAttribute("data-product-id"),
+    a.href,
+    Array.from(a.querySelectorAll(".re__card-published-info-published-at"))
+        .flatMap(s => [s.getAttribute("aria-label"), s.textContent]),
+])
+"""
+
+NEXT_PAGE_JS = """
+() => {
+    const active = document.querySelector(".re__pagination-number.re__actived");
+    const current = parseInt(active && active.getAttribute("pid")) || 1;
+    const next = document.querySelector(`a.re__pagination-number[pid="${current + 1}"]`);
+    return next ? next.href : null;
+}
+"""
+
+DETAIL_SNAPSHOT_JS = """
+() => {
+    const one = sel => document.querySelector(sel);
+    const text = el => el ? (el.innerText || "").trim() : "";
+    const pairs = (sel, keySel, valueSel) => {
+        const out = {};
+        document.querySelectorAll(sel).forEach(el => {
+            const k = el.querySelector(keySel), v = el.querySelector(valueSel);
+            if (k && v) out[text(k)] = text(v);
+        });
+        return out;
+    };
+    const phone = one('div[kyc-tracking-id="lead-phone-ldp"], div[kyc-tracking-id="lead-phone-ldp"] .re__btn');
+    const iframe = one("div.re__pr-map iframe");
+    return {
+        title: text(one("h1.re__pr-title")),
+        short_info: Array.from(document.querySelectorAll(".re__pr-short-info .re__pr-short-info-item")).map(el => [
+            text(el.querySelector("span.value")), text(el.querySelector("span.ext")), text(el),
+        ]),
+        specs: pairs(".re__pr-specs-content-item", ".re__pr-specs-content-item-title", ".re__pr-specs-content-item-value"),
+        address: text(one("#product-detail-web span.re__pr-short-description.js__pr-address")),
+        description: text(one("div.re__section-body.re__detail-content.js__section-body.js__pr-description")),
+        images: Array.from(document.querySelectorAll(".re__media-thumbs img"))
+            .map(img => img.getAttribute("src") ? img.src : img.getAttribute("data-src")),
+        config: pairs(".re__pr-short-info-item.js__pr-config-item", ".title", ".value"),
+        contact_name: phone ? (phone.getAttribute("data-kyc-name") || "").trim() : "",
+        map_link: iframe ? (iframe.getAttribute("src") ? iframe.src : (iframe.getAttribute("data-src") || "")) : "",
+    };
+}
+"""
+
+
+class _Slot:
+    """Một context (cookie / cache riêng) + page của nó, kèm mốc thời gian được điều hướng lần kế tiếp."""
+
+    def __init__(self, index: int, context, page):
+        self.index = index
+        self.context = context
+        self.page = page
+        self.next_at = 0.0
+        self.navigations = 0
+
+    @property
+    def egress_key(self) -> str:
+        return f"playwright-{self.index}"
+
+    async def goto(self, url: str, kind: str):
+        """Điều hướng sau khi đã chờ đủ delay lịch sự của context này (và token bucket của proxy, nếu có)."""
+        wait = self.next_at - time.monotonic()
+        egress = egress_pool.shared_pool()
+        if egress is not None:
+            wait = max(wait, egress.reserve(self.egress_key))
+        if wait > 0:
+            await asyncio.sleep(wait)
+            metrics.inc("scraper_sleep_seconds_total", wait, kind="context")
+        try:
+            with tracing.span("navigate", context=self.index), metrics.timer("scraper_page_load_seconds", kind=kind):
+                return await self.page.goto(url, wait_until="domcontentloaded",
+                                            timeout=config.PAGE_LOAD_TIMEOUT * 1000)
+        finally:
+            self.navigations += 1
+            self.next_at = time.monotonic() + uniform(*config.PLAYWRIGHT_CONTEXT_DELAY) * config.SLEEP_SCALE
+
+    async def scroll(self, steps: int, a: float, b: float):
+        for _ in range(steps):
+            try:
+                await self.page.evaluate("window.scrollBy(0, 1200)")
+            except Exception:
+                return
+            await asyncio.sleep(uniform(a, b) * config.SLEEP_SCALE)
+
+
+class PlaywrightEngine:
+    """
+    Crawl các URL list / sitemap vào `state` (CrawlState) với một browser Playwright.
+
+    Dùng qua `run(...)`; các tham số giống scrape_url / scrape_sitemap của engine Selenium.
+    """
+
+    def __init__(
+        self,
+        state,
+        scraped_pids,
+        scraped_hrefs,
+        filters: Optional[Dict[str, Any]] = None,
+        status_callback: Optional[Dict[str, Any]] = None,
+        incremental: bool = False,
+        contexts: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.state = state
+        self.scraped_pids = scraped_pids
+        self.scraped_hrefs = scraped_hrefs
+        self.filters = filters
+        self.status_callback = status_callback
+        self.incremental = incremental
+        self.contexts = max(1, contexts or config.PLAYWRIGHT_CONTEXTS)
+        self.concurrency = max(1, concurrency or config.PLAYWRIGHT_CONCURRENCY)
+        self.date_from, self.date_to = utils.parse_date_bounds(filters)
+        self._playwright = None
+        self._browser = None
+        self._slots: List[_Slot] = []
+        self._free: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # -----------------------------------------------------------------------
+    # Browser / context
+    # -----------------------------------------------------------------------
+
+    async def start(self, debugger_address: Optional[str] = None):
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as e:
+            raise RuntimeError(
+                "Engine playwright cần gói playwright: pip install playwright && playwright install chromium"
+            ) from e
+
+        self._playwright = await async_playwright().start()
+        if config.PLAYWRIGHT_CDP:
+            address = debugger_address or config.DEBUGGER_ADDRESS
+            self._browser = await self._playwright.chromium.connect_over_cdp(f"http://{address}")
+        else:
+            self._browser = await self._playwright.chromium.launch(
+                headless=config.PLAYWRIGHT_HEADLESS,
+                args=["--disable-blink-features=AutomationControlled"],
+            )
+
+        self._free = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        for index in range(self.contexts):
+            slot = _Slot(index, *await self._new_context(f"playwright-{index}"))
+            self._slots.append(slot)
+            self._free.put_nowait(slot)
+        print(f"[Playwright] {self.contexts} context, tối đa {self.concurrency} trang song song")
+
+    async def _new_context(self, egress_key: str):
+        """(context, page) mới; đi qua proxy dính với egress_key nếu có pool proxy."""
+        options = {"locale": "vi-VN", "viewport": {"width": 1366, "height": 900}}
+        egress = egress_pool.shared_pool()
+        if egress is not None:
+            proxy = egress.assign(egress_key)
+            options["proxy"] = {"server": proxy.server}
+            if proxy.username:
+                options["proxy"].update(username=proxy.username, password=proxy.password or "")
+        context = await self._browser.new_context(**options)
+        context.set_default_timeout(config.WAIT_TIMEOUT * 1000)
+        if config.PLAYWRIGHT_BLOCK_RESOURCES:
+            await context.route("**/*", self._route)
+        return context, await context.new_page()
+
+    async def _renew(self, slot: _Slot):
+        """Proxy của context đang nghỉ / bị cách ly: đóng context, tạo lại qua proxy khác (cookie mới)."""
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+        slot.context, slot.page = await self._new_context(slot.egress_key)
+        metrics.inc("scraper_playwright_context_renewals_total")
+
+    @staticmethod
+    async def _route(route):
+        if route.request.resource_type in config.PLAYWRIGHT_BLOCK_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def close(self):
+        for slot in self._slots:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        self._slots = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @asynccontextmanager
+    async def _lease(self):
+        """Semaphore + một context rảnh; trả context lại pool khi xong."""
+        async with self._semaphore:
+            slot = await self._free.get()
+            try:
+                egress = egress_pool.shared_pool()
+                if egress is not None and not egress.usable(slot.egress_key):
+                    await self._renew(slot)
+                yield slot
+            finally:
+                self._free.put_nowait(slot)
+
+    def _save(self):
+        # save() đồng bộ, chạy ngay trên event loop: không task nào append vào state trong lúc đang gộp file
+        with tracing.span("save", total=len(self.state)):
+            self.state.save()
+
+    # -----------------------------------------------------------------------
+    # Trang list
+    # -----------------------------------------------------------------------
+
+    async def _harvest(self, slot: _Slot, url: str, kind: str):
+        """Mở trang list, trả về (items, total_cards, page_stats, next_href)."""
+        await slot.goto(url, kind)
+        try:
+            await slot.page.wait_for_selector("#product-lists-web a.js__product-link-for-product-id",
+                                              timeout=20 * 1000)
+        except Exception:
+            pass
+        await slot.scroll(config.LIST_SCROLL_STEPS, 0.3, 0.3)
+        with tracing.span("harvest"), metrics.timer("scraper_listing_harvest_seconds"):
+            cards = await slot.page.evaluate(LIST_CARDS_JS)
+            next_href = await slot.page.evaluate(NEXT_PAGE_JS)
+
+        check_dates = bool(self.date_from or self.date_to)
+
+        def parsed():
+            for pid, href, date_texts in cards:
+                card_date = None
+                if check_dates:
+                    card_date = next(filter(None, map(utils.parse_card_date, date_texts)), None)
+                yield pid, href, card_date
+
+        items, page_stats = select_cards(parsed(), self.scraped_pids, self.scraped_hrefs,
+                                         self.date_from, self.date_to)
+        return items, len(cards), page_stats, next_href
+
+    # -----------------------------------------------------------------------
+    # Trang detail
+    # -----------------------------------------------------------------------
+
+    async def _detail(self, item: dict) -> dict:
+        async with self._lease() as slot:
+            with metrics.timer("scraper_detail_seconds"):
+                href = item["href"]
+                print(f"  -> Opening detail: {href} (context {slot.index})")
+                await slot.goto(href, "detail")
+                await slot.scroll(config.DETAIL_SCROLL_STEPS, 0.1, 0.3)
+
+                page = slot.page
+                if is_captcha_page(page.url, await page.content()):
+                    fname = os.path.join(config.SCREENSHOT_DIR, f"captcha_detail_{item['pid']}.png")
+                    try:
+                        await page.screenshot(path=fname)
+                    except Exception:
+                        pass
+                    print("CAPTCHA detected:", href)
+                    metrics.inc("scraper_captcha_total", stage="detail")
+                    egress_pool.report(slot.egress_key, "captcha")
+                    return item
+                egress_pool.report(slot.egress_key, "ok")
+
+                try:
+                    await page.wait_for_selector("h1.re__pr-title")
+                except Exception:
+                    pass
+                with tracing.span("extract"), metrics.timer("scraper_detail_extractor_seconds", extractor="snapshot"):
+                    snapshot = await page.evaluate(DETAIL_SNAPSHOT_JS)
+                return fill_item_from_snapshot(item, snapshot)
+
+    async def _process_item(self, item: dict, label: str) -> bool:
+        """Giống một vòng của runner.process_detail_items: mở detail, lọc ngày, thêm vào state."""
+        from .runner import is_out_of_date_range
+
+        with tracing.span("item", pid=item.get("pid")) as item_span:
+            try:
+                full = await self._detail(item)
+            except Exception as e:
+                item_span["error"] = str(e)[:200]
+                print("  -> error on detail:", e)
+                return False
+
+            if (self.date_from or self.date_to) and is_out_of_date_range(full, self.date_from, self.date_to):
+                item_span["kept"] = False
+                return False
+
+            self.state.append(full)
+            metrics.inc("scraper_items_total")
+            if full.get("pid"):
+                self.scraped_pids.add(full.get("pid"))
+            if full.get("href"):
+                self.scraped_hrefs.add(full.get("href"))
+            item_span["kept"] = True
+            if self.status_callback:
+                self.status_callback["total_items"] = len(self.state)
+                self.status_callback["progress"] = f"{label} - {len(self.state)} items"
+            return True
+
+    async def _process_items(self, items: List[dict], label: str) -> int:
+        with tracing.span("details", items=len(items)):
+            kept = await asyncio.gather(*(self._process_item(item, label) for item in items))
+        self._save()
+        return sum(kept)
+
+    # -----------------------------------------------------------------------
+    # Một URL list / sitemap
+    # -----------------------------------------------------------------------
+
+    async def scrape_url(self, base_url: str) -> Optional[dict]:
+        from .runner import list_start_url
+
+        url = list_start_url(base_url, self.filters, self.incremental)
+        if url is None:
+            return None
+        print(f"[Playwright] URL cuối cùng để scrape: {url}")
+
+        filters = self.filters or {}
+        max_pages = filters.get("max_pages", config.MAX_PAGES)
+        max_items_per_page = filters.get("max_items_per_page", config.MAX_ITEMS_PER_PAGE)
+        items_before = len(self.state)
+        known_page_streak = known_card_streak = 0
+        stop_reason = "max_pages"
+        page_idx = 0
+
+        while url and page_idx < max_pages:
+            page_idx += 1
+            with tracing.span("page", page=page_idx, url=url) as page_span:
+                if self.status_callback:
+                    self.status_callback["current_page"] = page_idx
+                    self.status_callback["current_url"] = url
+                async with self._lease() as slot:
+                    collected, total_cards, page_stats, next_href = await self._harvest(
+                        slot, url, "list" if page_idx == 1 else "pagination"
+                    )
+                collected = collected[:max_items_per_page]
+                page_span["cards"] = total_cards
+                page_span["collected"] = len(collected)
+
+                known_flags = page_stats["known_flags"]
+                for known in known_flags:
+                    known_card_streak = known_card_streak + 1 if known else 0
+                known_page_streak = known_page_streak + 1 if known_flags and all(known_flags) else 0
+                incremental_stop = None
+                if self.incremental:
+                    if known_page_streak >= config.INCREMENTAL_KNOWN_PAGES:
+                        incremental_stop = "known_pages"
+                    elif known_card_streak >= config.INCREMENTAL_KNOWN_CARDS:
+                        incremental_stop = "known_cards"
+
+                if collected:
+                    print(f"[Playwright] Trang {page_idx}: {len(collected)}/{total_cards} card mới")
+                    await self._process_items(collected, f"Trang {page_idx}/{max_pages}")
+                elif (
+                    self.date_from and total_cards
+                    and page_stats["cards_dated"] == total_cards and page_stats["cards_older"] == total_cards
+                ):
+                    stop_reason = "date_bound"
+                    break
+
+                if collected and page_stats["tail_older"]:
+                    stop_reason = "date_bound"
+                    break
+                if incremental_stop:
+                    stop_reason = incremental_stop
+                    break
+                if page_idx >= max_pages:
+                    break
+                if not next_href:
+                    stop_reason = "no_next_page"
+                    break
+                url = urljoin(url, next_href)
+                if collected:
+                    seconds = config.PAGE_COOLDOWN_SECONDS * config.SLEEP_SCALE
+                    with tracing.span("cooldown", seconds=seconds):
+                        await asyncio.sleep(seconds)
+                    metrics.inc("scraper_sleep_seconds_total", seconds, kind="cooldown")
+
+        report = {
+            "url": base_url,
+            "pages": page_idx,
+            "items": len(self.state) - items_before,
+            "stop_reason": stop_reason,
+        }
+        print(f"[Report] {base_url}: {page_idx} pages, {report['items']} new items, stop_reason={stop_reason}")
+        return report
+
+    async def scrape_sitemap(self, sitemap_source, base_urls=None) -> dict:
+        from . import sitemap
+
+        path_prefixes = [locations.property_path_from_url(u) for u in (base_urls or [])] or None
+        filters = self.filters or {}
+        max_items = None
+        if filters.get("max_pages") and filters.get("max_items_per_page"):
+            max_items = int(filters["max_pages"]) * int(filters["max_items_per_page"])
+
+        items_before = len(self.state)
+        batch_idx = 0
+        batch: List[dict] = []
+        discovered = sitemap.discover_new_items(
+            sitemap_source, self.scraped_pids, self.scraped_hrefs,
+            path_prefixes=path_prefixes, since=self.date_from, limit=max_items,
+        )
+        # Lô lớn hơn engine Selenium để mọi context đều có việc
+        batch_size = max(config.SITEMAP_BATCH_SIZE, self.concurrency * 4)
+        for item in discovered:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                batch_idx += 1
+                await self._process_items(batch, f"Sitemap lô {batch_idx}")
+                batch = []
+        if batch:
+            batch_idx += 1
+            await self._process_items(batch, f"Sitemap lô {batch_idx}")
+
+        report = {
+            "url": str(sitemap_source),
+            "pages": batch_idx,
+            "items": len(self.state) - items_before,
+            "stop_reason": "sitemap_exhausted",
+        }
+        print(f"[Report] sitemap: {batch_idx} batches, {report['items']} new items")
+        return report
+
+    async def crawl(self, base_urls: List[str], sitemap_source=None) -> List[dict]:
+        if sitemap_source:
+            return [await self.scrape_sitemap(sitemap_source, base_urls)]
+
+        async def one(url):
+            try:
+                return await self.scrape_url(url)
+            except Exception as e:
+                print(f"Error processing URL {url}: {e}")
+                if self.status_callback:
+                    self.status_callback["error"] = str(e)
+                return None
+
+        reports = await asyncio.gather(*(one(url) for url in base_urls))
+        return [report for report in reports if report]
+
+
+def run(
+    base_urls: List[str],
+    state,
+    scraped_pids,
+    scraped_hrefs,
+    filters: Optional[Dict[str, Any]] = None,
+    status_callback: Optional[Dict[str, Any]] = None,
+    incremental: bool = False,
+    sitemap_source=None,
+    debugger_address: Optional[str] = None,
+    contexts: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> List[dict]:
+    """Chạy engine Playwright tới khi xong mọi URL; trả về url_reports như run_scraper."""
+
+    async def main():
+        engine = PlaywrightEngine(
+            state, scraped_pids, scraped_hrefs,
+            filters=filters, status_callback=status_callback, incremental=incremental,
+            contexts=contexts, concurrency=concurrency,
+        )
+        try:
+            await engine.start(debugger_address)
+            return await engine.crawl(base_urls, sitemap_source)
+        finally:
+            await engine.close()
+
+    return asyncio.run(main())
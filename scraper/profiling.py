@@ -0,0 +1,324 @@
+"""Chế độ profiling cho lần chạy crawler / save.
+
+Hai engine:
+  - "cprofile": cProfile, ghi `<base>.pstats` + bảng `<base>.txt` + collapsed stack (xấp xỉ, dựng
+    từ call graph của pstats) `<base>.collapsed`.
+  - "sampling": thread lấy mẫu `sys._current_frames()` định kỳ, ghi collapsed stack chính xác
+    `<base>.collapsed` (dùng được với flamegraph.pl / speedscope).
+
+Hai phạm vi:
+  - "run": profile toàn bộ lần chạy.
+  - "hot": chỉ profile các đoạn CPU-bound được đánh dấu bằng `hot(...)` (save_results,
+    transform_to_example_format, tra mapping) — bỏ qua thời gian chờ trình duyệt.
+
+Khi bật, mỗi lần save_results còn chụp một snapshot tracemalloc (`<base>.mem/`) và ghi tóm tắt
+bộ nhớ + top tăng trưởng vào `<base>.memory.txt`.
+
+Option dạng chuỗi "<engine>[:<scope>]", ví dụ "cprofile", "sampling:hot", hoặc True (= "cprofile").
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+ENGINES = ("cprofile", "sampling")
+SCOPES = ("run", "hot")
+DEFAULT_SAMPLE_INTERVAL = 0.005
+MEMORY_TOP = 15
+
+
+def parse_profile_option(value) -> Optional[tuple[str, str]]:
+    """True / "cprofile" / "sampling:hot" / {"engine":..., "scope":...} → (engine, scope) hoặc None."""
+    if not value:
+        return None
+    if value is True:
+        return "cprofile", "run"
+    if isinstance(value, dict):
+        engine, scope = value.get("engine") or "cprofile", value.get("scope") or "run"
+    else:
+        text = str(value).strip().lower()
+        if text in ("1", "true", "yes", "on"):
+            return "cprofile", "run"
+        engine, _, scope = text.partition(":")
+        scope = scope or "run"
+    if engine not in ENGINES:
+        raise ValueError(f"profile engine phải là một trong {ENGINES}, nhận được: {engine!r}")
+    if scope not in SCOPES:
+        raise ValueError(f"profile scope phải là một trong {SCOPES}, nhận được: {scope!r}")
+    return engine, scope
+
+
+def profile_path_for(results_file) -> Path:
+    path = Path(results_file)
+    return path.with_name(f"{path.stem}.profile")
+
+
+# ---------------------------------------------------------------------------
+# Sampling profiler
+# ---------------------------------------------------------------------------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float, thread_filter: Callable[[int], bool]):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == own or not self.thread_filter(tid):
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(parts))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+# ---------------------------------------------------------------------------
+# Session
+# ---------------------------------------------------------------------------
+
+class _Session:
+    def __init__(self, base: Path, engine: str, scope: str, interval: float, memory: bool):
+        self.base = base
+        self.engine = engine
+        self.scope = scope
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.depth: dict[int, int] = {}
+        self.started = time.perf_counter()
+        self.profiler: Optional[cProfile.Profile] = None
+        self.sampler: Optional[_Sampler] = None
+        self.snapshot_idx = 0
+        self.prev_snapshot = None
+        self.owner = threading.get_ident()
+
+        if engine == "cprofile":
+            self.profiler = cProfile.Profile()
+            if scope == "run":
+                self.profiler.enable()
+        else:
+            if scope == "run":
+                self.sampler = _Sampler(interval, lambda tid: tid == self.owner or self.depth.get(tid, 0) > 0)
+            else:
+                self.sampler = _Sampler(interval, lambda tid: self.depth.get(tid, 0) > 0)
+            self.sampler.start()
+
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+
+    def enter_hot(self):
+        tid = threading.get_ident()
+        with self.lock:
+            depth = self.depth.get(tid, 0)
+            self.depth[tid] = depth + 1
+        if depth == 0 and self.profiler is not None and self.scope == "hot":
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Python 3.12+: cProfile dùng sys.monitoring chung cho mọi thread, đã bật ở thread khác
+                pass
+
+    def exit_hot(self):
+        tid = threading.get_ident()
+        with self.lock:
+            depth = self.depth.get(tid, 1) - 1
+            if depth:
+                self.depth[tid] = depth
+            else:
+                self.depth.pop(tid, None)
+        if depth == 0 and self.profiler is not None and self.scope == "hot":
+            self.profiler.disable()
+
+    def memory_snapshot(self, label: str):
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        with self.lock:
+            self.snapshot_idx += 1
+            idx = self.snapshot_idx
+            snap = tracemalloc.take_snapshot()
+            prev, self.prev_snapshot = self.prev_snapshot, snap
+
+        snap_dir = Path(f"{self.base}.mem")
+        snap_dir.mkdir(parents=True, exist_ok=True)
+        snap.dump(str(snap_dir / f"{idx:04d}-{label}.snapshot"))
+
+        current, peak = tracemalloc.get_traced_memory()
+        if prev is not None:
+            top = snap.compare_to(prev, "lineno")[:MEMORY_TOP]
+        else:
+            top = snap.statistics("lineno")[:MEMORY_TOP]
+        with open(f"{self.base}.memory.txt", "a", encoding="utf-8") as f:
+            f.write(
+                f"=== #{idx} {label} t={time.perf_counter() - self.started:.1f}s "
+                f"current={current / 1e6:.2f}MB peak={peak / 1e6:.2f}MB ===\n"
+            )
+            for stat in top:
+                f.write(f"  {stat}\n")
+
+    def finish(self) -> dict[str, str]:
+        files: dict[str, str] = {}
+        if self.profiler is not None:
+            self.profiler.disable()
+            pstats_file = f"{self.base}.pstats"
+            self.profiler.dump_stats(pstats_file)
+            files["pstats"] = pstats_file
+
+            stats = pstats.Stats(self.profiler)
+            buf = io.StringIO()
+            stats.stream = buf
+            stats.sort_stats("cumulative").print_stats(60)
+            stats.sort_stats("tottime").print_stats(30)
+            with open(f"{self.base}.txt", "w", encoding="utf-8") as f:
+                f.write(buf.getvalue())
+            files["report"] = f"{self.base}.txt"
+
+            files["collapsed"] = _write_collapsed(f"{self.base}.collapsed", _pstats_to_collapsed(stats))
+
+        if self.sampler is not None:
+            self.sampler.stop()
+            files["collapsed"] = _write_collapsed(f"{self.base}.collapsed", self.sampler.stacks)
+            print(f"[Profile] {self.sampler.samples} samples")
+
+        if self.memory and tracemalloc.is_tracing():
+            self.memory_snapshot("final")
+            files["memory"] = f"{self.base}.memory.txt"
+            tracemalloc.stop()
+        return files
+
+
+def _pstats_label(func: tuple) -> str:
+    filename, lineno, name = func
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def _pstats_to_collapsed(stats: pstats.Stats) -> Counter[str]:
+    """
+    Collapsed stack xấp xỉ từ pstats: self time của mỗi hàm được gán cho chuỗi caller
+    nặng nhất (theo cumulative time) đi ngược lên gốc. Đơn vị: micro giây.
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers{func: (cc, nc, tt, ct)})
+    heaviest_caller: dict[tuple, Optional[tuple]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        best = max(callers.items(), key=lambda kv: kv[1][3], default=None)
+        heaviest_caller[func] = best[0] if best else None
+
+    stacks: Counter[str] = Counter()
+    for func, (_, _, tt, _, _) in raw.items():
+        weight = int(tt * 1_000_000)
+        if weight <= 0:
+            continue
+        chain = [func]
+        seen = {func}
+        parent = heaviest_caller.get(func)
+        while parent is not None and parent not in seen and len(chain) < 200:
+            chain.append(parent)
+            seen.add(parent)
+            parent = heaviest_caller.get(parent)
+        stacks[";".join(_pstats_label(f) for f in reversed(chain))] += weight
+    return stacks
+
+
+def _write_collapsed(path: str, stacks: Counter[str]) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+_session: Optional[_Session] = None
+
+
+def start_profile(
+    base,
+    engine: str = "cprofile",
+    scope: str = "run",
+    interval: float = DEFAULT_SAMPLE_INTERVAL,
+    memory: bool = True,
+) -> None:
+    """Bắt đầu một phiên profile; file output có prefix `base` (xem profile_path_for)."""
+    global _session
+    stop_profile()
+    base = Path(base)
+    base.parent.mkdir(parents=True, exist_ok=True)
+    _session = _Session(base, engine, scope, interval, memory)
+    print(f"[Profile] engine={engine} scope={scope} → {base}.*")
+
+
+def stop_profile() -> dict[str, str]:
+    """Kết thúc phiên profile hiện tại, trả về dict các file đã ghi."""
+    global _session
+    session, _session = _session, None
+    if session is None:
+        return {}
+    files = session.finish()
+    for kind, path in files.items():
+        print(f"[Profile] {kind}: {path}")
+    return files
+
+
+def is_active() -> bool:
+    return _session is not None
+
+
+@contextmanager
+def hot_section():
+    """Đánh dấu đoạn CPU-bound được profile khi scope="hot"."""
+    session = _session
+    if session is None:
+        yield
+        return
+    session.enter_hot()
+    try:
+        yield
+    finally:
+        session.exit_hot()
+
+
+def hot(func: Callable) -> Callable:
+    """Decorator tương đương `hot_section` cho cả hàm."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _session is None:
+            return func(*args, **kwargs)
+        with hot_section():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def memory_snapshot(label: str) -> None:
+    """Chụp snapshot tracemalloc (gọi sau mỗi lần save trang); không làm gì nếu chưa bật profile."""
+    session = _session
+    if session is not None:
+        session.memory_snapshot(label)
+
@@ -0,0 +1,225 @@
+"""Re-export các file kết quả cũ (`output/YYYY-MM/*.json`, `output_filtered/...`) sau khi transform / mapping đổi.
+
+Mỗi file được giao cho một process trong pool. Worker load mapping đã compile (map.cache.pickle), district/ward
+JSON và ranh giới một lần trong initializer, rồi đi qua item bằng storage.iter_transform (remap=True): item
+thô được transform đầy đủ, item đã ở format mới được tính lại các id mapping. File nguồn được đọc dạng stream
+và kết quả được ghi qua serializer.atomic_open (file tạm + fsync + os.replace) nên file đích không bao giờ ở
+trạng thái ghi dở.
+
+Mỗi file xong được ghi nối vào manifest (JSONL) kèm chữ ký mapping + code; chạy lại với cùng chữ ký sẽ bỏ qua
+các file đã xong mà file đích chưa bị sửa từ đó (resume). Lưu ý: re-export tại chỗ file của ngày đang crawl
+có thể bị lần lưu tiếp theo của crawler ghi đè.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from . import config, geo, mapping, serializer, storage
+
+MANIFEST_NAME = ".reexport-manifest.jsonl"
+RESULT_FILE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}(_.*)?\.json$")
+MONTH_DIR_RE = re.compile(r"^\d{4}-\d{2}$")
+# Các module quyết định nội dung output: đổi code ở đây thì chữ ký đổi và mọi file được export lại
+_CODE_FILES = ("storage.py", "mapping.py", "geo.py", "serializer.py")
+
+
+def discover_files(roots: Iterable) -> List[Path]:
+    """Các file kết quả theo ngày (`YYYY-MM/YYYY-MM-DD[_filter].json`) dưới các thư mục gốc, file lớn trước."""
+    found = set()
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            found.add(root.resolve())
+            continue
+        for path in root.rglob("*.json"):
+            if MONTH_DIR_RE.match(path.parent.name) and RESULT_FILE_RE.match(path.name):
+                found.add(path.resolve())
+    return sorted(found, key=lambda p: (-p.stat().st_size, str(p)))
+
+
+def _sha256_files(paths: Iterable[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode())
+        if path.exists():
+            digest.update(mapping._file_sha256(path).encode())
+    return digest.hexdigest()
+
+
+def run_signature() -> str:
+    """Chữ ký của mapping (xlsx + JSON), ranh giới và code transform đang dùng."""
+    mapping_dir = Path(config.MAPPING_DIR)
+    boundaries = geo.boundaries_dir()
+    files = [mapping_dir / "map.xlsx", mapping_dir / "district_mapping.json", mapping_dir / "ward_mapping.json"]
+    if boundaries.is_dir():
+        files += sorted(p for p in boundaries.iterdir() if p.suffix in (".geojson", ".json"))
+    package_dir = Path(__file__).resolve().parent
+    files += [package_dir / name for name in _CODE_FILES]
+    return _sha256_files(files)[:16]
+
+
+def reexport_file(src, dst, chunk_size: int = 1000) -> Dict[str, Any]:
+    """Re-export một file (src → dst, có thể cùng đường dẫn). Trả về thống kê; lỗi được ghi vào "error"."""
+    src, dst = Path(src), Path(dst)
+    start = time.perf_counter()
+    stats: Dict[str, Any] = {"source": str(src), "output": str(dst), "items": 0, "pid": os.getpid()}
+    try:
+        items = (item for item in serializer.iter_items(src) if isinstance(item, dict))
+        with serializer.atomic_open(dst) as f:
+            stats["items"] = serializer.write_results_stream(f, storage.iter_transform(items, chunk_size, remap=True))
+        st = dst.stat()
+        stats.update(status="ok", output_size=st.st_size, output_mtime_ns=st.st_mtime_ns)
+    except Exception as e:
+        stats.update(status="error", error=f"{type(e).__name__}: {e}")
+    stats["seconds"] = round(time.perf_counter() - start, 4)
+    return stats
+
+
+def _init_worker(mapping_dir: str, boundaries_dir: Optional[str]):
+    """Initializer của process pool: trỏ config về đúng thư mục và load mapping / ranh giới một lần."""
+    config.MAPPING_DIR = Path(mapping_dir)
+    config.BOUNDARIES_DIR = boundaries_dir
+    mapping._load_mappings()
+    for json_file in ("district_mapping.json", "ward_mapping.json"):
+        try:
+            mapping._load_json_mapping(json_file)
+        except OSError:
+            pass
+    geo.get_resolver()
+
+
+# ---------------------------------------------------------------------------
+# Manifest (resume)
+# ---------------------------------------------------------------------------
+
+def load_manifest(path) -> Dict[str, Dict[str, Any]]:
+    """source → entry cuối cùng trong manifest."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    path = Path(path)
+    if not path.exists():
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # dòng ghi dở khi bị kill
+            entries[entry.get("source")] = entry
+    return entries
+
+
+def _is_done(entry: Optional[Dict[str, Any]], signature: str) -> bool:
+    if not entry or entry.get("status") != "ok" or entry.get("signature") != signature:
+        return False
+    try:
+        st = Path(entry["output"]).stat()
+    except (KeyError, OSError):
+        return False
+    return st.st_size == entry.get("output_size") and st.st_mtime_ns == entry.get("output_mtime_ns")
+
+
+def _output_for(src: Path, roots: List[Path], dest: Optional[Path]) -> Path:
+    if dest is None:
+        return src
+    for root in roots:
+        try:
+            return dest / root.name / src.relative_to(root)
+        except ValueError:
+            continue
+    return dest / src.name
+
+
+def reexport(
+    roots: Iterable = (),
+    dest=None,
+    workers: Optional[int] = None,
+    resume: bool = True,
+    chunk_size: int = 1000,
+    limit: int = 0,
+    manifest=None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Re-export mọi file kết quả dưới `roots` (mặc định config.OUTPUT_DIR, đã gồm output_filtered).
+
+    dest: None = ghi đè tại chỗ, hoặc thư mục đích (giữ cấu trúc `<tên root>/YYYY-MM/...`).
+    workers: số process (mặc định os.cpu_count()); <= 1 chạy ngay trong process hiện tại.
+    """
+    roots = [Path(r).resolve() for r in (roots or [config.OUTPUT_DIR])]
+    dest = Path(dest).resolve() if dest else None
+    if manifest:
+        manifest_path = Path(manifest)
+    else:
+        manifest_path = (dest or (roots[0] if roots[0].is_dir() else roots[0].parent)) / MANIFEST_NAME
+    workers = workers or os.cpu_count() or 1
+
+    # Compile trước ở process chính để các worker chỉ việc load pickle
+    mapping.compile_mappings()
+    signature = run_signature()
+    done = load_manifest(manifest_path) if resume else {}
+
+    files = discover_files(roots)
+    todo = [p for p in files if not _is_done(done.get(str(p)), signature)]
+    skipped = len(files) - len(todo)
+    if limit:
+        todo = todo[:limit]
+    summary: Dict[str, Any] = {
+        "signature": signature,
+        "files_found": len(files),
+        "files_skipped": skipped,
+        "files_ok": 0,
+        "files_failed": 0,
+        "items": 0,
+        "manifest": str(manifest_path),
+    }
+    print(f"[Reexport] {len(files)} file, {len(todo)} cần export (signature {signature}), {workers} worker")
+    if not todo:
+        summary["seconds"] = 0.0
+        return summary
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    jobs = [(src, _output_for(src, roots, dest)) for src in todo]
+    start = time.perf_counter()
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        def record(result: Dict[str, Any]):
+            result["signature"] = signature
+            manifest_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            manifest_file.flush()
+            if result["status"] == "ok":
+                summary["files_ok"] += 1
+                summary["items"] += result["items"]
+            else:
+                summary["files_failed"] += 1
+            if on_result:
+                on_result(result)
+
+        for result in _run_jobs(jobs, workers, chunk_size):
+            record(result)
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    summary["items_per_sec"] = round(summary["items"] / summary["seconds"], 1) if summary["seconds"] else None
+    return summary
+
+
+def _run_jobs(jobs, workers: int, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    if workers <= 1:
+        for src, dst in jobs:
+            yield reexport_file(src, dst, chunk_size)
+        return
+    initargs = (str(config.MAPPING_DIR), str(config.BOUNDARIES_DIR) if config.BOUNDARIES_DIR else None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = {pool.submit(reexport_file, str(src), str(dst), chunk_size): src for src, dst in jobs}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:  # worker chết (BrokenProcessPool, ...)
+                yield {"source": str(futures[future]), "status": "error", "items": 0, "seconds": 0.0,
+                       "error": f"{type(e).__name__}: {e}"}
@@ -0,0 +1,322 @@
+"""Kho kết quả SQLite (config.RESULTS_DB_PATH) ghi song song với file JSON của save_results.
+
+Mỗi record đã transform được upsert theo real_estate_code; các cột lọc / sắp xếp (tỉnh / quận / phường, giá,
+diện tích, ngày đăng, ...) được tách ra và đánh index, bản ghi đầy đủ nằm trong cột `payload` (JSON).
+query() trả về từng trang theo keyset pagination: cursor là (giá trị cột sắp xếp, real_estate_code) của dòng
+cuối trang trước nên trang sau vẫn đi thẳng vào index, không cần OFFSET.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from . import config, serializer, storage
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    real_estate_code    TEXT PRIMARY KEY,
+    province_id         INTEGER,
+    district_id         INTEGER,
+    ward_id             INTEGER,
+    real_estate_type_id INTEGER,
+    demand_id           INTEGER,
+    sale_type           TEXT,
+    price               INTEGER,
+    area                REAL,
+    posted_date         TEXT NOT NULL,
+    result_date         TEXT NOT NULL,
+    title               TEXT,
+    payload             TEXT NOT NULL,
+    payload_hash        TEXT NOT NULL,
+    updated_at          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_location ON results (province_id, district_id, ward_id);
+CREATE INDEX IF NOT EXISTS idx_results_district ON results (district_id, price);
+CREATE INDEX IF NOT EXISTS idx_results_ward ON results (ward_id);
+CREATE INDEX IF NOT EXISTS idx_results_price ON results (price, real_estate_code);
+CREATE INDEX IF NOT EXISTS idx_results_area ON results (area, real_estate_code);
+CREATE INDEX IF NOT EXISTS idx_results_posted ON results (posted_date, real_estate_code);
+"""
+
+_UPSERT = """
+INSERT INTO results (
+    real_estate_code, province_id, district_id, ward_id, real_estate_type_id, demand_id, sale_type,
+    price, area, posted_date, result_date, title, payload, payload_hash, updated_at
+) VALUES (
+    :real_estate_code, :province_id, :district_id, :ward_id, :real_estate_type_id, :demand_id, :sale_type,
+    :price, :area, :posted_date, :result_date, :title, :payload, :payload_hash, :updated_at
+)
+ON CONFLICT (real_estate_code) DO UPDATE SET
+    province_id = excluded.province_id,
+    district_id = excluded.district_id,
+    ward_id = excluded.ward_id,
+    real_estate_type_id = excluded.real_estate_type_id,
+    demand_id = excluded.demand_id,
+    sale_type = excluded.sale_type,
+    price = excluded.price,
+    area = excluded.area,
+    -- item nạp lại từ file JSON không còn ngày đăng gốc: giữ ngày đã lưu trước đó
+    posted_date = CASE WHEN excluded.posted_date = excluded.result_date
+                       THEN MIN(results.posted_date, excluded.posted_date)
+                       ELSE excluded.posted_date END,
+    result_date = excluded.result_date,
+    title = excluded.title,
+    payload = excluded.payload,
+    payload_hash = excluded.payload_hash,
+    updated_at = excluded.updated_at
+WHERE results.payload_hash != excluded.payload_hash OR results.posted_date != excluded.posted_date
+"""
+
+# Cột được phép sắp xếp / lọc khoảng qua query()
+SORT_COLUMNS = ("posted_date", "price", "area")
+EQ_FILTERS = ("province_id", "district_id", "ward_id", "real_estate_type_id", "demand_id", "sale_type")
+MAX_LIMIT = 500
+
+_local = threading.local()
+_write_lock = threading.Lock()
+# real_estate_code → payload_hash đã ghi trong process này (bỏ qua upsert khi không đổi)
+_written: Dict[str, Dict[str, str]] = {}
+
+
+def _db_path(path=None) -> Path:
+    return Path(path or config.RESULTS_DB_PATH)
+
+
+def connect(path=None) -> sqlite3.Connection:
+    """Connection riêng cho từng thread (crawler ghi, các request Flask đọc), WAL để đọc không chặn ghi."""
+    db_path = _db_path(path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+            # Phiên bản 1 lưu giá "Thỏa thuận" là 0
+            with conn:
+                conn.execute("UPDATE results SET price = NULL WHERE price <= 0")
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conns[db_path] = conn
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Ghi
+# ---------------------------------------------------------------------------
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or value == "" or isinstance(value, (list, dict)):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _posted_iso(raw: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Ngày đăng (dd/mm/YYYY) của item thô → YYYY-MM-DD."""
+    if not raw:
+        return None
+    text = raw.get("posted_date") or (raw.get("config") or {}).get("Ngày đăng") or ""
+    try:
+        return datetime.strptime(str(text).strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _to_price(value: Any) -> Optional[int]:
+    # transform lưu giá "Thỏa thuận" / không parse được là 0: để NULL cho lọc / sắp xếp theo giá
+    price = _to_int(value)
+    return price if price is not None and price > 0 else None
+
+
+def _result_date(results_file) -> str:
+    try:
+        return datetime.strptime(Path(results_file).name[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return datetime.now().strftime("%Y-%m-%d")
+
+
+def to_row(record: Dict[str, Any], result_date: str, raw: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    code = storage.result_key(record)
+    if code is None:
+        return None
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return {
+        "real_estate_code": code,
+        "province_id": _to_int(record.get("province_id")),
+        "district_id": _to_int(record.get("district_id")),
+        "ward_id": _to_int(record.get("ward_id")),
+        "real_estate_type_id": _to_int(record.get("real_estate_type_id")),
+        "demand_id": _to_int(record.get("demand_id")),
+        "sale_type": record.get("sale_type"),
+        "price": _to_price(record.get("price")),
+        "area": _to_float(record.get("area")),
+        "posted_date": _posted_iso(raw) or result_date,
+        "result_date": result_date,
+        "title": record.get("title"),
+        "payload": payload,
+        "payload_hash": hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest(),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def upsert_records(
+    records: Sequence[Dict[str, Any]],
+    result_date: str,
+    raw_items: Optional[Sequence[Dict[str, Any]]] = None,
+    path=None,
+) -> int:
+    """Upsert các record (raw_items song song theo thứ tự, dùng lấy ngày đăng). Trả về số dòng thực sự ghi."""
+    db_path = _db_path(path)
+    seen = _written.setdefault(str(db_path), {})
+    rows = []
+    for i, record in enumerate(records):
+        raw = raw_items[i] if raw_items is not None and raw_items[i] is not record else None
+        row = to_row(record, result_date, raw)
+        if row is None or seen.get(row["real_estate_code"]) == row["payload_hash"] + row["posted_date"]:
+            continue
+        rows.append(row)
+    if not rows:
+        return 0
+    conn = connect(db_path)
+    with _write_lock, conn:
+        conn.executemany(_UPSERT, rows)
+    for row in rows:
+        seen[row["real_estate_code"]] = row["payload_hash"] + row["posted_date"]
+    return len(rows)
+
+
+def store_results(raw_items: Sequence[Dict[str, Any]], records: Sequence[Dict[str, Any]], results_file) -> int:
+    """Hook cho save_results (records = transform của raw_items, cùng thứ tự)."""
+    if not config.RESULTS_DB_ENABLED:
+        return 0
+    try:
+        return upsert_records(records, _result_date(results_file), raw_items)
+    except sqlite3.Error as e:
+        print(f"[ResultsDB] Lỗi khi ghi {config.RESULTS_DB_PATH}: {e}")
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# Đọc (keyset pagination)
+# ---------------------------------------------------------------------------
+
+def encode_cursor(sort_value: Any, code: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, code]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"cursor không hợp lệ: {e}") from None
+    if not isinstance(value, list) or len(value) != 2:
+        raise ValueError("cursor không hợp lệ")
+    return value
+
+
+def query(
+    filters: Optional[Dict[str, Any]] = None,
+    sort: str = "posted_date",
+    order: str = "desc",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    path=None,
+) -> Dict[str, Any]:
+    """
+    Lọc + phân trang. filters: các khóa trong EQ_FILTERS (bằng), price_min / price_max, area_min / area_max,
+    posted_from / posted_to (YYYY-MM-DD), code. Trả về {"data": [record...], "next_cursor": str | None}.
+    Khi sắp xếp theo area, các tin không có diện tích bị loại; theo price, tin "Thỏa thuận" (price NULL) luôn
+    nằm cuối (cả asc lẫn desc) và được phân trang theo real_estate_code.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort phải là một trong {SORT_COLUMNS}")
+    order = order.lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("order phải là asc hoặc desc")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    filters = filters or {}
+
+    where: List[str] = []
+    params: List[Any] = []
+    for column in EQ_FILTERS:
+        if filters.get(column) not in (None, ""):
+            where.append(f"{column} = ?")
+            params.append(filters[column])
+    for key, column, op in (
+        ("price_min", "price", ">="), ("price_max", "price", "<="),
+        ("area_min", "area", ">="), ("area_max", "area", "<="),
+        ("posted_from", "posted_date", ">="), ("posted_to", "posted_date", "<="),
+    ):
+        if filters.get(key) not in (None, ""):
+            where.append(f"{column} {op} ?")
+            params.append(filters[key])
+    if filters.get("code"):
+        where.append("real_estate_code = ?")
+        params.append(str(filters["code"]))
+    if sort == "area":
+        where.append("area IS NOT NULL")
+    nullable = sort == "price"
+    if cursor:
+        sort_value, code = decode_cursor(cursor)
+        cmp = "<" if order == "desc" else ">"
+        if sort_value is None:
+            # Đang ở nhóm NULL cuối danh sách: chỉ còn các tin NULL sau code của cursor
+            where.append(f"({sort} IS NULL AND real_estate_code {cmp} ?)")
+            params.append(code)
+        elif nullable:
+            # So sánh tuple với NULL không bao giờ đúng: nhóm NULL (đứng sau mọi giá trị) được thêm riêng
+            where.append(f"(({sort}, real_estate_code) {cmp} (?, ?) OR {sort} IS NULL)")
+            params.extend([sort_value, code])
+        else:
+            where.append(f"({sort}, real_estate_code) {cmp} (?, ?)")
+            params.extend([sort_value, code])
+
+    null_order = f"{sort} IS NULL, " if nullable else ""
+    sql = (
+        f"SELECT real_estate_code, {sort} AS sort_value, payload FROM results"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + f" ORDER BY {null_order}{sort} {order}, real_estate_code {order} LIMIT ?"
+    )
+    params.append(limit + 1)
+    rows = connect(path).execute(sql, params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["sort_value"], rows[-1]["real_estate_code"]) if has_more else None
+    return {"data": [json.loads(r["payload"]) for r in rows], "next_cursor": next_cursor}
+
+
+def count(path=None) -> int:
+    return connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def backfill_from_files(files: Iterable, path=None) -> int:
+    """Backfill từ các file JSON kết quả (ngày đăng gốc không còn → dùng ngày của file)."""
+    total = 0
+    for file in files:
+        records = [r for r in serializer.iter_items(file) if isinstance(r, dict)]
+        total += upsert_records(records, _result_date(file), path=path)
+    return total
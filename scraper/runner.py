@@ -1,21 +1,37 @@
 """Module chung chứa logic scraping, có thể dùng cho cả CLI và Web interface."""
 import time
 import re
+import threading
 import unicodedata
 from datetime import datetime
+from queue import Empty, Queue
 from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Union
 
 from scraper import config
 from scraper.browser import init_driver
 from scraper.collectors.detail import open_detail_and_extract
 from scraper.collectors.listing import collect_list_items
-from scraper.storage import load_previous_results, load_today_results, save_results
+from scraper.crawl_state import CrawlState
+from scraper.storage import load_previous_results
 from scraper.utils import human_sleep
+from scraper import locations, metrics, parquet_export, profiling, seen_set, session_pool, tracing
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from . import utils
 
+ENGINES = ("selenium", "playwright", "scrapy")
+
+
+def _cooldown(seconds):
+    """Nghỉ giữa các trang / URL và ghi nhận vào metrics."""
+    seconds = seconds * config.SLEEP_SCALE
+    with tracing.span("cooldown", seconds=seconds):
+        time.sleep(seconds)
+    metrics.inc("scraper_sleep_seconds_total", seconds, kind="cooldown")
+
+
+@tracing.traced("pagination")
 def find_and_click_next_page(driver):
     """Tìm và click nút next page."""
     prev_url = driver.current_url
@@ -46,7 +62,8 @@ def find_and_click_next_page(driver):
         return False
 
     try:
-        driver.get(next_href)
+        with metrics.timer("scraper_page_load_seconds", kind="pagination"):
+            driver.get(next_href)
     except Exception as e:
         print("[Pagination] Error loading next page:", e)
         return False
@@ -88,16 +105,6 @@ def find_exact_url_from_sidebar(driver, wait, location_filter, base_url):
         URL chính xác hoặc None nếu không tìm thấy
     """
     try:
-        import unicodedata, re
-        from urllib.parse import urlparse
-        from selenium.webdriver.common.by import By
-
-        def normalize_text(text):
-            """Loại bỏ dấu và đưa về lowercase."""
-            text = unicodedata.normalize('NFD', text)
-            text = text.encode('ascii', 'ignore').decode('utf-8')
-            return text.lower().strip()
-
         current_url = driver.current_url
 
         # Kiểm tra URL generic
@@ -111,54 +118,19 @@ def find_exact_url_from_sidebar(driver, wait, location_filter, base_url):
         driver.get(base_url)
         human_sleep(3, 5)
 
-        parsed = urlparse(base_url)
-        property_type_path = parsed.path
-        property_keywords = property_type_path.replace("/ban-", "").replace("/cho-thue-", "").replace("-", " ").split()
+        property_type_path = urlparse(base_url).path
 
-        # Parse location
-        location_normalized = normalize_text(location_filter)
-        location_words = set(location_normalized.split())
-
-        # Lấy sidebar box
-        sidebar_boxes = driver.find_elements(By.CSS_SELECTOR, ".re__product-count-box")
-        if not sidebar_boxes:
+        # Lấy sidebar box theo loại BĐS
+        target_box = locations.pick_sidebar_box(driver, property_type_path)
+        if target_box is None:
             print("[Filter] Không tìm thấy sidebar box")
             return None
 
-        # Chọn box theo loại BĐS
-        target_box = None
-        for box in sidebar_boxes:
-            try:
-                title = box.find_element(By.CSS_SELECTOR, ".re__sidebar-box-title")
-                title_text = title.text.lower()
-                matches = sum(1 for kw in property_keywords if kw in title_text)
-
-                if matches >= 2 or "bán" in title_text or "cho thuê" in title_text:
-                    target_box = box
-                    print(f"[Filter] Tìm thấy sidebar box phù hợp: {title.text}")
-                    break
-            except:
-                continue
-
-        if not target_box:
-            print("[Filter] Không tìm thấy sidebar box phù hợp, dùng box đầu tiên")
-            target_box = sidebar_boxes[0]
-
         # -----------------------------------------------------------
         # FIX: MỞ RỘNG "XEM THÊM" (link bị ẩn nên cần mở)
         # -----------------------------------------------------------
-        try:
-            view_more_btn = target_box.find_element(
-                By.CSS_SELECTOR,
-                ".re__sidebar-box-content .re__view-more"
-            )
-
-            if view_more_btn.is_displayed():
-                driver.execute_script("arguments[0].click();", view_more_btn)
-                human_sleep(1, 2)
-                print("[Filter] Đã click 'Xem thêm'")
-        except Exception as e:
-            print("[Filter] Không thể click 'Xem thêm':", e)
+        if locations.expand_sidebar_box(driver, target_box, human_sleep):
+            print("[Filter] Đã click 'Xem thêm'")
 
         # Lấy link location
         location_links = target_box.find_elements(By.CSS_SELECTOR, "a.re__link-se")
@@ -170,34 +142,11 @@ def find_exact_url_from_sidebar(driver, wait, location_filter, base_url):
         best_score = 0
 
         for link in location_links:
-            link_text = link.text
             link_href = link.get_attribute("href")
 
             # Clean: bỏ (xxx)
-            link_clean = re.sub(r'\s*\(\d+\)\s*', '', link_text).strip()
-            link_norm = normalize_text(link_clean)
-            link_words = set(link_norm.split())
-
-            score = 0
-
-            # 1) Khớp tuyệt đối
-            if link_norm == location_normalized:
-                score = 100
-
-            else:
-                # 2) Khớp theo tập từ
-                if link_words == location_words:
-                    score = 95
-                else:
-                    common = link_words.intersection(location_words)
-                    cnt = len(common)
-
-                    if cnt >= 2:
-                        score = 80 + (cnt - 2) * 5
-                    elif cnt == 1:
-                        score = 20  # tăng nhẹ để phân biệt
-                    else:
-                        score = 0
+            link_clean = locations.clean_link_text(link.text)
+            score = locations.score_location_match(link_clean, location_filter)
 
             if score > best_score:
                 best_score = score
@@ -206,11 +155,7 @@ def find_exact_url_from_sidebar(driver, wait, location_filter, base_url):
 
         # Đủ điểm để chấp nhận
         if matched_link and best_score >= 50:
-            href = matched_link.get_attribute("href")
-            if href.startswith("http"):
-                exact_url = href
-            else:
-                exact_url = f"https://batdongsan.com.vn{href}"
+            exact_url = locations.absolute_url(matched_link.get_attribute("href"))
             print(f"[Filter] Tìm thấy URL chính xác: {exact_url}")
             return exact_url
 
@@ -344,33 +289,149 @@ def build_url_with_filters(base_url, filters):
     return urlunparse(new_parsed)
 
 
+def apply_newest_first_sort(url):
+    """Thêm query param sắp xếp "Tin mới nhất" vào URL list."""
+    parsed = urlparse(url)
+    query_params = parse_qs(parsed.query)
+    query_params[config.SORT_PARAM] = [config.SORT_NEWEST_VALUE]
+    return urlunparse(parsed._replace(query=urlencode(query_params, doseq=True)))
+
+
+def list_start_url(base_url, filters, incremental: bool = False):
+    """
+    URL list đầu tiên cho các engine không điều khiển trang web (Playwright, Scrapy): location chỉ lấy từ chỉ mục
+    địa điểm offline, thêm query filter và sắp xếp tin mới nhất như scrape_url. Trả về None nếu không có location
+    trong chỉ mục.
+    """
+    if filters and filters.get("location"):
+        indexed_url = locations.resolve_location_url(filters["location"], base_url)
+        if not indexed_url:
+            print(f"[Filter] Không tìm thấy '{filters['location']}' trong chỉ mục địa điểm, bỏ qua {base_url}")
+            return None
+        base_url = indexed_url
+
+    url = build_url_with_filters(base_url, filters)
+    date_from, date_to = utils.parse_date_bounds(filters)
+    if date_from or date_to or incremental:
+        url = apply_newest_first_sort(url)
+    return url
+
+
+def is_out_of_date_range(item, date_from, date_to) -> bool:
+    """Item đã mở detail có ngày đăng / ngày hết hạn nằm ngoài [date_from, date_to] không."""
+    posted_date      = utils.normalize_date(item.get("posted_date", ""))
+    expiration_date  = utils.normalize_date(item.get("expiration_date", ""))
+    return bool(
+        ((expiration_date and date_from) and expiration_date < date_from)
+        or (posted_date and ((date_from and posted_date < date_from) or (date_to and posted_date > date_to)))
+    )
+
+
+def process_detail_items(
+    driver,
+    wait,
+    items,
+    scraped_pids,
+    scraped_hrefs,
+    state,
+    current_list_url: Optional[str] = None,
+    date_from=None,
+    date_to=None,
+    status_callback: Optional[Dict[str, Any]] = None,
+    label: str = "",
+    log_prefix: str = "",
+):
+    """
+    Mở trang detail của từng item, lọc theo ngày đăng và thêm vào state (CrawlState).
+
+    Dùng chung cho item lấy từ trang list (scrape_url) và từ sitemap (scrape_sitemap).
+    current_list_url=None: không quay lại trang list sau mỗi detail.
+    """
+    for i, item in enumerate(items, start=1):
+        with tracing.span("item", pid=item.get("pid"), index=i) as item_span:
+            if status_callback:
+                status_callback["total_items"] = len(state) + i
+                status_callback["progress"] = f"{label} - Item {i}/{len(items)}"
+        
+            print(f"{log_prefix} Item {i}/{len(items)} - PID {item.get('pid')}")
+            human_sleep(2, 5)
+            try:
+                full = open_detail_and_extract(
+                    driver,
+                    wait,
+                    item,
+                    current_list_url=current_list_url,
+                    screenshot_dir=config.SCREENSHOT_DIR,
+                    detail_scroll_steps=config.DETAIL_SCROLL_STEPS,
+                    human_sleep=human_sleep,
+                )
+                # Lọc theo ngày (bounds đã parse sẵn, phần lớn item đã được lọc trên card)
+                if date_from or date_to:
+                    with tracing.span("date_filter"):
+                        out_of_range = is_out_of_date_range(full, date_from, date_to)
+                    if out_of_range:
+                        item_span["kept"] = False
+                        continue
+
+                with tracing.span("save"):
+                    state.append(full)
+                    metrics.inc("scraper_items_total")
+
+                    if full.get("pid"):
+                        scraped_pids.add(full.get("pid"))
+                    if full.get("href"):
+                        scraped_hrefs.add(full.get("href"))
+                item_span["kept"] = True
+                print(f"  -> phone: {full.get('agent_phone')}, images: {len(full.get('images', []))}")
+            except Exception as e:
+                item_span["error"] = str(e)[:200]
+                print("  -> error on detail:", e)
+            human_sleep(1, 3)
+
+
 def scrape_url(
     driver,
     wait,
     base_url,
     scraped_pids,
     scraped_hrefs,
-    all_results,
-    results_file,
+    state,
     filters: Optional[Dict[str, Any]] = None,
-    status_callback: Optional[Dict[str, Any]] = None
+    status_callback: Optional[Dict[str, Any]] = None,
+    incremental: bool = False,
 ):
-    """Scrape một URL cụ thể với filter tùy chọn."""
+    """
+    Scrape một URL cụ thể với filter tùy chọn.
+
+    Khi `incremental=True`, list được đọc theo thứ tự tin mới nhất và dừng phân trang khi
+    gặp config.INCREMENTAL_KNOWN_PAGES trang liên tiếp hoặc config.INCREMENTAL_KNOWN_CARDS
+    card liên tiếp đều đã scrape.
+
+    Returns:
+        Dict báo cáo {url, pages, items, stop_reason} hoặc None nếu bỏ qua URL
+    """
     print(f"\n{'='*60}")
     print(f"Starting scrape for URL: {base_url}")
     print(f"{'='*60}\n")
     
     try:
         # ===============================================================
-        # 1) LOAD TRANG GỐC
+        # 1) NẾU CÓ LOCATION → THỬ CHỈ MỤC ĐỊA ĐIỂM OFFLINE TRƯỚC
         # ===============================================================
-        driver.get(base_url)
-        human_sleep(3, 6)
+        indexed_url = None
+        if filters and filters.get("location"):
+            indexed_url = locations.resolve_location_url(filters["location"], base_url)
+            if indexed_url:
+                base_url = indexed_url
+                print("[URL] Base URL từ chỉ mục địa điểm:", base_url)
 
         # ===============================================================
-        # 2) NẾU CÓ LOCATION → TÌM LOCATION TRƯỚC
+        # 2) NẾU CHƯA CÓ → LOAD TRANG GỐC VÀ TÌM LOCATION BẰNG Ô TÌM KIẾM
         # ===============================================================
-        if filters and filters.get("location"):
+        if filters and filters.get("location") and not indexed_url:
+            driver.get(base_url)
+            human_sleep(3, 6)
+
             applied, location_url = apply_search_filters(driver, wait, filters["location"], base_url)
             human_sleep(2, 4)
 
@@ -391,12 +452,21 @@ def scrape_url(
         # 3) XÂY DỰNG URL CUỐI CÙNG VỚI QUERY FILTER KHÁC
         # ===============================================================
         url_with_filters = build_url_with_filters(base_url, filters)
+
+        # Filter ngày đăng: parse một lần, đọc list theo thứ tự "Tin mới nhất"
+        # để có thể lọc ngay trên card và dừng khi cả trang cũ hơn posted_date_from
+        date_from, date_to = utils.parse_date_bounds(filters)
+        if date_from or date_to or incremental:
+            url_with_filters = apply_newest_first_sort(url_with_filters)
+            print(f"[Filter] Sắp xếp tin mới nhất (ngày đăng: {date_from} → {date_to}, incremental={incremental})")
+
         print("[URL] URL cuối cùng để scrape:", url_with_filters)
 
         # ===============================================================
         # 4) LOAD URL ĐÃ BAO GỒM LOCATION + FILTERS
         # ===============================================================
-        driver.get(url_with_filters)
+        with metrics.timer("scraper_page_load_seconds", kind="list"):
+            driver.get(url_with_filters)
         human_sleep(3, 6)
 
         # ===============================================================
@@ -405,90 +475,135 @@ def scrape_url(
         page_idx = 0
         max_pages = filters.get("max_pages", config.MAX_PAGES) if filters else config.MAX_PAGES
         max_items_per_page = filters.get("max_items_per_page", config.MAX_ITEMS_PER_PAGE) if filters else config.MAX_ITEMS_PER_PAGE
+        items_before = len(state)
+
+        # Incremental: đếm số trang / số card liên tiếp (theo thứ tự tin mới nhất) đã có sẵn
+        known_page_streak = 0
+        known_card_streak = 0
+        stop_reason = "max_pages"
         
         while page_idx < max_pages:
             page_idx += 1
-            if status_callback:
-                status_callback["current_page"] = page_idx
-                status_callback["progress"] = f"Đang xử lý trang {page_idx}/{max_pages}"
+            with tracing.span("page", page=page_idx, url=driver.current_url) as page_span:
+                if status_callback:
+                    status_callback["current_page"] = page_idx
+                    status_callback["progress"] = f"Đang xử lý trang {page_idx}/{max_pages}"
             
-            print(f"=== PROCESS PAGE {page_idx} ===")
-            human_sleep(1, 3)
-            current_list_url = driver.current_url
-
-            collected, total_cards, skipped_pid, skipped_href = collect_list_items(
-                driver,
-                scraped_pids,
-                scraped_hrefs,
-                max_items_per_page,
-                config.LIST_SCROLL_STEPS,
-            )
+                print(f"=== PROCESS PAGE {page_idx} ===")
+                human_sleep(1, 3)
+                current_list_url = driver.current_url
 
-            if not collected:
-                print(
-                    f"No new items found on this page (cards={total_cards}, skipped_pid={skipped_pid}, skipped_href={skipped_href})."
+                page_stats = {}
+                with tracing.span("harvest"), metrics.timer("scraper_listing_harvest_seconds"):
+                    collected, total_cards, skipped_pid, skipped_href = collect_list_items(
+                        driver,
+                        scraped_pids,
+                        scraped_hrefs,
+                        max_items_per_page,
+                        config.LIST_SCROLL_STEPS,
+                        date_from=date_from,
+                        date_to=date_to,
+                        stats=page_stats,
+                    )
+                page_span["cards"] = total_cards
+                page_span["collected"] = len(collected)
+                page_all_older = bool(
+                    date_from
+                    and total_cards
+                    and page_stats.get("cards_dated") == total_cards
+                    and page_stats.get("cards_older") == total_cards
                 )
-                if page_idx >= max_pages:
-                    print("Reached max pages, stopping.")
-                    break
-                print("Attempting to move to next page despite duplicates...")
-                if not find_and_click_next_page(driver):
-                    print("No further pages available, stopping.")
-                    break
-                continue
 
-            print(f"Collected {len(collected)} new items meta on list page.")
+                known_flags = page_stats.get("known_flags", [])
+                for known in known_flags:
+                    known_card_streak = known_card_streak + 1 if known else 0
+                known_page_streak = known_page_streak + 1 if known_flags and all(known_flags) else 0
 
-            for i, item in enumerate(collected, start=1):
-                if status_callback:
-                    status_callback["total_items"] = len(all_results) + i
-                    status_callback["progress"] = f"Trang {page_idx}/{max_pages} - Item {i}/{len(collected)}"
-                
-                print(f"[Page {page_idx}] Item {i}/{len(collected)} - PID {item.get('pid')}")
-                human_sleep(2, 5)
-                try:
-                    full = open_detail_and_extract(
+                incremental_stop = None
+                if incremental:
+                    if known_page_streak >= config.INCREMENTAL_KNOWN_PAGES:
+                        incremental_stop = "known_pages"
+                    elif known_card_streak >= config.INCREMENTAL_KNOWN_CARDS:
+                        incremental_stop = "known_cards"
+
+                if not collected:
+                    print(
+                        f"No new items found on this page (cards={total_cards}, skipped_pid={skipped_pid}, "
+                        f"skipped_href={skipped_href}, skipped_date={page_stats.get('skipped_date', 0)})."
+                    )
+                    if page_all_older:
+                        print(f"Whole page is older than {date_from}, stopping.")
+                        stop_reason = "date_bound"
+                        break
+                    if incremental_stop:
+                        print(
+                            f"[Incremental] {known_page_streak} known pages / {known_card_streak} known cards in a row, stopping."
+                        )
+                        stop_reason = incremental_stop
+                        break
+                    if page_idx >= max_pages:
+                        print("Reached max pages, stopping.")
+                        break
+                    print("Attempting to move to next page despite duplicates...")
+                    if not find_and_click_next_page(driver):
+                        print("No further pages available, stopping.")
+                        stop_reason = "no_next_page"
+                        break
+                    continue
+
+                print(f"Collected {len(collected)} new items meta on list page.")
+
+                with tracing.span("details", items=len(collected)):
+                    process_detail_items(
                         driver,
                         wait,
-                        item,
+                        collected,
+                        scraped_pids,
+                        scraped_hrefs,
+                        state,
                         current_list_url=current_list_url,
-                        screenshot_dir=config.SCREENSHOT_DIR,
-                        detail_scroll_steps=config.DETAIL_SCROLL_STEPS,
-                        human_sleep=human_sleep,
+                        date_from=date_from,
+                        date_to=date_to,
+                        status_callback=status_callback,
+                        label=f"Trang {page_idx}/{max_pages}",
+                        log_prefix=f"[Page {page_idx}]",
                     )
-                    # Lọc theo ngày
-                    if filters:
-                        posted_date_from = utils.normalize_date(filters.get("posted_date_from"))
-                        posted_date_to   = utils.normalize_date(filters.get("posted_date_to", str(datetime.today().date())))
-                        posted_date      = utils.normalize_date(full.get("posted_date", ""))
-                        expiration_date  = utils.normalize_date(full.get("expiration_date", ""))
-                        if (expiration_date and posted_date_from) and expiration_date < posted_date_from:
-                            continue
-
-
-                    all_results.append(full)
-                    
-                    if full.get("pid"):
-                        scraped_pids.add(full.get("pid"))
-                    if full.get("href"):
-                        scraped_hrefs.add(full.get("href"))
-                    print(f"  -> phone: {full.get('agent_phone')}, images: {len(full.get('images', []))}")
-                except Exception as e:
-                    print("  -> error on detail:", e)
-                human_sleep(1, 3)
 
-            save_results(all_results, results_file, scraped_pids, scraped_hrefs)
+                with tracing.span("save", total=len(state)):
+                    state.save()
+
+                # Trang cuối cùng có item trong khoảng ngày: các trang sau chỉ còn tin cũ hơn
+                if page_stats.get("tail_older"):
+                    print(f"Reached listings older than {date_from}, stopping.")
+                    stop_reason = "date_bound"
+                    break
+                # Phần cuối trang toàn tin đã có: không cần nghỉ và sang trang sau
+                if incremental_stop:
+                    print(f"[Incremental] {known_card_streak} known cards in a row, stopping.")
+                    stop_reason = incremental_stop
+                    break
             
-            if status_callback:
-                status_callback["progress"] = f"Đã lưu {len(all_results)} items. Nghỉ {config.PAGE_COOLDOWN_SECONDS/60:.1f} phút..."
+                if status_callback:
+                    status_callback["progress"] = f"Đã lưu {len(state)} items. Nghỉ {config.PAGE_COOLDOWN_SECONDS/60:.1f} phút..."
             
-            print(f"Sleeping {config.PAGE_COOLDOWN_SECONDS/60:.1f} minutes before next page...")
-            time.sleep(config.PAGE_COOLDOWN_SECONDS)
+                if page_idx >= max_pages:
+                    break
+
+                print(f"Sleeping {config.PAGE_COOLDOWN_SECONDS/60:.1f} minutes before next page...")
+                _cooldown(config.PAGE_COOLDOWN_SECONDS)
             
-            if page_idx >= max_pages:
-                break
-            if not find_and_click_next_page(driver):
-                break
+                if not find_and_click_next_page(driver):
+                    stop_reason = "no_next_page"
+                    break
+
+        report = {
+            "url": base_url,
+            "pages": page_idx,
+            "items": len(state) - items_before,
+            "stop_reason": stop_reason,
+        }
+        print(f"[Report] {base_url}: {page_idx} pages, {report['items']} new items, stop_reason={stop_reason}")
+        return report
 
     except Exception as e:
         print(f"Error scraping URL {base_url}: {e}")
@@ -496,11 +611,191 @@ def scrape_url(
 
 
 
+def scrape_sitemap(
+    driver,
+    wait,
+    sitemap_source,
+    scraped_pids,
+    scraped_hrefs,
+    state,
+    base_urls=None,
+    filters: Optional[Dict[str, Any]] = None,
+    status_callback: Optional[Dict[str, Any]] = None,
+):
+    """
+    Phát hiện tin mới từ sitemap và đưa thẳng vào bước trích xuất detail (không phân trang list).
+
+    Path của base_urls được dùng để lọc loại BĐS, posted_date_from dùng để lọc lastmod.
+    Kết quả được lưu sau mỗi lô config.SITEMAP_BATCH_SIZE item.
+    """
+    from scraper import sitemap
+
+    path_prefixes = [locations.property_path_from_url(u) for u in (base_urls or [])] or None
+    date_from, date_to = utils.parse_date_bounds(filters)
+    max_items = None
+    if filters and filters.get("max_pages") and filters.get("max_items_per_page"):
+        max_items = int(filters["max_pages"]) * int(filters["max_items_per_page"])
+
+    print(f"[Sitemap] Nguồn: {sitemap_source}, loại BĐS: {path_prefixes}, lastmod từ: {date_from}")
+
+    items_before = len(state)
+    batch_idx = 0
+    batch = []
+
+    def flush():
+        nonlocal batch_idx, batch
+        batch_idx += 1
+        if status_callback:
+            status_callback["current_page"] = batch_idx
+        with tracing.span("page", batch=batch_idx, source="sitemap"):
+            with tracing.span("details", items=len(batch)):
+                process_detail_items(
+                    driver,
+                    wait,
+                    batch,
+                    scraped_pids,
+                    scraped_hrefs,
+                    state,
+                    current_list_url=None,
+                    date_from=date_from,
+                    date_to=date_to,
+                    status_callback=status_callback,
+                    label=f"Sitemap lô {batch_idx}",
+                    log_prefix=f"[Sitemap {batch_idx}]",
+                )
+            with tracing.span("save", total=len(state)):
+                state.save()
+        batch = []
+
+    for item in sitemap.discover_new_items(
+        sitemap_source,
+        scraped_pids,
+        scraped_hrefs,
+        path_prefixes=path_prefixes,
+        since=date_from,
+        limit=max_items,
+    ):
+        batch.append(item)
+        if len(batch) >= config.SITEMAP_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    report = {
+        "url": str(sitemap_source),
+        "pages": batch_idx,
+        "items": len(state) - items_before,
+        "stop_reason": "sitemap_exhausted",
+    }
+    print(f"[Report] sitemap: {batch_idx} batches, {report['items']} new items")
+    return report
+
+
+def worker_addresses(debugger_address=None) -> List[str]:
+    """Debugger address cho engine selenium: list truyền vào, fleet (config.FLEET_SIZE > 0) hoặc một Chrome."""
+    if isinstance(debugger_address, (list, tuple)):
+        return list(debugger_address)
+    if debugger_address is None and config.FLEET_SIZE > 0:
+        from scraper import chrome_fleet
+
+        addresses = chrome_fleet.shared_fleet().addresses()
+        if addresses:
+            return addresses
+        print("[ChromeFleet] Chưa có Chrome nào sẵn sàng, dùng config.DEBUGGER_ADDRESS")
+    return [debugger_address or config.DEBUGGER_ADDRESS]
+
+
+def scrape_urls_parallel(
+    addresses,
+    base_urls,
+    scraped_pids,
+    scraped_hrefs,
+    state,
+    filters: Optional[Dict[str, Any]] = None,
+    status_callback: Optional[Dict[str, Any]] = None,
+    incremental: bool = False,
+):
+    """
+    Chia base_urls cho nhiều Chrome: mỗi address một thread, mượn phiên từ session_pool và lấy URL kế tiếp từ
+    hàng đợi chung tới khi hết. Một URL chỉ do một worker xử lý (phân trang tuần tự như scrape_url), nên song song
+    hóa theo URL — shard từ craw/plan_shards.py là đơn vị chia việc tự nhiên. CrawlState và seen set dùng chung
+    (có lock); cooldown giữa hai URL tính riêng trên từng Chrome.
+
+    Returns:
+        List báo cáo của scrape_url, theo thứ tự hoàn thành
+    """
+    queue: Queue = Queue()
+    for url_idx, base_url in enumerate(base_urls, start=1):
+        queue.put((url_idx, base_url))
+    pool = session_pool.get_pool(tuple(addresses))
+    reports = []
+
+    def worker():
+        try:
+            session = pool.acquire()
+        except session_pool.SessionUnavailable as e:
+            print(f"[Worker] {e}")
+            return
+        try:
+            while True:
+                try:
+                    url_idx, base_url = queue.get_nowait()
+                except Empty:
+                    return
+                if status_callback:
+                    status_callback["current_url"] = base_url
+                    status_callback["progress"] = f"URL {url_idx}/{len(base_urls)}: {base_url}"
+                print(f"\n[Worker {session.address}] URL {url_idx}/{len(base_urls)}: {base_url}")
+                try:
+                    report = scrape_url(
+                        session.driver,
+                        session.wait,
+                        base_url,
+                        scraped_pids,
+                        scraped_hrefs,
+                        state,
+                        filters=filters,
+                        status_callback=status_callback,
+                        incremental=incremental,
+                    )
+                    if report:
+                        report["worker"] = session.address
+                        reports.append(report)
+                except Exception as e:
+                    print(f"Error processing URL {base_url}: {e}")
+                    if status_callback:
+                        status_callback["error"] = str(e)
+                if not queue.empty():
+                    _cooldown(config.PAGE_COOLDOWN_SECONDS)
+        finally:
+            pool.release(session)
+
+    threads = [
+        threading.Thread(target=worker, name=f"crawl-worker-{i}", daemon=True)
+        for i in range(min(len(addresses), len(base_urls)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        # join có timeout để Ctrl+C vẫn tới được thread chính (run_scraper lưu state khi bị ngắt)
+        while thread.is_alive():
+            thread.join(timeout=1.0)
+    if not queue.empty():
+        print(f"[Worker] Không còn Chrome nào dùng được, bỏ qua {queue.qsize()} URL")
+    return reports
+
+
 def run_scraper(
     base_urls,
     filters: Optional[Dict[str, Any]] = None,
-    debugger_address: Optional[str] = None,
-    status_callback: Optional[Dict[str, Any]] = None
+    debugger_address: Union[str, List[str], None] = None,
+    status_callback: Optional[Dict[str, Any]] = None,
+    incremental: bool = False,
+    results_file=None,
+    sitemap_source: Optional[str] = None,
+    trace: Optional[bool] = None,
+    profile=None,
+    engine: Optional[str] = None,
 ):
     """
     Hàm chính để chạy scraper.
@@ -508,38 +803,165 @@ def run_scraper(
     Args:
         base_urls: List các URL hoặc string URL đơn
         filters: Dict chứa các filter (location, price_from, price_to, area_from, area_to, direction, frontage, road, max_pages, max_items_per_page)
-        debugger_address: Địa chỉ Chrome debugger (mặc định từ config)
+        debugger_address: Địa chỉ Chrome debugger (mặc định từ config), hoặc list địa chỉ để crawl song song
+            các URL trên nhiều Chrome (xem scrape_urls_parallel); bỏ trống + config.FLEET_SIZE > 0 thì dùng
+            đội Chrome do scraper.chrome_fleet launch
         status_callback: Dict để cập nhật trạng thái (cho web interface)
+        incremental: Dừng phân trang sớm khi gặp liên tiếp các tin đã scrape (xem scrape_url)
+        results_file: Ghi đè file kết quả (mặc định theo ngày/filter, xem config.prepare_output_paths)
+        sitemap_source: Nếu có, phát hiện tin từ sitemap (URL hoặc thư mục local) thay vì phân trang list
+        trace: Ghi span từng trang / item ra `<results_file>.trace.jsonl` (mặc định config.TRACE_ENABLED)
+        profile: Bật profiling, ví dụ "cprofile", "sampling:hot" (xem scraper.profiling); output `<results_file>.profile.*`
+        engine: "selenium" (mặc định config.CRAWL_ENGINE), "playwright" (scraper.playwright_engine)
+            hoặc "scrapy" (scraper.scrapy_engine, HTTP thuần)
     
     Returns:
-        Dict chứa total_items và results_file
+        Dict chứa total_items, results_file và url_reports (số trang + lý do dừng của từng URL)
     """
-    today, _, results_file = config.prepare_output_paths(datetime.now(), filters)
+    engine = (engine or config.CRAWL_ENGINE or "selenium").lower()
+    if engine not in ENGINES:
+        raise ValueError(f"engine phải là một trong {ENGINES}, nhận được: {engine!r}")
+    today, _, default_results_file = config.prepare_output_paths(datetime.now(), filters)
+    results_file = results_file or default_results_file
+    if engine == "scrapy":
+        from scraper import scrapy_engine
+
+        if not scrapy_engine.in_job_process():
+            # Twisted reactor không khởi động lại được: mỗi job chạy trong process con riêng
+            return scrapy_engine.run_job(
+                base_urls=base_urls,
+                filters=filters,
+                status_callback=status_callback,
+                incremental=incremental,
+                results_file=results_file,
+                sitemap_source=sitemap_source,
+                trace=trace,
+                profile=profile,
+            )
     
-    scraped_pids, scraped_hrefs, _ = load_previous_results(config.OUTPUT_DIR, today)
-    all_results = load_today_results(results_file, scraped_pids, scraped_hrefs)
-    # if filters:
-    #     scraped_pids, scraped_hrefs, _ = load_previous_results(config.OUTPUT_DIR_FILTER, today)
-    #     all_results = load_today_results(results_file, scraped_pids, scraped_hrefs)
+    # pid / href đã scrape: index Bloom + SQLite đồng bộ tăng dần với output/ (hoặc set dựng lại từ đầu nếu tắt);
+    # tin của hôm nay nằm trong CrawlState (key + fingerprint, không giữ item)
+    seen_index = None
+    if config.SEEN_SET_ENABLED:
+        seen_index = seen_set.open_index(today)
+        scraped_pids, scraped_hrefs = seen_index.pids, seen_index.hrefs
+    else:
+        scraped_pids, scraped_hrefs, _ = load_previous_results(config.OUTPUT_DIR, today, keep_items=False)
+    state = CrawlState(results_file, scraped_pids, scraped_hrefs)
+    state.load()
 
-    if all_results:
+    if len(state):
         print(
             f"Loaded {len(scraped_pids)} pids, {len(scraped_hrefs)} hrefs "
-            f"and {len(all_results)} items from {results_file}"
+            f"and {len(state)} items from {results_file}"
         )
     
-    driver, wait = init_driver(
-        debugger_address or config.DEBUGGER_ADDRESS,
-        config.PAGE_LOAD_TIMEOUT,
-        config.WAIT_TIMEOUT
-    )
+    profile_option = profiling.parse_profile_option(profile)
+    metrics.start_run()
+    driver = wait = None
+    pool = session = None
+    workers = worker_addresses(debugger_address) if engine == "selenium" else []
+    # Nhiều Chrome + nhiều URL: mỗi worker mượn phiên riêng trong scrape_urls_parallel; sitemap vẫn chạy một phiên
+    parallel = len(workers) > 1 and not sitemap_source and isinstance(base_urls, list) and len(base_urls) > 1
+    if engine == "selenium" and not parallel:
+        if config.SESSION_POOL_ENABLED:
+            # Phiên giữ ấm giữa các job: probe trước khi mượn, tự kết nối lại / recycle tab (scraper.session_pool)
+            pool = session_pool.get_pool(workers[0])
+            session = pool.acquire()
+            driver, wait = session.driver, session.wait
+        else:
+            driver, wait = init_driver(
+                workers[0],
+                config.PAGE_LOAD_TIMEOUT,
+                config.WAIT_TIMEOUT
+            )
+    trace_file = None
+    if config.TRACE_ENABLED if trace is None else trace:
+        trace_file = tracing.start_trace(tracing.trace_path_for(results_file))
+    if profile_option:
+        # Không dùng lại tên `engine`: biến đó giữ engine crawl cho bước dispatch bên dưới
+        prof_engine, prof_scope = profile_option
+        profiling.start_profile(profiling.profile_path_for(results_file), engine=prof_engine, scope=prof_scope)
     
+    url_reports = []
     try:
         # Xử lý base_urls có thể là string hoặc list
         if isinstance(base_urls, str):
             base_urls = [base_urls]
         elif not isinstance(base_urls, list):
             raise ValueError(f"base_urls phải là string hoặc list, nhận được: {type(base_urls)}")
+
+        if engine == "playwright":
+            from scraper import playwright_engine
+
+            # Engine playwright gắn CDP vào một Chrome: list địa chỉ (form web, fleet) chỉ dùng địa chỉ đầu
+            if isinstance(debugger_address, (list, tuple)):
+                if len(debugger_address) > 1:
+                    print(f"[Playwright] Chỉ gắn vào {debugger_address[0]}, bỏ qua {len(debugger_address) - 1} địa chỉ còn lại")
+                debugger_address = debugger_address[0] if debugger_address else None
+
+            base_url = str(sitemap_source) if sitemap_source else (base_urls[-1] if base_urls else None)
+            url_reports.extend(playwright_engine.run(
+                base_urls,
+                state,
+                scraped_pids,
+                scraped_hrefs,
+                filters=filters,
+                status_callback=status_callback,
+                incremental=incremental,
+                sitemap_source=sitemap_source,
+                debugger_address=debugger_address,
+            ))
+            base_urls = []
+            sitemap_source = None
+        elif engine == "scrapy":
+            from scraper import scrapy_engine
+
+            base_url = str(sitemap_source) if sitemap_source else (base_urls[-1] if base_urls else None)
+            url_reports.extend(scrapy_engine.run(
+                base_urls,
+                state,
+                scraped_pids,
+                scraped_hrefs,
+                filters=filters,
+                status_callback=status_callback,
+                incremental=incremental,
+                sitemap_source=sitemap_source,
+            ))
+            base_urls = []
+            sitemap_source = None
+        elif parallel:
+            base_url = base_urls[-1]
+            print(f"Crawl {len(base_urls)} URL song song trên {len(workers)} Chrome: {', '.join(workers)}")
+            url_reports.extend(scrape_urls_parallel(
+                workers,
+                base_urls,
+                scraped_pids,
+                scraped_hrefs,
+                state,
+                filters=filters,
+                status_callback=status_callback,
+                incremental=incremental,
+            ))
+            base_urls = []
+
+        if sitemap_source:
+            base_url = str(sitemap_source)
+            if status_callback:
+                status_callback["current_url"] = base_url
+            report = scrape_sitemap(
+                driver,
+                wait,
+                sitemap_source,
+                scraped_pids,
+                scraped_hrefs,
+                state,
+                base_urls=base_urls,
+                filters=filters,
+                status_callback=status_callback,
+            )
+            url_reports.append(report)
+            base_urls = []
         
         for url_idx, base_url in enumerate(base_urls, start=1):
             if status_callback:
@@ -551,17 +973,21 @@ def run_scraper(
             print(f"{'#'*60}")
             
             try:
-                scrape_url(
+                report = scrape_url(
                     driver,
                     wait,
                     base_url,
                     scraped_pids,
                     scraped_hrefs,
-                    all_results,
-                    results_file,
+                    state,
                     filters=filters,
-                    status_callback=status_callback
+                    status_callback=status_callback,
+                    incremental=incremental,
                 )
+                if report:
+                    url_reports.append(report)
+                    if status_callback:
+                        status_callback["stop_reason"] = report["stop_reason"]
             except Exception as e:
                 print(f"Error processing URL {base_url}: {e}")
                 if status_callback:
@@ -572,17 +998,38 @@ def run_scraper(
             # Nghỉ giữa các URLs (trừ URL cuối cùng)
             if url_idx < len(base_urls):
                 print(f"\nCompleted URL {url_idx}/{len(base_urls)}. Sleeping before next URL...")
-                time.sleep(config.PAGE_COOLDOWN_SECONDS)
+                _cooldown(config.PAGE_COOLDOWN_SECONDS)
                 
     except KeyboardInterrupt:
         print("\nScraping interrupted by user. Saving current results...")
-        save_results(all_results, results_file, scraped_pids, scraped_hrefs)
+        state.save()
     finally:
-        driver.quit()
+        state.close()
+        summary_extra = {"url_reports": url_reports, "engine": engine}
+        if seen_index is not None:
+            summary_extra["seen_set"] = seen_index.stats()
+            seen_index.close()
+        if parallel:
+            summary_extra["workers"] = workers
+        if session is not None:
+            summary_extra["session"] = session.stats()
+            pool.release(session)
+        elif driver is not None:
+            driver.quit()
+        tracing.stop_trace()
+        profile_files = profiling.stop_profile()
+        parquet_export.finish_run(results_file)
+        metrics.write_run_summary(results_file, summary_extra)
+        print(f"[Metrics] Peak RSS: {metrics.peak_rss_mb()} MB")
     
     return {
-        "total_items": len(all_results),
+        "total_items": len(state),
         "results_file": str(results_file),
-        "url":base_url
+        "url":base_url,
+        "url_reports": url_reports,
+        "metrics_file": str(metrics.summary_path_for(results_file)),
+        "peak_rss_mb": metrics.peak_rss_mb(),
+        "trace_file": trace_file,
+        "profile_files": profile_files,
     }
 
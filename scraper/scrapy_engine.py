@@ -0,0 +1,498 @@
+"""Engine crawl HTTP bằng Scrapy cho trang list / detail không cần JavaScript.
+
+Không mở browser: trang list và detail được tải bằng downloader của Scrapy, đọc bằng cùng selector với
+collectors/ (select_cards, fill_item_from_snapshot) và đi qua các item pipeline:
+
+    SeenPipeline       bỏ tin đã có trong seen-set (pid / href) hoặc đã gặp trong lần chạy
+    DateRangePipeline  bỏ tin có ngày đăng / hết hạn ngoài khoảng posted_date_from..posted_date_to
+    StatePipeline      CrawlState.append (journal) + save mỗi config.SCRAPY_SAVE_EVERY tin và khi đóng spider;
+                       save transform (storage.transform_batch ≡ transform_to_example_format) rồi ghi file kết quả
+
+Độ song song do scheduler của Scrapy + AutoThrottle quyết định (config.SCRAPY_SETTINGS): nhiều request cùng
+lúc, delay tự điều chỉnh theo latency của site thay vì một trang mỗi lần với human_sleep cố định. Phân trang
+list vẫn tuần tự theo từng URL (cần link trang kế), các trang detail của mỗi trang list chạy song song.
+
+Có cấu hình proxy (scraper.egress_pool), EgressMiddleware gán proxy dính theo phiên HTTP (meta egress_session:
+mỗi URL list một phiên qua các trang, detail chia vòng tròn cho các phiên), chờ token bucket của proxy và đặt
+download_slot theo proxy: concurrency / AutoThrottle tính riêng từng proxy nên thông lượng tăng theo số proxy.
+
+Chọn qua run_scraper(engine="scrapy") / SCRAPER_ENGINE=scrapy / form web. Twisted reactor không khởi động lại
+được trong cùng process, nên run_scraper chạy mỗi job scrapy trong một process con (run_job): app web chạy được
+nhiều job liên tiếp, status_callback của process cha vẫn được cập nhật qua queue.
+"""
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import traceback
+from typing import Any, Dict, List, Optional
+
+import scrapy
+from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import DropItem, NotConfigured
+
+from . import config, egress_pool, locations, metrics, utils
+from .collectors.detail import fill_item_from_snapshot, is_captcha_page
+from .collectors.listing import select_cards
+
+_reactor_used = False
+_in_job_process = False
+
+
+def _text(selector, sep: str = " ") -> str:
+    """Text của phần tử (tương đương gần đúng `.text` của Selenium khi trang không cần JS)."""
+    if selector is None:
+        return ""
+    parts = (t.strip() for t in selector.xpath(".//text()").getall())
+    return sep.join(t for t in parts if t)
+
+
+def _pairs(response, css: str, key_css: str, value_css: str) -> Dict[str, str]:
+    out = {}
+    for el in response.css(css):
+        key, value = el.css(key_css), el.css(value_css)
+        if key and value:
+            out[_text(key[0])] = _text(value[0])
+    return out
+
+
+def detail_snapshot(response) -> Dict[str, Any]:
+    """Snapshot trang detail cùng khóa với DETAIL_SNAPSHOT_JS của engine Playwright."""
+    title = response.css("h1.re__pr-title")
+    address = response.css("#product-detail-web span.re__pr-short-description.js__pr-address")
+    description = response.css("div.re__section-body.re__detail-content.js__section-body.js__pr-description")
+    phone = response.css('div[kyc-tracking-id="lead-phone-ldp"], div[kyc-tracking-id="lead-phone-ldp"] .re__btn')
+    iframe = response.css("div.re__pr-map iframe")
+    short_info = []
+    for el in response.css(".re__pr-short-info .re__pr-short-info-item"):
+        value, ext = el.css("span.value"), el.css("span.ext")
+        short_info.append([_text(value[0]) if value else "", _text(ext[0]) if ext else "", _text(el)])
+    images = []
+    for img in response.css(".re__media-thumbs img"):
+        src = img.attrib.get("src") or img.attrib.get("data-src")
+        images.append(response.urljoin(src) if src else src)
+    map_link = ""
+    if iframe:
+        map_link = iframe[0].attrib.get("src") or iframe[0].attrib.get("data-src") or ""
+    return {
+        "title": _text(title[0]) if title else "",
+        "short_info": short_info,
+        "specs": _pairs(response, ".re__pr-specs-content-item", ".re__pr-specs-content-item-title",
+                        ".re__pr-specs-content-item-value"),
+        "address": _text(address[0]) if address else "",
+        "description": _text(description[0], "\n") if description else "",
+        "images": images,
+        "config": _pairs(response, ".re__pr-short-info-item.js__pr-config-item", ".title", ".value"),
+        "contact_name": (phone[0].attrib.get("data-kyc-name") or "").strip() if phone else "",
+        "map_link": map_link,
+    }
+
+
+class ListingSpider(scrapy.Spider):
+    """Spider list → detail. Trạng thái lần chạy (state, seen-set, filters) được truyền qua kwargs của crawl()."""
+
+    name = "batdongsan"
+
+    def __init__(self, base_urls=None, state=None, scraped_pids=None, scraped_hrefs=None, filters=None,
+                 status_callback=None, incremental=False, sitemap_source=None, **kwargs):
+        super().__init__(**kwargs)
+        self.base_urls = list(base_urls or [])
+        self.state = state
+        self.scraped_pids = scraped_pids
+        self.scraped_hrefs = scraped_hrefs
+        self.filters = filters or {}
+        self.status_callback = status_callback
+        self.incremental = incremental
+        self.sitemap_source = sitemap_source
+        self.date_from, self.date_to = utils.parse_date_bounds(filters)
+        self.max_pages = self.filters.get("max_pages", config.MAX_PAGES)
+        self.max_items_per_page = self.filters.get("max_items_per_page", config.MAX_ITEMS_PER_PAGE)
+        # base_url → report {url, pages, items, stop_reason} như scrape_url; href → base_url để đếm item
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        self.origin: Dict[str, str] = {}
+        egress = egress_pool.shared_pool()
+        self._detail_sessions = itertools.cycle(
+            [f"http-detail-{i}" for i in range(len(egress.proxies) if egress is not None else 1)]
+        )
+
+    # -----------------------------------------------------------------------
+    # Bắt đầu
+    # -----------------------------------------------------------------------
+
+    def start_requests(self):
+        if self.sitemap_source:
+            yield from self._sitemap_requests()
+            return
+
+        from .runner import list_start_url
+
+        for url_idx, base_url in enumerate(self.base_urls):
+            url = list_start_url(base_url, self.filters, self.incremental)
+            if url is None:
+                continue
+            self.reports[base_url] = {"url": base_url, "pages": 0, "items": 0, "stop_reason": "max_pages"}
+            yield scrapy.Request(
+                url,
+                callback=self.parse_list,
+                cb_kwargs={"base_url": base_url, "page": 1, "known_pages": 0, "known_cards": 0},
+                meta={"egress_session": f"http-list-{url_idx}"},
+            )
+
+    def _sitemap_requests(self):
+        from . import sitemap
+
+        source = str(self.sitemap_source)
+        self.reports[source] = {"url": source, "pages": 1, "items": 0, "stop_reason": "sitemap_exhausted"}
+        max_items = None
+        if self.filters.get("max_pages") and self.filters.get("max_items_per_page"):
+            max_items = int(self.filters["max_pages"]) * int(self.filters["max_items_per_page"])
+        path_prefixes = [locations.property_path_from_url(u) for u in self.base_urls] or None
+        for item in sitemap.discover_new_items(
+            self.sitemap_source, self.scraped_pids, self.scraped_hrefs,
+            path_prefixes=path_prefixes, since=self.date_from, limit=max_items,
+        ):
+            yield self._detail_request(item, source)
+
+    def _detail_request(self, item: dict, base_url: str):
+        self.origin[item["href"]] = base_url
+        # Detail trước trang list kế tiếp: tin của trang hiện tại được lưu sớm
+        return scrapy.Request(item["href"], callback=self.parse_detail, cb_kwargs={"item": item}, priority=10,
+                              meta={"egress_session": next(self._detail_sessions)})
+
+    # -----------------------------------------------------------------------
+    # Trang list
+    # -----------------------------------------------------------------------
+
+    def parse_list(self, response, base_url: str, page: int, known_pages: int, known_cards: int):
+        metrics.observe("scraper_page_load_seconds", response.meta.get("download_latency", 0.0),
+                        kind="list" if page == 1 else "pagination")
+        report = self.reports[base_url]
+        report["pages"] = page
+        if self.status_callback:
+            self.status_callback["current_url"] = response.url
+            self.status_callback["current_page"] = page
+
+        check_dates = bool(self.date_from or self.date_to)
+        anchors = response.css("#product-lists-web a.js__product-link-for-product-id")
+
+        def cards():
+            for a in anchors:
+                href = a.attrib.get("href")
+                card_date = None
+                if check_dates:
+                    for span in a.css(".re__card-published-info-published-at"):
+                        for text in (span.attrib.get("aria-label"), _text(span)):
+                            card_date = utils.parse_card_date(text)
+                            if card_date:
+                                break
+                        if card_date:
+                            break
+                yield a.attrib.get("data-product-id"), response.urljoin(href) if href else None, card_date
+
+        with metrics.timer("scraper_listing_harvest_seconds"):
+            collected, page_stats = select_cards(cards(), self.scraped_pids, self.scraped_hrefs,
+                                                 self.date_from, self.date_to)
+        collected = collected[:self.max_items_per_page]
+        total_cards = len(anchors)
+        print(f"[Scrapy] {base_url} trang {page}: {len(collected)}/{total_cards} card mới")
+
+        for item in collected:
+            yield self._detail_request(item, base_url)
+
+        known_flags = page_stats["known_flags"]
+        for known in known_flags:
+            known_cards = known_cards + 1 if known else 0
+        known_pages = known_pages + 1 if known_flags and all(known_flags) else 0
+
+        page_all_older = bool(
+            self.date_from and total_cards
+            and page_stats["cards_dated"] == total_cards and page_stats["cards_older"] == total_cards
+        )
+        stop_reason = None
+        if page_all_older or (collected and page_stats["tail_older"]):
+            stop_reason = "date_bound"
+        elif self.incremental and known_pages >= config.INCREMENTAL_KNOWN_PAGES:
+            stop_reason = "known_pages"
+        elif self.incremental and known_cards >= config.INCREMENTAL_KNOWN_CARDS:
+            stop_reason = "known_cards"
+        elif page >= self.max_pages:
+            stop_reason = "max_pages"
+        if stop_reason:
+            report["stop_reason"] = stop_reason
+            return
+
+        active = response.css(".re__pagination-number.re__actived::attr(pid)").get()
+        current = int(active) if active and active.isdigit() else 1
+        next_href = response.css(f'a.re__pagination-number[pid="{current + 1}"]::attr(href)').get()
+        if not next_href:
+            report["stop_reason"] = "no_next_page"
+            return
+        yield response.follow(
+            next_href,
+            callback=self.parse_list,
+            cb_kwargs={"base_url": base_url, "page": page + 1, "known_pages": known_pages,
+                       "known_cards": known_cards},
+            meta={"egress_session": response.meta.get("egress_session")},
+        )
+
+    # -----------------------------------------------------------------------
+    # Trang detail
+    # -----------------------------------------------------------------------
+
+    def parse_detail(self, response, item: dict):
+        metrics.observe("scraper_page_load_seconds", response.meta.get("download_latency", 0.0), kind="detail")
+        if is_captcha_page(response.url, response.text):
+            print("CAPTCHA detected:", item["href"])
+            metrics.inc("scraper_captcha_total", stage="detail")
+            egress_pool.report(response.meta.get("egress_session"), "captcha")
+            yield item
+            return
+        egress_pool.report(response.meta.get("egress_session"), "ok")
+        with metrics.timer("scraper_detail_extractor_seconds", extractor="snapshot"):
+            yield fill_item_from_snapshot(item, detail_snapshot(response))
+
+    def url_reports(self) -> List[dict]:
+        return list(self.reports.values())
+
+
+# ---------------------------------------------------------------------------
+# Downloader middleware
+# ---------------------------------------------------------------------------
+
+class EgressMiddleware:
+    """Proxy dính theo meta egress_session, chờ token bucket của proxy; lỗi tải trang hạ điểm proxy."""
+
+    def __init__(self, pool: egress_pool.EgressPool):
+        self.pool = pool
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pool = egress_pool.shared_pool()
+        if pool is None:
+            raise NotConfigured("không cấu hình proxy")
+        return cls(pool)
+
+    async def process_request(self, request, spider):
+        key = request.meta.get("egress_session")
+        if key is None:
+            return None
+        proxy = self.pool.assign(key)
+        # HttpProxyMiddleware (chạy sau) đọc user / password từ URL proxy
+        request.meta["proxy"] = proxy.url
+        request.meta["download_slot"] = proxy.label
+        request.meta.setdefault("cookiejar", key)
+        delay = self.pool.reserve(key)
+        if delay:
+            from scrapy.utils.defer import maybe_deferred_to_future
+            from twisted.internet import reactor
+            from twisted.internet.task import deferLater
+
+            await maybe_deferred_to_future(deferLater(reactor, delay, lambda: None))
+            metrics.inc("scraper_sleep_seconds_total", delay, kind="egress")
+        return None
+
+    def process_exception(self, request, exception, spider):
+        egress_pool.report(request.meta.get("egress_session"), "error")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Item pipeline
+# ---------------------------------------------------------------------------
+
+class SeenPipeline:
+    """Bỏ tin đã scrape (seen-set của lần chạy, có thể là seen_set.SeenSet) trước khi lưu."""
+
+    def process_item(self, item, spider):
+        pid, href = item.get("pid"), item.get("href")
+        if (pid and pid in spider.scraped_pids) or (not pid and href in spider.scraped_hrefs):
+            metrics.inc("scraper_scrapy_dropped_total", reason="seen")
+            raise DropItem(f"đã scrape: {pid or href}")
+        return item
+
+
+class DateRangePipeline:
+    def process_item(self, item, spider):
+        from .runner import is_out_of_date_range
+
+        if (spider.date_from or spider.date_to) and is_out_of_date_range(item, spider.date_from, spider.date_to):
+            metrics.inc("scraper_scrapy_dropped_total", reason="date")
+            raise DropItem(f"ngoài khoảng ngày: {item.get('pid')}")
+        return item
+
+
+class StatePipeline:
+    """Ghi item vào CrawlState (journal ngay, file kết quả mỗi SCRAPY_SAVE_EVERY tin)."""
+
+    def open_spider(self, spider):
+        self.unsaved = 0
+
+    def process_item(self, item, spider):
+        spider.state.append(item)
+        metrics.inc("scraper_items_total")
+        if item.get("pid"):
+            spider.scraped_pids.add(item["pid"])
+        if item.get("href"):
+            spider.scraped_hrefs.add(item["href"])
+        base_url = spider.origin.get(item.get("href"))
+        if base_url in spider.reports:
+            spider.reports[base_url]["items"] += 1
+        if spider.status_callback:
+            spider.status_callback["total_items"] = len(spider.state)
+            spider.status_callback["progress"] = f"Scrapy - {len(spider.state)} items"
+
+        self.unsaved += 1
+        if self.unsaved >= config.SCRAPY_SAVE_EVERY:
+            spider.state.save()
+            self.unsaved = 0
+        return item
+
+    def close_spider(self, spider):
+        spider.state.save()
+
+
+def crawl_settings() -> Dict[str, Any]:
+    settings = {
+        "ITEM_PIPELINES": {
+            f"{__name__}.SeenPipeline": 100,
+            f"{__name__}.DateRangePipeline": 200,
+            f"{__name__}.StatePipeline": 300,
+        },
+        # Trước CookiesMiddleware (700) để cookiejar theo phiên, trước HttpProxyMiddleware (750) để đặt meta proxy
+        "DOWNLOADER_MIDDLEWARES": {f"{__name__}.EgressMiddleware": 650},
+        "LOG_LEVEL": "INFO",
+        "TELNETCONSOLE_ENABLED": False,
+        "DOWNLOAD_TIMEOUT": config.PAGE_LOAD_TIMEOUT,
+    }
+    settings.update(config.SCRAPY_SETTINGS)
+    return settings
+
+
+def run(
+    base_urls: List[str],
+    state,
+    scraped_pids,
+    scraped_hrefs,
+    filters: Optional[Dict[str, Any]] = None,
+    status_callback: Optional[Dict[str, Any]] = None,
+    incremental: bool = False,
+    sitemap_source=None,
+) -> List[dict]:
+    """Chạy ListingSpider tới khi xong (chặn); trả về url_reports như run_scraper."""
+    global _reactor_used
+    if _reactor_used:
+        raise RuntimeError(
+            "Engine scrapy chỉ chạy được một lần mỗi process (Twisted reactor không khởi động lại được); "
+            "khởi động lại process hoặc dùng engine selenium / playwright"
+        )
+    _reactor_used = True
+
+    process = CrawlerProcess(settings=crawl_settings(), install_root_handler=False)
+    crawler = process.create_crawler(ListingSpider)
+    process.crawl(
+        crawler,
+        base_urls=base_urls,
+        state=state,
+        scraped_pids=scraped_pids,
+        scraped_hrefs=scraped_hrefs,
+        filters=filters,
+        status_callback=status_callback,
+        incremental=incremental,
+        sitemap_source=sitemap_source,
+    )
+    # Signal handler chỉ cài được trên main thread (web app chạy crawler trên thread riêng)
+    process.start(install_signal_handlers=threading.current_thread() is threading.main_thread())
+    return crawler.spider.url_reports() if crawler.spider else []
+
+
+class _StatusRelay(dict):
+    """status_callback trong process con: mỗi lần gán khóa cũng gửi (khóa, giá trị) về process cha."""
+
+    def __init__(self, status_queue):
+        super().__init__()
+        self._queue = status_queue
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._queue.put((key, value))
+
+
+def in_job_process() -> bool:
+    """True nếu đang ở trong process con do run_job tạo."""
+    return _in_job_process
+
+
+def _job_main(overrides: Dict[str, Any], kwargs: Dict[str, Any], conn, status_queue) -> None:
+    global _in_job_process
+    _in_job_process = True
+    # Process spawn import lại config từ đầu: áp lại các giá trị process cha đã đổi lúc chạy (CLI, sandbox)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    from .runner import run_scraper
+
+    status = _StatusRelay(status_queue) if status_queue is not None else None
+    try:
+        result = run_scraper(**kwargs, status_callback=status, engine="scrapy")
+        conn.send(("ok", result))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+    finally:
+        if status_queue is not None:
+            status_queue.put(None)
+        conn.close()
+
+
+def _config_overrides() -> Dict[str, Any]:
+    return {name: value for name, value in vars(config).items() if name.isupper()}
+
+
+def run_job(status_callback: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Chạy run_scraper(engine="scrapy", **kwargs) trong một process con (spawn) và trả về kết quả của nó.
+
+    Process con mở seen index / CrawlState / file kết quả của riêng nó; process cha không mở các file này trong
+    lúc job chạy. Lỗi trong process con được báo lại bằng RuntimeError.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    status_queue = ctx.Queue() if status_callback is not None else None
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(
+        target=_job_main,
+        args=(_config_overrides(), kwargs, child_conn, status_queue),
+        name="scrapy-job",
+    )
+    process.start()
+    child_conn.close()
+
+    relay = None
+    if status_queue is not None:
+        def _relay():
+            while True:
+                try:
+                    update = status_queue.get(timeout=1.0)
+                except queue.Empty:
+                    if not process.is_alive():
+                        return
+                    continue
+                if update is None:
+                    return
+                key, value = update
+                status_callback[key] = value
+
+        relay = threading.Thread(target=_relay, name="scrapy-job-status", daemon=True)
+        relay.start()
+
+    try:
+        outcome, payload = parent_conn.recv()
+    except EOFError:
+        outcome, payload = "error", "process con kết thúc mà không trả kết quả"
+    finally:
+        parent_conn.close()
+        process.join()
+        if relay is not None:
+            relay.join()
+    if outcome != "ok":
+        raise RuntimeError(f"Job scrapy lỗi (exit code {process.exitcode}): {payload}")
+    return payload
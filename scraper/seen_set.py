@@ -0,0 +1,461 @@
+"""Tập pid / href đã scrape, gọn trong bộ nhớ: Bloom filter (mmap) + kho SQLite chính xác.
+
+Thay cho hai set `scraped_pids` / `scraped_hrefs` dựng lại từ toàn bộ output/ mỗi lần chạy (href rất dài,
+nhiều năm lịch sử → nhiều trăm MB và vài chục giây khởi động). Thư mục config.SEEN_DIR chứa:
+
+    seen.sqlite3     kho chính xác: bảng seen(kind, key) + bảng sources (file kết quả đã index, size, mtime)
+    pid.bloom        Bloom filter của pid, map vào bộ nhớ (mmap), ~1.8 byte / key ở tỉ lệ dương tính giả 0.1%
+    href.bloom       như trên cho href
+
+Tra cứu: Bloom trả lời "chắc chắn chưa có" cho phần lớn card mới mà không chạm đĩa; khi Bloom báo có, kho
+SQLite được hỏi để loại dương tính giả, nên kết quả luôn chính xác. File .bloom chỉ là cache dẫn xuất từ
+kho SQLite: khi số key vượt capacity nó được dựng lại với capacity gấp đôi, và có thể xóa đi bất cứ lúc nào.
+
+open_index() đồng bộ tăng dần với output/: chỉ đọc các file kết quả mới hoặc đã đổi (size / mtime) kể từ lần
+trước, cùng quy tắc với storage.load_previous_results (chỉ file `YYYY-MM-DD.json`, không tính file của lần chạy
+có filter). Key thêm trong lúc chạy (SeenSet.add) chỉ nằm trong bộ nhớ của lần chạy đó; chúng vào index ở lần
+sync sau nếu lần chạy ghi file kết quả không filter, nên index luôn khớp với `craw/seen_index.py rebuild`.
+
+Nhiều process (ví dụ các worker `plan_shards.py crawl --worker-index`) mở chung một index được: mọi thao tác
+ghi (sync / rebuild / dựng lại Bloom) giữ khóa file `seen.lock` (fcntl.flock; trên Windows chỉ khóa trong process).
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from . import config, serializer, storage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b"BDSBLOOM"
+VERSION = 1
+# magic, version, số hàm hash k, số bit m, số key đã thêm, capacity
+HEADER = struct.Struct("<8sIIQQQ")
+HEADER_SIZE = 64
+KINDS = ("pid", "href")
+DB_NAME = "seen.sqlite3"
+LOCK_NAME = "seen.lock"
+# Vị trí bit lấy từ các uint32 của một digest blake2b (tối đa 64 byte): k <= 16, m < 2^32 bit (512 MB)
+MAX_HASHES = 16
+MAX_BITS = 2 ** 32 - 8
+
+
+def optimal_params(capacity: int, fp_rate: float) -> tuple[int, int]:
+    """(m bit, k hàm hash) tối ưu cho `capacity` key ở tỉ lệ dương tính giả `fp_rate`."""
+    capacity = max(1, int(capacity))
+    m_bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+    m_bits = min((m_bits + 7) // 8 * 8, MAX_BITS)
+    k = min(MAX_HASHES, max(1, round(m_bits / capacity * math.log(2))))
+    return m_bits, k
+
+
+class BloomFilter:
+    """Bloom filter trên file map vào bộ nhớ; k vị trí bit lấy từ một digest blake2b của key."""
+
+    def __init__(self, path: Path, f, mm: mmap.mmap):
+        self.path = path
+        self._file = f
+        self._mm = mm
+        # count: số key khác nhau đã thêm (do SeenSet quản lý, Bloom không tự biết key có mới không)
+        magic, version, self.k, self.m_bits, self.count, self.capacity = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            f.close()
+            raise ValueError(f"{path}: không phải file Bloom filter (phiên bản {VERSION})")
+        self._unpack = struct.Struct(f"<{self.k}I").unpack
+        self._digest_size = 4 * self.k
+
+    @classmethod
+    def create(cls, path, capacity: int, fp_rate: float) -> "BloomFilter":
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        m_bits, k = optimal_params(capacity, fp_rate)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, k, m_bits, 0, int(capacity)).ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + m_bits // 8)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path) -> "BloomFilter":
+        path = Path(path)
+        f = open(path, "r+b")
+        try:
+            mm = mmap.mmap(f.fileno(), 0)
+        except ValueError:  # file rỗng
+            f.close()
+            raise ValueError(f"{path}: file Bloom filter rỗng") from None
+        return cls(path, f, mm)
+
+    def _positions(self, key: str) -> list[int]:
+        m = self.m_bits
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=self._digest_size).digest()
+        return [h % m for h in self._unpack(digest)]
+
+    def __contains__(self, key: str) -> bool:
+        mm = self._mm
+        for bit in self._positions(key):
+            if not mm[HEADER_SIZE + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def add(self, key: str) -> bool:
+        """Set các bit của key; trả về True nếu mọi bit đã được set từ trước (key có thể đã có)."""
+        mm = self._mm
+        present = True
+        for bit in self._positions(key):
+            index = HEADER_SIZE + (bit >> 3)
+            mask = 1 << (bit & 7)
+            byte = mm[index]
+            if not byte & mask:
+                mm[index] = byte | mask
+                present = False
+        return present
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size_bytes(self) -> int:
+        return HEADER_SIZE + self.m_bits // 8
+
+    def fill_ratio(self) -> float:
+        ones = int.from_bytes(self._mm[HEADER_SIZE:], "little").bit_count()
+        return ones / self.m_bits
+
+    def estimated_fp_rate(self) -> float:
+        """Tỉ lệ dương tính giả ước tính từ tỉ lệ bit đã set: fill^k."""
+        return self.fill_ratio() ** self.k
+
+    def flush(self) -> None:
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.k, self.m_bits, self.count, self.capacity)
+        self._mm.flush()
+
+    def reload_count(self) -> None:
+        """Đọc lại số key từ header (process khác có thể đã thêm key vào cùng file)."""
+        self.count = HEADER.unpack_from(self._mm, 0)[4]
+
+    def replaced(self) -> bool:
+        """True nếu file trên đĩa đã bị thay (process khác dựng lại Bloom) hoặc bị xóa."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return True
+
+    def close(self, flush: bool = True) -> None:
+        if self._mm.closed:
+            return
+        if flush:
+            self.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class SeenSet:
+    """
+    Một loại key (pid / href): Bloom lọc trước, SQLite xác nhận. Dùng thay cho set ở các chỗ chỉ cần `in` / add.
+
+    add() chỉ ghi vào tập `added` trong bộ nhớ của lần chạy; update() (dùng bởi sync) mới ghi vào index.
+    """
+
+    def __init__(self, index: "SeenIndex", kind: str, bloom: BloomFilter):
+        self.index = index
+        self.kind = kind
+        self.bloom = bloom
+        self.added: set[str] = set()
+        self.lookups = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+
+    def _in_store(self, key: str) -> bool:
+        row = self.index.db.execute("SELECT 1 FROM seen WHERE kind = ? AND key = ?", (self.kind, key)).fetchone()
+        return row is not None
+
+    def __contains__(self, key) -> bool:
+        if not key:
+            return False
+        key = str(key)
+        with self.index.lock:
+            self.lookups += 1
+            if key in self.added:
+                return True
+            if key not in self.bloom:
+                return False
+            self.bloom_positives += 1
+            if self._in_store(key):
+                return True
+            self.false_positives += 1
+            return False
+
+    def add(self, key) -> None:
+        """Đánh dấu key đã gặp trong lần chạy này (không ghi vào index, xem docstring module)."""
+        if not key:
+            return
+        with self.index.lock:
+            self.added.add(str(key))
+
+    def update(self, keys: Iterable) -> int:
+        """
+        Ghi nhiều key vào index (INSERT OR IGNORE theo lô, không tra từng key). Trả về số key mới.
+
+        Chỉ gọi khi đang giữ SeenIndex.exclusive() (sync / rebuild).
+        """
+        keys = [str(key) for key in keys if key]
+        with self.index.lock:
+            db = self.index.db
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO seen (kind, key) VALUES (?, ?)", ((self.kind, k) for k in keys))
+            db.commit()
+            added = db.total_changes - before
+            for key in keys:
+                self.bloom.add(key)
+            self.bloom.count += added
+        return added
+
+    def _check_capacity(self) -> None:
+        if len(self.bloom) > self.bloom.capacity:
+            self.flush()
+            self.bloom = self.index._rebuild_bloom(self.kind, self.bloom)
+
+    def __len__(self) -> int:
+        return len(self.bloom)
+
+    def flush(self) -> None:
+        self.bloom.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self.bloom),
+            "capacity": self.bloom.capacity,
+            "bloom_bytes": self.bloom.size_bytes,
+            "k": self.bloom.k,
+            "fill_ratio": round(self.bloom.fill_ratio(), 4),
+            "estimated_fp_rate": self.bloom.estimated_fp_rate(),
+            "run_added": len(self.added),
+            "lookups": self.lookups,
+            "bloom_positives": self.bloom_positives,
+            "false_positives": self.false_positives,
+        }
+
+
+class SeenIndex:
+    """Thư mục index: kho SQLite + một Bloom filter / loại key."""
+
+    def __init__(self, directory=None, fp_rate: Optional[float] = None, min_capacity: Optional[int] = None):
+        self.directory = Path(directory or config.SEEN_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fp_rate = fp_rate or config.SEEN_FP_RATE
+        self.min_capacity = min_capacity or config.SEEN_MIN_CAPACITY
+        # Dùng chung giữa các worker thread (runner.scrape_urls_parallel): mọi truy cập db / Bloom đi qua self.lock
+        self.db = sqlite3.connect(self.directory / DB_NAME, check_same_thread=False, timeout=60)
+        self.lock = threading.RLock()
+        self._lock_file = open(self.directory / LOCK_NAME, "a+b")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                indexed_at TEXT NOT NULL
+            );
+            """
+        )
+        with self.exclusive(refresh=False):
+            self.sets = {kind: SeenSet(self, kind, self._open_bloom(kind)) for kind in KINDS}
+
+    @contextmanager
+    def exclusive(self, refresh: bool = True):
+        """Khóa ghi giữa các process (và thread) dùng chung thư mục index; Bloom được flush trước khi nhả khóa."""
+        with self.lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                if refresh:
+                    self._refresh_blooms()
+                yield
+                for seen in getattr(self, "sets", {}).values():
+                    seen.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _refresh_blooms(self) -> None:
+        # Process khác có thể đã thêm key (count trong header) hoặc dựng lại file Bloom (os.replace)
+        for kind, seen in self.sets.items():
+            if seen.bloom.replaced():
+                seen.bloom.close(flush=False)
+                seen.bloom = self._open_bloom(kind)
+            else:
+                seen.bloom.reload_count()
+
+    @property
+    def pids(self) -> SeenSet:
+        return self.sets["pid"]
+
+    @property
+    def hrefs(self) -> SeenSet:
+        return self.sets["href"]
+
+    def bloom_path(self, kind: str) -> Path:
+        return self.directory / f"{kind}.bloom"
+
+    def _store_count(self, kind: str) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM seen WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def _open_bloom(self, kind: str) -> BloomFilter:
+        path = self.bloom_path(kind)
+        if path.exists():
+            try:
+                bloom = BloomFilter.open(path)
+            except (OSError, ValueError) as e:
+                print(f"[Seen] {e}, dựng lại từ {DB_NAME}")
+            else:
+                # Bloom thiếu key so với kho (bị xóa / crash trước khi flush) thì dựng lại
+                if len(bloom) >= self._store_count(kind):
+                    return bloom
+                bloom.close()
+        return self._build_bloom(kind)
+
+    def _build_bloom(self, kind: str, capacity: Optional[int] = None) -> BloomFilter:
+        count = self._store_count(kind)
+        capacity = max(capacity or 0, count * 2, self.min_capacity)
+        path = self.bloom_path(kind)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        bloom = BloomFilter.create(tmp_path, capacity, self.fp_rate)
+        for (key,) in self.db.execute("SELECT key FROM seen WHERE kind = ?", (kind,)):
+            bloom.add(key)
+        bloom.count = count
+        bloom.close()
+        os.replace(tmp_path, path)
+        return BloomFilter.open(path)
+
+    def _rebuild_bloom(self, kind: str, old: BloomFilter) -> BloomFilter:
+        old.close()
+        bloom = self._build_bloom(kind, old.capacity * 2)
+        print(f"[Seen] {kind}: vượt capacity {old.capacity}, dựng lại Bloom filter với capacity {bloom.capacity}")
+        return bloom
+
+    # -----------------------------------------------------------------------
+    # Đồng bộ với output/
+    # -----------------------------------------------------------------------
+
+    def _result_files(self, output_dir, today: Optional[datetime]) -> Iterator[Path]:
+        # Cùng quy tắc với storage.load_previous_results: chỉ file `YYYY-MM-DD.json`, không sau `today`
+        for root, _, files in os.walk(output_dir):
+            if Path(root).resolve() == self.directory.resolve():
+                continue
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    file_date = datetime.strptime(name[:-5], "%Y-%m-%d")
+                except ValueError:
+                    continue
+                if today is not None and file_date > today:
+                    continue
+                yield Path(root) / name
+
+    def sync(self, output_dir=None, today: Optional[datetime] = None) -> Dict[str, int]:
+        """Index các file kết quả mới / đã đổi từ lần sync trước. Trả về {"files": ..., "keys": ...}."""
+        with self.exclusive():
+            return self._sync(output_dir, today)
+
+    def _sync(self, output_dir, today: Optional[datetime]) -> Dict[str, int]:
+        known = {path: (size, mtime) for path, size, mtime in self.db.execute("SELECT path, size, mtime_ns FROM sources")}
+        before = len(self.pids) + len(self.hrefs)
+        files = 0
+        for path in self._result_files(output_dir or config.OUTPUT_DIR, today):
+            st = path.stat()
+            if known.get(str(path)) == (st.st_size, st.st_mtime_ns):
+                continue
+            pids: set[str] = set()
+            hrefs: set[str] = set()
+            try:
+                for item in serializer.iter_items(path):
+                    if isinstance(item, dict):
+                        storage._update_sets_from_items((item,), pids, hrefs)
+            except serializer.CorruptFileError as e:
+                print(f"⚠️ File kết quả hỏng: {e} — dùng các item đọc được")
+            except OSError as e:
+                print(f"[Seen] Bỏ qua {path}: {e}")
+                continue
+            self.pids.update(pids)
+            self.hrefs.update(hrefs)
+            self.db.execute(
+                "INSERT OR REPLACE INTO sources (path, size, mtime_ns, indexed_at) VALUES (?, ?, ?, ?)",
+                (str(path), st.st_size, st.st_mtime_ns, datetime.now().isoformat(timespec="seconds")),
+            )
+            self.db.commit()
+            files += 1
+        # Dựng lại Bloom (nếu vượt capacity) một lần sau cả lượt thay vì giữa chừng
+        for seen in self.sets.values():
+            seen._check_capacity()
+        return {"files": files, "keys": len(self.pids) + len(self.hrefs) - before}
+
+    def rebuild(self, output_dir=None, today: Optional[datetime] = None,
+                capacity: Optional[int] = None) -> Dict[str, int]:
+        """Xóa toàn bộ index rồi dựng lại từ output/ (capacity mặc định: gấp đôi số key hiện có)."""
+        with self.exclusive():
+            capacities = {kind: capacity or len(seen) * 2 for kind, seen in self.sets.items()}
+            for seen in self.sets.values():
+                seen.bloom.close()
+            self.db.execute("DELETE FROM seen")
+            self.db.execute("DELETE FROM sources")
+            self.db.commit()
+            self.sets = {kind: SeenSet(self, kind, self._build_bloom(kind, capacities[kind])) for kind in KINDS}
+            return self._sync(output_dir, today)
+
+    def flush(self) -> None:
+        with self.exclusive():
+            pass
+
+    def close(self) -> None:
+        # Header Bloom đã được flush khi nhả khóa ghi; flush lại ở đây có thể ghi đè count mới hơn của process khác
+        for seen in self.sets.values():
+            seen.bloom.close(flush=False)
+        self.db.close()
+        self._lock_file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        db_path = self.directory / DB_NAME
+        sources = self.db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return {
+            "directory": str(self.directory),
+            "sources": sources,
+            "db_bytes": sum(p.stat().st_size for p in self.directory.glob(DB_NAME + "*")) if db_path.exists() else 0,
+            **{kind: seen.stats() for kind, seen in self.sets.items()},
+        }
+
+    def measure_fp_rate(self, kind: str, probes: int = 100_000) -> float:
+        """Tỉ lệ dương tính giả đo được của Bloom với `probes` key chắc chắn không có trong index."""
+        bloom = self.sets[kind].bloom
+        hits = sum(1 for i in range(probes) if f"\0probe-{kind}-{i}" in bloom)
+        return hits / probes if probes else 0.0
+
+
+def open_index(today: Optional[datetime] = None, directory=None, output_dir=None) -> SeenIndex:
+    """Mở (tạo nếu chưa có) index ở config.SEEN_DIR và đồng bộ với các file kết quả đến hết `today`."""
+    index = SeenIndex(directory)
+    result = index.sync(output_dir, today)
+    if result["keys"]:
+        print(f"[Seen] Index thêm {result['keys']} key từ {result['files']} file kết quả")
+    return index
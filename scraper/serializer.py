@@ -0,0 +1,335 @@
+"""Đọc / ghi file kết quả JSON (`{"data": [...]}`): backend thay được, ghi atomic, đọc dạng stream.
+
+Backend (config.SERIALIZER hoặc tham số `backend`):
+  - "orjson": nhanh hơn json chuẩn nhiều lần, cần `orjson` (tùy chọn).
+  - "json":   thư viện chuẩn.
+  - "auto":   orjson nếu đã cài, không thì json.
+Object orjson không encode được (số nguyên > 64 bit, key không phải str...) tự rơi về json.
+
+Ghi: write_results ghi từng item vào file tạm cạnh file đích, fsync rồi os.replace, nên crash giữa chừng
+không bao giờ để lại file kết quả ghi dở. Mặc định giữ layout indent=2 như json.dump cũ; config.RESULTS_COMPACT_JSON
+(env SCRAPER_COMPACT_JSON=1) ghi dạng compact, nhỏ hơn và nhanh hơn.
+
+Đọc: iter_items đọc file theo khối và decode lần lượt từng item của mảng "data" (hoặc mảng gốc ở format cũ),
+không cần cả document trong bộ nhớ. File hỏng làm iter_items raise CorruptFileError sau khi đã yield hết các
+item đọc được; quarantine() đổi tên file đó sang `<tên>.corrupt-<thời gian>` để không bị ghi đè.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from . import config
+
+BACKENDS = ("auto", "orjson", "json")
+READ_CHUNK_SIZE = 1 << 20
+_ITEM_INDENT = b"\n    "
+
+
+class CorruptFileError(ValueError):
+    """File kết quả không đọc hết được; `items_read` item đầu tiên đã được yield trước khi lỗi."""
+
+    def __init__(self, path, message: str, items_read: int = 0, position: int = 0):
+        super().__init__(f"{path}: {message} (ký tự {position}, đã đọc {items_read} item)")
+        self.path = Path(path)
+        self.items_read = items_read
+        self.position = position
+
+
+# ---------------------------------------------------------------------------
+# Backend
+# ---------------------------------------------------------------------------
+
+class JsonBackend:
+    name = "json"
+
+    def dumps(self, obj: Any, indent: bool = True) -> bytes:
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._fallback = JsonBackend()
+
+    def dumps(self, obj: Any, indent: bool = True) -> bytes:
+        option = self._orjson.OPT_INDENT_2 if indent else 0
+        try:
+            return self._orjson.dumps(obj, option=option)
+        except TypeError:  # orjson.JSONEncodeError
+            return self._fallback.dumps(obj, indent)
+
+    def loads(self, data) -> Any:
+        return self._orjson.loads(data)
+
+
+_backends: Dict[str, Any] = {}
+
+
+def orjson_available() -> bool:
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_backend(name: Optional[str] = None):
+    """Backend theo tên (mặc định config.SERIALIZER); "orjson" khi chưa cài orjson sẽ raise ImportError."""
+    name = (name or getattr(config, "SERIALIZER", "auto") or "auto").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"serializer phải là một trong {BACKENDS}, nhận được: {name!r}")
+    if name == "auto":
+        name = "orjson" if orjson_available() else "json"
+    if name not in _backends:
+        _backends[name] = OrjsonBackend() if name == "orjson" else JsonBackend()
+    return _backends[name]
+
+
+def _indent_default(indent: Optional[bool]) -> bool:
+    return not getattr(config, "RESULTS_COMPACT_JSON", False) if indent is None else indent
+
+
+def dumps(obj: Any, indent: Optional[bool] = None, backend: Optional[str] = None) -> bytes:
+    return get_backend(backend).dumps(obj, _indent_default(indent))
+
+
+def loads(data, backend: Optional[str] = None) -> Any:
+    return get_backend(backend).loads(data)
+
+
+# ---------------------------------------------------------------------------
+# Ghi
+# ---------------------------------------------------------------------------
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows không mở được thư mục
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path):
+    """File nhị phân tạm cạnh `path`; thoát bình thường thì fsync + os.replace, lỗi thì xóa file tạm."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def write_results_stream(f, items: Iterable[Dict[str, Any]], indent: Optional[bool] = None,
+                         backend: Optional[str] = None) -> int:
+    """Ghi `{"data": [...]}` vào file nhị phân `f`, từng item một. indent=True cho đúng layout json.dump(indent=2)."""
+    encoder = get_backend(backend)
+    indent = _indent_default(indent)
+    count = 0
+    if indent:
+        for item in items:
+            f.write((b'{\n  "data": [\n    ' if count == 0 else b",\n    ")
+                    + encoder.dumps(item, True).replace(b"\n", _ITEM_INDENT))
+            count += 1
+        f.write(b'{\n  "data": []\n}' if count == 0 else b"\n  ]\n}")
+    else:
+        f.write(b'{"data":[')
+        for item in items:
+            f.write((b"," if count else b"") + encoder.dumps(item, False))
+            count += 1
+        f.write(b"]}")
+    return count
+
+
+def write_results(path, items: Iterable[Dict[str, Any]], indent: Optional[bool] = None,
+                  backend: Optional[str] = None) -> int:
+    """Ghi file kết quả một cách atomic. Trả về số item đã ghi."""
+    with atomic_open(path) as f:
+        return write_results_stream(f, items, indent, backend)
+
+
+# ---------------------------------------------------------------------------
+# Đọc
+# ---------------------------------------------------------------------------
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Bộ đệm text đọc dần từ file nhị phân, cho raw_decode từng giá trị."""
+
+    def __init__(self, f, path):
+        self.f = f
+        self.path = path
+        # Decode UTF-8 theo khối; byte của ký tự bị cắt ở cuối file cắt cụt được bỏ qua thay vì làm hỏng cả file
+        self.decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0  # vị trí của buf[0] trong file (theo ký tự)
+        self.eof = False
+        self.items_read = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        try:
+            chunk = self.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise self.error(f"không phải UTF-8: {e.reason}") from None
+        if self.pos:
+            self.offset += self.pos
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def error(self, message: str) -> CorruptFileError:
+        return CorruptFileError(self.path, message, self.items_read, self.offset + self.pos)
+
+    def peek(self) -> str:
+        """Ký tự khác khoảng trắng kế tiếp ("" nếu hết file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"cần {char!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise self.error(e.msg) from None
+            # Số ở cuối bộ đệm có thể còn chữ số ở khối sau
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            item = self.value()
+            self.items_read += 1
+            yield item
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                self.pos -= 1
+                raise self.error("cần ',' hoặc ']'")
+
+
+def _iter_document(reader: _Reader) -> Iterator[Any]:
+    first = reader.peek()
+    if first == "[":
+        yield from reader.array()
+    elif first == "{":
+        reader.pos += 1
+        if reader.peek() == "}":
+            reader.pos += 1
+        else:
+            while True:
+                key = reader.value()
+                if not isinstance(key, str):
+                    raise reader.error("key phải là chuỗi")
+                reader.expect(":")
+                if key == "data" and reader.peek() == "[":
+                    yield from reader.array()
+                else:
+                    reader.value()
+                char = reader.peek()
+                reader.pos += 1
+                if char == "}":
+                    break
+                if char != ",":
+                    reader.pos -= 1
+                    raise reader.error("cần ',' hoặc '}'")
+    elif first == "":
+        raise reader.error("file rỗng")
+    else:
+        raise reader.error("không phải mảng hoặc object JSON")
+    if reader.peek() != "":
+        raise reader.error("dữ liệu thừa sau document")
+
+
+def iter_items(path) -> Iterator[Any]:
+    """Yield lần lượt từng phần tử của `data` (format mới) hoặc của mảng gốc (format cũ).
+
+    Raise CorruptFileError (sau khi đã yield các phần tử đọc được) nếu file bị cắt cụt / hỏng.
+    """
+    with open(path, "rb") as f:
+        yield from _iter_document(_Reader(f, path))
+
+
+def load_results(path) -> List[Any]:
+    """Toàn bộ item của file kết quả bằng backend nhanh (đọc cả file một lần)."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        data = loads(raw)
+    except ValueError as e:
+        raise CorruptFileError(path, str(e)) from None
+    items = data.get("data", []) if isinstance(data, dict) else data
+    return items if isinstance(items, list) else []
+
+
+def quarantine(path) -> Optional[Path]:
+    """Đổi tên file hỏng thành `<tên>.corrupt-YYYYmmdd-HHMMSS` để giữ lại dữ liệu; trả về đường dẫn mới."""
+    path = Path(path)
+    target = path.with_name(f"{path.name}.corrupt-{datetime.now():%Y%m%d-%H%M%S}")
+    try:
+        os.replace(path, target)
+    except OSError as e:
+        print(f"⚠️ Không đổi tên được file hỏng {path}: {e}")
+        return None
+    return target
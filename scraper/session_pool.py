@@ -0,0 +1,311 @@
+"""Pool phiên WebDriver giữ ấm giữa các job crawl (engine selenium).
+
+Trước đây mỗi run_scraper gọi init_driver (attach vào Chrome qua debuggerAddress) rồi driver.quit() ở cuối: job
+web liên tiếp trả phí tạo phiên mỗi lần, Chrome chết giữa chừng làm hỏng cả job, và không có kiểm tra sức khỏe.
+SessionPool giữ một phiên cho mỗi debugger address (các pool của get_pool dùng chung phiên theo address, nên job
+tuần tự và job song song trên cùng Chrome không tạo hai phiên WebDriver):
+
+  - Trước khi cho mượn, phiên được probe rẻ: GET http://<address>/json/version (timeout ngắn, cũng cho biết id
+    browser) rồi một lệnh WebDriver `window_handles`. Endpoint đổi id browser (Chrome đã khởi động lại) hoặc probe
+    lỗi → tạo lại phiên, thử lại config.SESSION_RECONNECT_ATTEMPTS lần với backoff.
+  - Driver trả cho runner là proxy: khi driver.get lỗi vì mất kết nối giữa job, proxy kết nối lại và điều hướng
+    lại một lần, runner giữ nguyên tham chiếu driver / wait.
+  - Sau config.SESSION_MAX_PAGES lần điều hướng, phiên mở tab mới (renderer mới) ngay trước lần điều hướng kế tiếp
+    để chặn bộ nhớ Chrome phình dần, và chỉ đóng các tab do chính nó mở trước đó: tab khác của Chrome (ví dụ
+    Chrome người vận hành tự mở) không bị đụng tới.
+  - Chrome đi qua proxy của egress_pool (fleet gán theo debugger address): mỗi lần điều hướng chờ token bucket
+    của proxy đó; driver.egress_key cho collectors báo CAPTCHA / thành công về đúng proxy.
+
+Trạng thái pool (phiên, số trang, số lần reconnect / recycle, lỗi gần nhất) có trong /api/status.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from . import config, egress_pool, metrics
+from .browser import init_driver
+
+
+class SessionUnavailable(RuntimeError):
+    """Không kết nối được tới Chrome ở debugger address sau khi đã thử lại."""
+
+
+def debugger_browser_id(address: str, timeout: float) -> Optional[str]:
+    """Id browser từ /json/version của Chrome (đổi mỗi lần Chrome khởi động lại); None nếu không kết nối được."""
+    try:
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=timeout) as resp:
+            info = json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    return (info.get("webSocketDebuggerUrl") or "").rsplit("/", 1)[-1] or info.get("Browser") or "?"
+
+
+class _DriverProxy:
+    """Chuyển mọi thuộc tính tới WebDriver hiện tại của phiên; get() đếm trang, recycle tab và tự kết nối lại."""
+
+    def __init__(self, session: "PooledSession"):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session.current_driver(), name)
+
+    @property
+    def egress_key(self) -> str:
+        """Khóa phiên trong egress_pool: Chrome của fleet được gán proxy theo debugger address."""
+        return self._session.address
+
+    def get(self, url: str):
+        session = self._session
+        session.before_navigation()
+        egress_pool.throttle(session.address)  # ngân sách tốc độ của proxy đang dính với Chrome này (nếu có)
+        try:
+            session.current_driver().get(url)
+        except WebDriverException:
+            if session.pool.probe(session):
+                raise  # Chrome vẫn sống: lỗi của trang, để caller xử lý như trước
+            session.pool.reconnect(session, reason="navigation")
+            session.current_driver().get(url)
+
+
+class PooledSession:
+    def __init__(self, pool: "SessionPool", address: str):
+        self.pool = pool
+        self.address = address
+        self._driver = None
+        self.browser_id: Optional[str] = None
+        self.driver = _DriverProxy(self)
+        self.wait = WebDriverWait(self.driver, config.WAIT_TIMEOUT)
+        self.leased = False
+        self.connected_at: Optional[float] = None
+        self.pages = 0            # số lần điều hướng từ lần recycle gần nhất
+        self.total_pages = 0
+        self.leases = 0
+        self.reconnects = 0
+        self.recycles = 0
+        self.own_handles: set = set()   # tab do phiên mở (recycle_tab), chỉ các tab này được đóng
+        self.last_probe: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def current_driver(self):
+        if self._driver is None:
+            self.pool.reconnect(self, reason="connect")
+        return self._driver
+
+    def before_navigation(self):
+        if self.pool.max_pages and self.pages >= self.pool.max_pages:
+            self.recycle_tab()
+        self.pages += 1
+        self.total_pages += 1
+
+    def recycle_tab(self):
+        """Mở tab mới rồi đóng các tab phiên đã mở trước đó (renderer cũ được giải phóng); tab khác giữ nguyên."""
+        driver = self._driver
+        try:
+            driver.switch_to.new_window("tab")
+            new_handle = driver.current_window_handle
+            for handle in self.own_handles & set(driver.window_handles):
+                if handle != new_handle:
+                    driver.switch_to.window(handle)
+                    driver.close()
+            driver.switch_to.window(new_handle)
+            self.own_handles = {new_handle}
+            self.recycles += 1
+            metrics.inc("scraper_session_recycles_total")
+            print(f"[SessionPool] {self.address}: recycle tab sau {self.pages} trang")
+        except WebDriverException as e:
+            self.last_error = f"recycle: {e.msg or e}"[:300]
+            self.pool.reconnect(self, reason="recycle")
+        self.pages = 0
+
+    def quit(self):
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "connected": self._driver is not None,
+            "browser_id": self.browser_id,
+            "leased": self.leased,
+            "age_seconds": round(time.time() - self.connected_at, 1) if self._driver is not None else None,
+            "pages_since_recycle": self.pages,
+            "total_pages": self.total_pages,
+            "leases": self.leases,
+            "reconnects": self.reconnects,
+            "recycles": self.recycles,
+            "last_probe": self.last_probe,
+            "last_error": self.last_error,
+        }
+
+
+class SessionPool:
+    """
+    Một phiên WebDriver cho mỗi debugger address, cho mượn qua acquire() / release().
+
+        session = pool.acquire()
+        try:
+            run(session.driver, session.wait)
+        finally:
+            pool.release(session)
+    """
+
+    def __init__(
+        self,
+        addresses,
+        max_pages: Optional[int] = None,
+        probe_timeout: Optional[float] = None,
+        shared: Optional[Dict[str, PooledSession]] = None,
+    ):
+        """shared: phiên dùng chung theo address (get_pool); phiên chưa có được tạo và thêm vào dict này."""
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        self.max_pages = config.SESSION_MAX_PAGES if max_pages is None else max_pages
+        self.probe_timeout = config.SESSION_PROBE_TIMEOUT if probe_timeout is None else probe_timeout
+        if shared is None:
+            self.sessions: List[PooledSession] = [PooledSession(self, address) for address in addresses]
+            self._cond = threading.Condition()
+        else:
+            self.sessions = []
+            for address in addresses:
+                if address not in shared:
+                    shared[address] = PooledSession(self, address)
+                self.sessions.append(shared[address])
+            # Phiên dùng chung: cờ leased phải được đọc / ghi dưới cùng một lock với các pool khác
+            self._cond = _shared_cond
+
+    # -----------------------------------------------------------------------
+    # Sức khỏe / kết nối
+    # -----------------------------------------------------------------------
+
+    def probe(self, session: PooledSession) -> bool:
+        """True nếu Chrome ở địa chỉ của phiên vẫn là browser phiên đang gắn vào và WebDriver còn trả lời."""
+        session.last_probe = time.time()
+        with metrics.timer("scraper_session_probe_seconds"):
+            browser_id = debugger_browser_id(session.address, self.probe_timeout)
+            if browser_id is None:
+                session.last_error = "debugger endpoint không phản hồi"
+                return False
+            if session._driver is None or browser_id != session.browser_id:
+                return False
+            try:
+                session._driver.window_handles
+            except WebDriverException as e:
+                session.last_error = f"probe: {e.msg or e}"[:300]
+                return False
+        return True
+
+    def reconnect(self, session: PooledSession, reason: str) -> None:
+        """Bỏ phiên cũ và attach lại vào Chrome; raise SessionUnavailable nếu hết lượt thử."""
+        if session._driver is not None:
+            session.reconnects += 1
+            metrics.inc("scraper_session_reconnects_total", reason=reason)
+            print(f"[SessionPool] {session.address}: kết nối lại ({reason})")
+        session.quit()
+        delay = 1.0
+        for attempt in range(1, config.SESSION_RECONNECT_ATTEMPTS + 1):
+            browser_id = debugger_browser_id(session.address, self.probe_timeout)
+            if browser_id is not None:
+                try:
+                    driver, _ = init_driver(session.address, config.PAGE_LOAD_TIMEOUT, config.WAIT_TIMEOUT)
+                except WebDriverException as e:
+                    session.last_error = f"connect: {e.msg or e}"[:300]
+                else:
+                    session._driver = driver
+                    session.browser_id = browser_id
+                    session.connected_at = time.time()
+                    session.pages = 0
+                    return
+            else:
+                session.last_error = "debugger endpoint không phản hồi"
+            if attempt < config.SESSION_RECONNECT_ATTEMPTS:
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        raise SessionUnavailable(f"Không kết nối được Chrome ở {session.address}: {session.last_error}")
+
+    # -----------------------------------------------------------------------
+    # Cho mượn
+    # -----------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledSession:
+        """Phiên rảnh đã qua probe (kết nối lại nếu cần). Chờ tối đa `timeout` giây nếu mọi phiên đang bận."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                free = [s for s in self.sessions if not s.leased]
+                if free:
+                    # Ưu tiên phiên đã kết nối, ít trang nhất
+                    session = min(free, key=lambda s: (s._driver is None, s.pages))
+                    session.leased = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Mọi phiên WebDriver đang bận")
+                self._cond.wait(remaining)
+
+        try:
+            if not self.probe(session):
+                self.reconnect(session, reason="probe")
+        except BaseException:
+            self.release(session)
+            raise
+        session.leases += 1
+        return session
+
+    def release(self, session: PooledSession) -> None:
+        with self._cond:
+            session.leased = False
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            for session in self.sessions:
+                session.quit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_pages": self.max_pages,
+            "sessions": [s.stats() for s in self.sessions],
+        }
+
+
+_pools: Dict[tuple, SessionPool] = {}
+_pools_lock = threading.Lock()
+# address → phiên: một phiên WebDriver cho mỗi Chrome dù nhiều pool (bộ address khác nhau) cùng chứa address đó
+_sessions: Dict[str, PooledSession] = {}
+_shared_cond = threading.Condition()
+
+
+def get_pool(addresses) -> SessionPool:
+    """Pool dùng chung trong process cho bộ debugger address này (tạo khi gọi lần đầu), phiên dùng chung theo address."""
+    key = (addresses,) if isinstance(addresses, str) else tuple(addresses)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SessionPool(list(key), shared=_sessions)
+        return pool
+
+
+def pools_stats() -> List[Dict[str, Any]]:
+    with _pools_lock:
+        return [pool.stats() for pool in _pools.values()]
+
+
+@atexit.register
+def close_all() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _sessions.clear()
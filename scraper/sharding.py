@@ -0,0 +1,375 @@
+"""Chia một category lớn thành các shard theo khoảng giá / diện tích.
+
+Site chỉ cho phân trang tới một số trang giới hạn, nên các category lớn (ví dụ /nha-dat-ban-ha-noi)
+không thể crawl hết bằng một URL. Planner probe số kết quả của từng band giá (gtn/gcn) và diện tích
+(dtnn/dtln), chia nhỏ đệ quy các band quá lớn và xuất ra danh sách URL shard phủ toàn bộ category.
+Các shard độc lập nên có thể crawl song song (mỗi worker một Chrome) hoặc resume từng shard.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from . import config
+from .utils import human_sleep as _default_human_sleep
+
+Probe = Callable[[str], Optional[int]]
+
+_RE_DIGITS = re.compile(r'\d[\d.,]*')
+# Lý do dừng cho biết shard đã được crawl hết (khác "max_pages": bị cắt giữa chừng)
+EXHAUSTED_REASONS = ("no_next_page", "date_bound", "known_pages", "known_cards")
+# max_pages / max_items_per_page mặc định khi crawl shard: vượt xa số trang / số tin mỗi trang site cho phép
+SHARD_NO_LIMIT = 10_000
+
+
+# ---------------------------------------------------------------------------
+# Format band → query param
+# ---------------------------------------------------------------------------
+
+def format_price(million: float) -> str:
+    """Giá (đơn vị triệu) → giá trị gtn/gcn, ví dụ 500 → "500-trieu", 2000 → "2-ty"."""
+    if million >= 1000 and million % 1000 == 0:
+        return f"{int(million // 1000)}-ty"
+    return f"{million:g}-trieu"
+
+
+def format_area(m2: float) -> str:
+    """Diện tích → giá trị dtnn/dtln, ví dụ 30 → "30m2"."""
+    return f"{m2:g}m2"
+
+
+def band_filters(band: dict[str, Any]) -> dict[str, str]:
+    """Chuyển band {price_from, price_to, area_from, area_to} sang filters cho build_url_with_filters."""
+    filters = {}
+    if band.get("price_from"):
+        filters["price_from"] = format_price(band["price_from"])
+    if band.get("price_to") is not None:
+        filters["price_to"] = format_price(band["price_to"])
+    if band.get("area_from"):
+        filters["area_from"] = format_area(band["area_from"])
+    if band.get("area_to") is not None:
+        filters["area_to"] = format_area(band["area_to"])
+    return filters
+
+
+def band_url(base_url: str, band: dict[str, Any]) -> str:
+    from .runner import build_url_with_filters
+    return build_url_with_filters(base_url, band_filters(band))
+
+
+def _bands_from_cuts(cuts: list[float], key: str, parent: dict[str, Any]) -> list[dict[str, Any]]:
+    """Chia band cha theo các mốc cắt nằm trong khoảng của nó (band cuối mở nếu cha mở)."""
+    lo = parent.get(f"{key}_from") or 0
+    hi = parent.get(f"{key}_to")
+    inner = [c for c in cuts if c > lo and (hi is None or c < hi)]
+    edges = [lo] + inner + [hi]
+    bands = []
+    for a, b in zip(edges, edges[1:]):
+        band = dict(parent)
+        band[f"{key}_from"] = a
+        band[f"{key}_to"] = b
+        bands.append(band)
+    return bands
+
+
+def _split_band(band: dict[str, Any], min_price_step: float, min_area_step: float) -> list[dict[str, Any]]:
+    """
+    Chia band thành các band con: ưu tiên giá, hết chia được giá thì chia diện tích.
+    Trả về [] nếu không thể chia nhỏ hơn.
+    """
+    # 1) Band giá còn quá rộng → chia đôi
+    if band.get("price_to") is not None:
+        lo = band.get("price_from") or 0
+        hi = band["price_to"]
+        if hi - lo > min_price_step:
+            mid = round((lo + hi) / 2)
+            if lo < mid < hi:
+                return [dict(band, price_to=mid), dict(band, price_from=mid)]
+
+    # 2) Chia theo diện tích: lần đầu theo mốc cấu hình, sau đó chia đôi
+    if band.get("area_to") is None:
+        bands = _bands_from_cuts(config.SHARD_AREA_CUTS, "area", band)
+        if len(bands) > 1:
+            return bands
+    else:
+        lo = band.get("area_from") or 0
+        hi = band["area_to"]
+        if hi - lo > min_area_step:
+            mid = round((lo + hi) / 2)
+            if lo < mid < hi:
+                return [dict(band, area_to=mid), dict(band, area_from=mid)]
+
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Probe
+# ---------------------------------------------------------------------------
+
+def parse_result_count(text: str) -> Optional[int]:
+    """Lấy số kết quả từ text kiểu "Hiện có 12.345 bất động sản"."""
+    m = _RE_DIGITS.search(text or "")
+    if not m:
+        return None
+    digits = re.sub(r'[.,]', '', m.group(0))
+    return int(digits) if digits else None
+
+
+def make_driver_probe(driver, human_sleep: Callable[[float, float], None] = _default_human_sleep) -> Probe:
+    """Tạo probe dùng Selenium: load URL và đọc tổng số tin của trang list."""
+    from selenium.webdriver.common.by import By
+
+    def probe(url: str) -> Optional[int]:
+        try:
+            driver.get(url)
+            human_sleep(2, 4)
+        except Exception as e:
+            print(f"[Shard] Lỗi load {url}: {e}")
+            return None
+
+        for selector in config.RESULT_COUNT_SELECTORS:
+            try:
+                for el in driver.find_elements(By.CSS_SELECTOR, selector):
+                    count = parse_result_count(el.get_attribute("textContent") or el.text)
+                    if count is not None:
+                        return count
+            except Exception:
+                continue
+
+        # Trang không có card nào → 0 kết quả
+        try:
+            if not driver.find_elements(By.CSS_SELECTOR, "#product-lists-web a.js__product-link-for-product-id"):
+                return 0
+        except Exception:
+            pass
+        return None
+
+    return probe
+
+
+# ---------------------------------------------------------------------------
+# Planner
+# ---------------------------------------------------------------------------
+
+def plan_shards(
+    base_url: str,
+    probe: Probe,
+    max_results: int = config.SHARD_MAX_RESULTS,
+    min_price_step: float = config.SHARD_MIN_PRICE_STEP,
+    min_area_step: float = config.SHARD_MIN_AREA_STEP,
+    max_probes: int = config.SHARD_MAX_PROBES,
+) -> dict[str, Any]:
+    """
+    Lập kế hoạch shard cho một base URL.
+
+    Args:
+        base_url: URL category (có thể đã có location)
+        probe: Hàm URL → số kết quả (None nếu không đọc được)
+        max_results: Số kết quả tối đa mỗi shard (≈ số trang site cho phép × số tin mỗi trang)
+        min_price_step / min_area_step: Độ rộng band nhỏ nhất (triệu / m²) trước khi dừng chia
+        max_probes: Giới hạn số lần probe
+
+    Returns:
+        Dict plan {base_url, total, shards: [...], report: {...}}
+    """
+    counts: dict[str, Optional[int]] = {}
+
+    def count_of(url: str) -> Optional[int]:
+        if url not in counts:
+            if len(counts) >= max_probes:
+                return None
+            counts[url] = probe(url)
+            print(f"[Shard] {counts[url]} ← {url}")
+        return counts[url]
+
+    total = count_of(base_url)
+    shards: list[dict[str, Any]] = []
+
+    if total is not None and total <= max_results:
+        shards.append({"url": base_url, "count": total, "truncated": False})
+    else:
+        pending = _bands_from_cuts(config.SHARD_PRICE_CUTS, "price", {"price_from": 0, "price_to": None})
+        while pending:
+            band = pending.pop(0)
+            url = band_url(base_url, band)
+            count = count_of(url)
+            if count == 0:
+                continue
+            if count is not None and count > max_results:
+                children = _split_band(band, min_price_step, min_area_step)
+                if children:
+                    pending = children + pending
+                    continue
+            shards.append(dict(band, url=url, count=count, truncated=bool(count and count > max_results)))
+
+    for idx, shard in enumerate(shards):
+        shard["id"] = idx
+
+    plan = {
+        "base_url": base_url,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "max_results": max_results,
+        "total": total,
+        "probes": len(counts),
+        "shards": shards,
+    }
+    plan["report"] = coverage_report(plan)
+    return plan
+
+
+def coverage_report(plan: dict[str, Any]) -> dict[str, Any]:
+    """
+    Báo cáo độ phủ của plan.
+
+    coverage: tổng số tin các shard / tổng số tin category (tin "Thỏa thuận" không có giá
+    sẽ không nằm trong band giá nào nên coverage có thể < 1).
+    overlap: phần vượt quá tổng category, do các mốc band được tính ở cả hai band liền kề.
+    """
+    total = plan.get("total") or 0
+    shard_sum = sum(s.get("count") or 0 for s in plan.get("shards", []))
+    unknown = sum(1 for s in plan.get("shards", []) if s.get("count") is None)
+    truncated = [s["id"] for s in plan.get("shards", []) if s.get("truncated")]
+    return {
+        "shards": len(plan.get("shards", [])),
+        "total": total,
+        "shard_sum": shard_sum,
+        "coverage": round(min(shard_sum, total) / total, 4) if total else None,
+        "overlap": max(0, shard_sum - total) if total else None,
+        "unknown_counts": unknown,
+        "truncated_shards": truncated,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Lưu / resume
+# ---------------------------------------------------------------------------
+
+def plan_path_for(base_url: str) -> str:
+    from .locations import property_path_from_url
+    slug = property_path_from_url(base_url).strip("/").replace("/", "_") or "root"
+    return str(config.SHARD_PLAN_DIR / f"{slug}.json")
+
+
+def save_plan(plan: dict[str, Any], path: Optional[str] = None) -> str:
+    path = path or plan_path_for(plan["base_url"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_plan(path: str) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _done_file(plan_path: str) -> str:
+    return f"{plan_path}.done"
+
+
+def load_done_shards(plan_path: str) -> set[int]:
+    """Đọc id các shard đã crawl xong (file .done append-only, an toàn khi nhiều worker cùng ghi)."""
+    done = set()
+    try:
+        with open(_done_file(plan_path), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.isdigit():
+                    done.add(int(line))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def mark_shard_done(plan_path: str, shard_id: int) -> None:
+    with open(_done_file(plan_path), "a", encoding="utf-8") as f:
+        f.write(f"{shard_id}\n")
+
+
+def crawl_shard_plan(
+    plan_path: str,
+    filters: Optional[dict[str, Any]] = None,
+    debugger_address: Optional[str] = None,
+    worker_index: int = 0,
+    worker_count: int = 1,
+    status_callback: Optional[dict[str, Any]] = None,
+    incremental: bool = False,
+) -> dict[str, Any]:
+    """
+    Crawl các shard chưa xong của plan, đánh dấu từng shard khi hoàn thành (resume được).
+
+    Khi chạy song song, mỗi worker (một Chrome riêng / debugger_address riêng) nhận các shard có
+    id % worker_count == worker_index và ghi vào file kết quả riêng trong thư mục shard-w<index>/
+    để không ghi đè file của worker khác.
+
+    Không truyền max_pages / max_items_per_page thì shard được crawl tới hết (SHARD_NO_LIMIT); shard chỉ được
+    đánh dấu xong khi dừng vì một lý do trong EXHAUSTED_REASONS.
+    """
+    from .runner import run_scraper
+
+    # Band giá/diện tích đã nằm trong URL shard, không để filters ghi đè
+    filters = {
+        "max_pages": SHARD_NO_LIMIT,
+        "max_items_per_page": SHARD_NO_LIMIT,
+        **{
+            k: v for k, v in (filters or {}).items()
+            if k not in ("price_from", "price_to", "area_from", "area_to") and v is not None
+        },
+    }
+
+    plan = load_plan(plan_path)
+    done = load_done_shards(plan_path)
+    mine = [s for s in plan["shards"] if s["id"] % worker_count == worker_index and s["id"] not in done]
+    print(f"[Shard] Worker {worker_index}/{worker_count}: {len(mine)} shard cần crawl ({len(done)} đã xong)")
+
+    results_file = None
+    if worker_count > 1:
+        today = datetime.now()
+        folder = config.OUTPUT_DIR / today.strftime("%Y-%m") / f"shard-w{worker_index}"
+        folder.mkdir(parents=True, exist_ok=True)
+        results_file = folder / f"{today.strftime('%Y-%m-%d')}.json"
+
+    total_items = 0
+    reports = []
+    failed = []
+    for shard in mine:
+        try:
+            result = run_scraper(
+                base_urls=[shard["url"]],
+                filters=filters,
+                debugger_address=debugger_address,
+                status_callback=status_callback,
+                incremental=incremental,
+                results_file=results_file,
+            )
+        except Exception as e:
+            # Ví dụ SessionUnavailable: shard vẫn chờ, lần resume sau crawl lại
+            print(f"[Shard] {shard['id']} lỗi, để lại cho lần resume sau: {e}")
+            failed.append(shard["id"])
+            continue
+        total_items = result["total_items"]
+        shard_reports = [r for r in result.get("url_reports", []) if r.get("url") == shard["url"]]
+        reports.extend(result.get("url_reports", []))
+        # run_scraper nuốt lỗi của scrape_url (URL lỗi không có report) và "max_pages" chỉ là bị cắt giữa chừng:
+        # chỉ đánh dấu xong khi URL của shard đã crawl hết, nếu không plan sẽ thiếu vùng mà không ai biết
+        if any(r.get("stop_reason") in EXHAUSTED_REASONS for r in shard_reports):
+            mark_shard_done(plan_path, shard["id"])
+        else:
+            reasons = [r.get("stop_reason") for r in shard_reports] or ["không có báo cáo"]
+            print(f"[Shard] {shard['id']} chưa crawl hết ({', '.join(map(str, reasons))}), "
+                  f"để lại cho lần resume sau: {shard['url']}")
+            failed.append(shard["id"])
+
+    return {
+        "shards_crawled": len(mine) - len(failed),
+        "shards_failed": failed,
+        "shards_done": len(load_done_shards(plan_path)),
+        "shards_total": len(plan["shards"]),
+        "total_items": total_items,
+        "url_reports": reports,
+    }
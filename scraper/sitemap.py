@@ -0,0 +1,180 @@
+"""Nguồn phát hiện tin đăng từ sitemap XML của site (thay cho việc phân trang trang list).
+
+Sitemap được parse dạng stream bằng `xml.etree.ElementTree.iterparse` nên không cần giữ cả file
+trong bộ nhớ. Nguồn có thể là URL (sitemap index hoặc urlset, hỗ trợ .gz) hoặc một thư mục local
+chứa các file sitemap (dùng cho test / dữ liệu đã tải sẵn).
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from datetime import date
+from typing import IO, Container, Iterator, Optional
+from urllib.parse import urlparse
+from xml.etree.ElementTree import iterparse
+
+from . import config
+from .collectors.listing import new_list_item
+from .utils import normalize_date
+
+_RE_PID = re.compile(r'-pr(\d+)(?:[/?#]|$)')
+
+
+def pid_from_url(url: str) -> Optional[str]:
+    """Lấy PID từ URL detail, ví dụ ".../ban-dat-xa-abc-pr41234567" → "41234567"."""
+    m = _RE_PID.search(url or "")
+    return m.group(1) if m else None
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _open_source(location: str, local_dir: Optional[str]) -> IO[bytes]:
+    """Mở một sitemap (URL hoặc file local), tự giải nén .gz."""
+    if local_dir is not None:
+        path = location
+        if not os.path.isabs(path) or not os.path.exists(path):
+            # URL con trong sitemap index → tìm file cùng tên trong thư mục local
+            path = os.path.join(local_dir, os.path.basename(urlparse(location).path))
+        fh = open(path, "rb")
+    else:
+        import requests
+
+        resp = requests.get(location, stream=True, timeout=config.PAGE_LOAD_TIMEOUT)
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        fh = resp.raw
+
+    if location.endswith(".gz"):
+        return gzip.GzipFile(fileobj=fh)
+    return fh
+
+
+def _iter_xml(fh: IO[bytes]) -> Iterator[tuple[str, str, Optional[str]]]:
+    """Yield (kind, loc, lastmod) với kind là "sitemap" (mục trong index) hoặc "url"."""
+    loc = lastmod = None
+    root = None
+    try:
+        for event, elem in iterparse(fh, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            name = _local_name(elem.tag)
+            if name == "loc":
+                loc = (elem.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (elem.text or "").strip()
+            elif name in ("url", "sitemap"):
+                if loc:
+                    yield name, loc, lastmod
+                loc = lastmod = None
+                # Root vẫn giữ tham chiếu tới từng <url> đã xong (kể cả khi đã clear): bỏ chúng khỏi root để bộ
+                # nhớ không tăng theo kích thước sitemap
+                root.clear()
+    finally:
+        fh.close()
+
+
+def _lastmod_date(lastmod: Optional[str]) -> Optional[date]:
+    if not lastmod:
+        return None
+    # W3C datetime: 2025-11-20 hoặc 2025-11-20T08:15:00+07:00
+    return normalize_date(lastmod[:10])
+
+
+def iter_sitemap_entries(
+    source: str,
+    path_prefixes: Optional[list[str]] = None,
+    since: Optional[date] = None,
+) -> Iterator[tuple[str, Optional[date]]]:
+    """
+    Duyệt toàn bộ sitemap (đệ quy qua sitemap index), yield (url, lastmod).
+
+    Args:
+        source: URL sitemap / sitemap index, file local, hoặc thư mục local chứa các file sitemap
+        path_prefixes: Chỉ lấy URL có path bắt đầu bằng một trong các prefix (ví dụ ["/ban-dat"])
+        since: Bỏ qua entry có lastmod cũ hơn ngày này (cả sitemap con trong index)
+    """
+    local_dir = None
+    if os.path.isdir(source):
+        local_dir = source
+        roots = [
+            os.path.join(source, name)
+            for name in config.SITEMAP_INDEX_NAMES
+            if os.path.exists(os.path.join(source, name))
+        ]
+        if not roots:
+            roots = sorted(
+                os.path.join(source, name)
+                for name in os.listdir(source)
+                if name.endswith(".xml") or name.endswith(".xml.gz")
+            )
+    elif os.path.exists(source):
+        local_dir = os.path.dirname(os.path.abspath(source))
+        roots = [os.path.abspath(source)]
+    else:
+        roots = [source]
+
+    stack = list(reversed(roots))
+    visited: set[str] = set()
+    while stack:
+        location = stack.pop()
+        if location in visited:
+            continue
+        visited.add(location)
+
+        try:
+            fh = _open_source(location, local_dir)
+        except Exception as e:
+            print(f"[Sitemap] Không mở được {location}: {e}")
+            continue
+
+        children = []
+        try:
+            for kind, loc, lastmod in _iter_xml(fh):
+                lastmod_date = _lastmod_date(lastmod)
+                if since and lastmod_date and lastmod_date < since:
+                    continue
+                if kind == "sitemap":
+                    children.append(loc)
+                    continue
+                if path_prefixes and not any(urlparse(loc).path.startswith(p) for p in path_prefixes):
+                    continue
+                yield loc, lastmod_date
+        except Exception as e:
+            print(f"[Sitemap] Lỗi parse {location}: {e}")
+
+        stack.extend(reversed(children))
+
+
+def discover_new_items(
+    source: str,
+    scraped_pids: Container[str],
+    scraped_hrefs: Container[str],
+    path_prefixes: Optional[list[str]] = None,
+    since: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> Iterator[dict]:
+    """Yield item (cùng format với collect_list_items) cho các URL trong sitemap chưa từng scrape."""
+    seen_in_run: set[str] = set()
+    yielded = skipped = 0
+    for url, _ in iter_sitemap_entries(source, path_prefixes=path_prefixes, since=since):
+        pid = pid_from_url(url)
+        key = pid or url
+        if key in seen_in_run:
+            continue
+        seen_in_run.add(key)
+
+        if (pid and pid in scraped_pids) or url in scraped_hrefs:
+            skipped += 1
+            continue
+
+        yield new_list_item(url, pid)
+        yielded += 1
+        if limit and yielded >= limit:
+            break
+
+    print(f"[Sitemap] {yielded} URL mới, bỏ qua {skipped} URL đã scrape")
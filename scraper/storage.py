@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import json
 import os
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable, Tuple
+from typing import Any, Callable, Iterable, Iterator, Tuple
 import requests
 from urllib.parse import urlparse
-from . import config
+from . import config, geo, metrics, parquet_export, profiling, results_db, serializer
 from .utils import normalize_text
 
 def _update_sets_from_items(
@@ -39,7 +38,9 @@ def _update_sets_from_items(
 def load_previous_results(
     output_dir: str,
     today: datetime,
+    keep_items: bool = True,
 ) -> Tuple[set[str], set[str], list[dict[str, Any]]]:
+    """pid / href của mọi file kết quả đến hết `today`; keep_items=False chỉ giữ key (list item trả về rỗng)."""
     scraped_pids = set()
     scraped_hrefs = set()
     all_results = []
@@ -61,48 +62,68 @@ def load_previous_results(
                 continue
 
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                # Hỗ trợ cả format cũ (list) và format mới (object với key "data")
-                if isinstance(data, list):
-                    _update_sets_from_items(data, scraped_pids, scraped_hrefs)
-                    all_results.extend(data)
-                elif isinstance(data, dict) and "data" in data:
-                    items = data["data"]
-                    if isinstance(items, list):
-                        _update_sets_from_items(items, scraped_pids, scraped_hrefs)
-                        all_results.extend(items)
+                # Hỗ trợ cả format cũ (list) và format mới (object với key "data"), đọc dạng stream
+                try:
+                    for item in serializer.iter_items(file_path):
+                        _update_sets_from_items((item,), scraped_pids, scraped_hrefs)
+                        if keep_items:
+                            all_results.append(item)
+                except serializer.CorruptFileError as e:
+                    print(f"⚠️ File kết quả hỏng: {e} — dùng các item đọc được")
             except:
                 continue
 
     return scraped_pids, scraped_hrefs, all_results
 
 
+def result_key(item: dict[str, Any]) -> str | None:
+    """
+    Key định danh / bỏ trùng một tin, dùng chung cho file kết quả, CrawlState, results.db và Parquet.
 
+    Format cũ: pid rồi href ở root; format mới: real_estate_code (= pid lúc transform) rồi pid / href trong
+    other_info. None nếu không có.
+    """
+    key = item.get("pid") or item.get("href") or item.get("real_estate_code")
+    if not key:
+        other_info = item.get("other_info")
+        if isinstance(other_info, dict):
+            key = other_info.get("pid") or other_info.get("href")
+    return str(key) if key else None
+
+
+def iter_result_files(
+    files: Iterable[str | Path],
+    dedupe: bool = True,
+) -> Iterator[tuple[Path, dict[str, Any]]]:
+    """
+    Yield (file, item) qua nhiều file kết quả, đọc dạng stream (không giữ cả file trong bộ nhớ).
 
-def load_today_results(
-    results_file: str,
-    scraped_pids: set[str],
-    scraped_hrefs: set[str],
-) -> list[dict[str, Any]]:
-    if not os.path.exists(results_file):
-        return []
-    try:
-        with open(results_file, "r", encoding="utf-8") as f:
-            today_data = json.load(f)
+    File mới nhất (theo tên YYYY-MM-DD) được đọc trước; với dedupe=True một tin đã gặp ở file mới hơn
+    sẽ bị bỏ qua ở các file cũ hơn (chỉ giữ tập key, không giữ item).
+    """
+    seen: set[str] = set()
+    for path in sorted((Path(f) for f in files), key=lambda p: (p.name, str(p)), reverse=True):
+        try:
             # Hỗ trợ cả format cũ (list) và format mới (object với key "data")
-            if isinstance(today_data, list):
-                _update_sets_from_items(today_data, scraped_pids, scraped_hrefs)
-                return today_data
-            elif isinstance(today_data, dict) and "data" in today_data:
-                items = today_data["data"]
-                if isinstance(items, list):
-                    _update_sets_from_items(items, scraped_pids, scraped_hrefs)
-                    return items
-    except Exception:
-        pass
-    return []
+            for item in serializer.iter_items(path):
+                if not isinstance(item, dict):
+                    continue
+                if dedupe:
+                    key = result_key(item)
+                    if key is not None:
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                yield path, item
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Bỏ qua phần còn lại của {path}: {e}")
+
+
+def iter_result_items(files: Iterable[str | Path], dedupe: bool = True) -> Iterator[dict[str, Any]]:
+    """Như iter_result_files nhưng chỉ yield item."""
+    for _, item in iter_result_files(files, dedupe):
+        yield item
+
 
 def convert_paths(obj):
     if isinstance(obj, Path):
@@ -114,6 +135,30 @@ def convert_paths(obj):
     return obj
 
 
+_RE_NUMBER = re.compile(r'(\d+(?:\.\d+)?)')
+_RE_THOUSANDS = re.compile(r'\d+\.\d{3}\b')
+_RE_INT = re.compile(r'(\d+)')
+# Số đếm bằng chữ (thứ tự giữ nguyên: "ba" được thử trước "bảy"/"bay")
+_WORD_NUMBERS = {
+    "một": 1,
+    "mot": 1,
+    "hai": 2,
+    "ba": 3,
+    "bốn": 4,
+    "bon": 4,
+    "năm": 5,
+    "nam": 5,
+    "sáu": 6,
+    "sau": 6,
+    "bảy": 7,
+    "bay": 7,
+    "tám": 8,
+    "tam": 8,
+    "chín": 9,
+    "chin": 9
+}
+
+
 def _parse_number_from_text(text: str) -> float | None:
     """Parse số từ text (ví dụ: '100 m²' -> 100.0, '5 tỷ' -> 5000000000)."""
     if not text or not isinstance(text, str):
@@ -123,7 +168,7 @@ def _parse_number_from_text(text: str) -> float | None:
     text_clean = text.replace(",", ".")
 
     # Tìm số
-    match = re.search(r'(\d+(?:\.\d+)?)', text_clean)
+    match = _RE_NUMBER.search(text_clean)
     if not match:
         return None
     
@@ -145,14 +190,14 @@ def _extract_area_number(area_text: str) -> float | None:
     text = str(area_text).strip()
 
     # Trường hợp có dấu chấm phân tách nghìn (ví dụ VN)
-    if re.search(r'\d+\.\d{3}\b', text):  # match kiểu 8.800 hoặc 12.500, 120.000
+    if _RE_THOUSANDS.search(text):  # match kiểu 8.800 hoặc 12.500, 120.000
         clean = text.replace('.', '').replace(',', '.')
-        match = re.search(r'(\d+(?:\.\d+)?)', clean)
+        match = _RE_NUMBER.search(clean)
         return float(match.group(1)) if match else None
 
     # Trường hợp số thập phân: 8.8 hoặc 8,8
     text = text.replace(',', '.')
-    match = re.search(r'(\d+(?:\.\d+)?)', text)
+    match = _RE_NUMBER.search(text)
     return float(match.group(1)) if match else None
 
 
@@ -164,29 +209,11 @@ def _extract_bedroom_bathroom_floor(specs: dict, config: dict) -> tuple[int | No
         if text is None:
             return None
         value_str = str(text)
-        match = re.search(r'(\d+)', value_str)
+        match = _RE_INT.search(value_str)
         if match:
             return int(match.group(1))
         value_lower = value_str.lower()
-        word_map = {
-            "một": 1,
-            "mot": 1,
-            "hai": 2,
-            "ba": 3,
-            "bốn": 4,
-            "bon": 4,
-            "năm": 5,
-            "nam": 5,
-            "sáu": 6,
-            "sau": 6,
-            "bảy": 7,
-            "bay": 7,
-            "tám": 8,
-            "tam": 8,
-            "chín": 9,
-            "chin": 9
-        }
-        for word, num in word_map.items():
+        for word, num in _WORD_NUMBERS.items():
             if word in value_lower:
                 return num
         return None
@@ -228,6 +255,147 @@ def _determine_sale_type(href: str) -> str:
     return "sell"
 
 
+def _resolve_location_text(
+    location: str,
+    get_mapping: Callable[..., Any] | None = None,
+    find_ward_key_loose: Callable[..., Any] | None = None,
+) -> tuple[Any, Any, Any]:
+    """Parse chuỗi location ("Đường, Phường/Xã, Quận/Huyện, Tỉnh/Thành phố") → (province_id, district_id, ward_id).
+
+    get_mapping / find_ward_key_loose mặc định là hàm của module mapping (batch truyền bản có memo).
+    """
+    from . import mapping
+
+    get_mapping = get_mapping or mapping.get_mapping
+    find_ward_key_loose = find_ward_key_loose or mapping.find_ward_key_loose
+
+    province_id = None
+    district_id = None
+    ward_id = None
+    province_name = ""
+    district_name = ""  
+    if location:
+        location_parts = [part.strip() for part in location.split(",") if part.strip()]
+        # Thường format: "Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
+        # Hoặc: "Đường, Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
+        
+        # Tìm từ cuối lên (tỉnh/thành phố thường ở cuối)
+    for part in reversed(location_parts):
+        part_clean = part.strip()
+        if not province_id:
+            province_id = get_mapping("province_id", part_clean)
+            if province_id is not None:  # Chỉ lưu nếu thành công
+                province_name = part_clean
+        if not district_id:
+            district_id = find_ward_key_loose("district_mapping.json", name = location_parts[-2], province_id=province_id)
+
+                
+        # 3) Ward detection – ALWAYS TRY WARD BEFORE DISTRICT IF MATCH EXISTS
+
+            # context filter (province + district if known)
+    if not ward_id and district_id and province_id:
+        ward_id = int(find_ward_key_loose("ward_mapping.json",name = location_parts[-3], province_id=province_id, district_id=district_id))
+    return province_id, district_id, ward_id
+
+
+def _coerce_geo_ids(geo_ids: dict[str, Any]) -> tuple[Any, Any, Any]:
+    """Đưa id từ ranh giới về đúng kiểu của nhánh text: province int, district str (key JSON), ward int."""
+    def _as_int(value):
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    district_id = geo_ids.get("district_id")
+    return (
+        _as_int(geo_ids.get("province_id")),
+        str(district_id) if district_id is not None else None,
+        _as_int(geo_ids.get("ward_id")),
+    )
+
+
+def _resolve_real_estate_type_id(href: str, title: str, get_mapping: Callable[[str, str], Any]) -> Any:
+    """real_estate_type_id theo slug trong URL, không có thì theo từ khóa trong title."""
+    real_estate_type_id = None
+    href_lower = href.lower() if href else ""
+    title_lower = title.lower() if title else ""
+    
+    # Tìm trong URL trước
+    for key in ["nha-mat-pho-mat-tien", "nha-ngo-hem", "nha-biet-thu", "nha-pho-lien-ke", "nha-vuon", 
+                "nha-thanh-ly", "nha-o-xa-hoi", "can-ho-chung-cu", "can-ho-duplex", "can-ho-penthouse", "can-ho-tap-the-cu-xa", 'dat-nen-dat-tho-cu',
+                "dat-nen-du-an", "dat-nong-nghiep", "dat-cong-nghiep", "dat-thuong-mai-dich-vu", "dat-thanh-ly",
+                "condotel", "homestay", "farmstay", "khach-san", "resort", "van-phong", "shophouse",
+                "kho-nha-xuong","phong-tro", "mat-bang-kinh-doanh"
+                ]:
+        if key in href_lower:
+            # Map từ slug
+            real_estate_type_id = get_mapping("real_estate_type_id", key)
+            if real_estate_type_id:
+                break
+    
+    # Nếu không tìm thấy trong URL, tìm trong title
+    if not real_estate_type_id:
+        for key in ["chung cư", "căn hộ", "nhà riêng", "biệt thự", "nhà mặt phố",
+                    "shophouse", "đất", "condotel", "kho", "nhà xưởng", "trang trại"]:
+            if key in title_lower:
+                real_estate_type_id = get_mapping("real_estate_type_id", key)
+                if real_estate_type_id:
+                    break
+    return real_estate_type_id
+
+
+def _resolve_demand_id(sale_type: str, get_mapping: Callable[[str, str], Any]) -> Any:
+    demand_id = get_mapping("demand_id", sale_type)
+    if not demand_id:
+        # Mặc định: 1 = bán, 2 = cho thuê
+        demand_id = 1 if sale_type == "sell" else 2
+    return demand_id
+
+
+def _resolve_admin_ids(
+    lat_long: str | None,
+    location: str,
+    resolve_text: Callable[[str], tuple[Any, Any, Any]] = _resolve_location_text,
+) -> tuple[Any, Any, Any]:
+    """
+    province_id, district_id, ward_id: ưu tiên tọa độ (ranh giới offline), không có thì parse location.
+    Tọa độ chỉ ra tới tỉnh / quận (khe hở trong ward.geojson, điểm nằm trên ranh giới, chỉ có province.geojson)
+    thì cấp còn thiếu lấy từ parse location, xem _fill_missing_levels.
+    """
+    geo_ids = geo.resolve_ids(lat_long)
+    if not geo_ids or geo_ids.get("province_id") is None:
+        return resolve_text(location)
+    ids = _coerce_geo_ids(geo_ids)
+    if (ids[1] is None or ids[2] is None) and location:
+        ids, _ = _fill_missing_levels(ids, resolve_text(location))
+    return ids
+
+
+def _fill_missing_levels(geo_ids: tuple[Any, Any, Any], text_ids) -> tuple[tuple[Any, Any, Any], bool]:
+    """
+    Điền district / ward còn None của kết quả geo từ kết quả parse text, chỉ khi text cùng tỉnh (và cùng quận
+    nếu geo đã có quận). Trả về (ids, có điền thêm cấp nào không).
+    """
+    province_id, district_id, ward_id = geo_ids
+    if not text_ids or text_ids[0] is None or str(text_ids[0]) != str(province_id):
+        return geo_ids, False
+    filled = False
+    if district_id is None and text_ids[1] is not None:
+        district_id = text_ids[1]
+        filled = True
+    if ward_id is None and text_ids[2] is not None and str(district_id) == str(text_ids[1]):
+        ward_id = text_ids[2]
+        filled = True
+    return (province_id, district_id, ward_id), filled
+
+
+def _is_transformed(item: dict[str, Any]) -> bool:
+    # Format mới có: real_estate_type_id, real_estate_code, sale_type, etc.
+    # Format cũ có: pid, href ở root level
+    return "real_estate_code" in item and "real_estate_type_id" in item
+
+
+@profiling.hot
 def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     """
     Transform item từ format hiện tại sang format example.json.
@@ -236,14 +404,27 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     Nếu item đã ở format mới (có real_estate_code và không có pid ở root), 
     trả về item đó mà không transform lại.
     """
-    # Kiểm tra xem item đã ở format mới chưa
-    # Format mới có: real_estate_type_id, real_estate_code, sale_type, etc.
-    # Format cũ có: pid, href ở root level
-    if "real_estate_code" in item and "real_estate_type_id" in item:
+    if _is_transformed(item):
         # Item đã ở format mới, không cần transform lại
         return item
-    
-    from .mapping import get_mapping,find_ward_key_loose
+    return _transform_item(
+        item,
+        _extract_area_number(item.get("area", "")),
+        _parse_number_from_text(item.get("price", "")),
+        _resolve_admin_ids,
+    )
+
+
+def _transform_item(
+    item: dict[str, Any],
+    area_number: float | None,
+    price_number: float | None,
+    resolve_admin_ids: Callable[[str | None, str], tuple[Any, Any, Any]],
+    get_mapping: Callable[[str, str], Any] | None = None,
+) -> dict[str, Any]:
+    """Phần thân của transform_to_example_format; số đã parse và các hàm tra mapping được truyền vào."""
+    if get_mapping is None:
+        from .mapping import get_mapping
     
     specs = item.get("specs", {})
     config = item.get("config", {})
@@ -252,8 +433,6 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     location = item.get("location", "")
     
     # Extract các giá trị
-    area_number = _extract_area_number(item.get("area", ""))
-    price_number = _parse_number_from_text(item.get("price", ""))
     bedroom, bathroom, floor = _extract_bedroom_bathroom_floor(specs, config)
     
     # lat_long sẽ là map_coords (format "lat,lng")
@@ -300,66 +479,13 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     #     other_info["config"] = config
     
     # Map real_estate_type_id từ URL hoặc title
-    real_estate_type_id = None
-    href_lower = href.lower() if href else ""
-    title_lower = title.lower() if title else ""
-    
-    # Tìm trong URL trước
-    for key in ["nha-mat-pho-mat-tien", "nha-ngo-hem", "nha-biet-thu", "nha-pho-lien-ke", "nha-vuon", 
-                "nha-thanh-ly", "nha-o-xa-hoi", "can-ho-chung-cu", "can-ho-duplex", "can-ho-penthouse", "can-ho-tap-the-cu-xa", 'dat-nen-dat-tho-cu',
-                "dat-nen-du-an", "dat-nong-nghiep", "dat-cong-nghiep", "dat-thuong-mai-dich-vu", "dat-thanh-ly",
-                "condotel", "homestay", "farmstay", "khach-san", "resort", "van-phong", "shophouse",
-                "kho-nha-xuong","phong-tro", "mat-bang-kinh-doanh"
-                ]:
-        if key in href_lower:
-            # Map từ slug
-            real_estate_type_id = get_mapping("real_estate_type_id", key)
-            if real_estate_type_id:
-                break
-    
-    # Nếu không tìm thấy trong URL, tìm trong title
-    if not real_estate_type_id:
-        for key in ["chung cư", "căn hộ", "nhà riêng", "biệt thự", "nhà mặt phố",
-                    "shophouse", "đất", "condotel", "kho", "nhà xưởng", "trang trại"]:
-            if key in title_lower:
-                real_estate_type_id = get_mapping("real_estate_type_id", key)
-                if real_estate_type_id:
-                    break
+    real_estate_type_id = _resolve_real_estate_type_id(href, title, get_mapping)
     
     # Map demand_id từ sale_type
     sale_type = _determine_sale_type(href)
-    demand_id = get_mapping("demand_id", sale_type)
-    if not demand_id:
-        # Mặc định: 1 = bán, 2 = cho thuê
-        demand_id = 1 if sale_type == "sell" else 2
+    demand_id = _resolve_demand_id(sale_type, get_mapping)
     
-    # Parse location để lấy province_id, district_id, ward_id
-    province_id = None
-    district_id = None
-    ward_id = None
-    province_name = ""
-    district_name = ""  
-    if location:
-        location_parts = [part.strip() for part in location.split(",") if part.strip()]
-        # Thường format: "Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
-        # Hoặc: "Đường, Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
-        
-        # Tìm từ cuối lên (tỉnh/thành phố thường ở cuối)
-    for part in reversed(location_parts):
-        part_clean = part.strip()
-        if not province_id:
-            province_id = get_mapping("province_id", part_clean)
-            if province_id is not None:  # Chỉ lưu nếu thành công
-                province_name = part_clean
-        if not district_id:
-            district_id = find_ward_key_loose("district_mapping.json", name = location_parts[-2], province_id=province_id)
-
-                
-        # 3) Ward detection – ALWAYS TRY WARD BEFORE DISTRICT IF MATCH EXISTS
-
-            # context filter (province + district if known)
-    if not ward_id and district_id and province_id:
-        ward_id = int(find_ward_key_loose("ward_mapping.json",name = location_parts[-3], province_id=province_id, district_id=district_id))
+    province_id, district_id, ward_id = resolve_admin_ids(lat_long, location)
 
     
     # Map các infomation_* từ specs và config
@@ -491,6 +617,116 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     return cleaned_output
 
 
+def _parse_column(parse: Callable[[Any], Any], values: list[Any], memo: dict) -> list[Any]:
+    """Parse một cột giá trị, mỗi chuỗi khác nhau chỉ parse một lần (giá / diện tích lặp lại rất nhiều)."""
+    out = []
+    for value in values:
+        try:
+            out.append(memo[value])
+        except KeyError:
+            out.append(memo.setdefault(value, parse(value)))
+        except TypeError:  # giá trị không hash được
+            out.append(parse(value))
+    return out
+
+
+def _remap_item(
+    item: dict[str, Any],
+    resolve_admin_ids: Callable[[str | None, str], tuple[Any, Any, Any]],
+    get_mapping: Callable[[str, str], Any],
+) -> dict[str, Any]:
+    """Item đã ở format mới: tính lại các id lấy từ mapping (loại BĐS, demand, tỉnh/quận/phường).
+
+    specs/config gốc không còn trong file đã export nên các trường infomation_* / land_info_* được giữ nguyên.
+    """
+    other_info = item.get("other_info") if isinstance(item.get("other_info"), dict) else {}
+    href = other_info.get("href", "")
+    sale_type = _determine_sale_type(href)
+
+    out = dict(item)
+    out["real_estate_type_id"] = _resolve_real_estate_type_id(href, item.get("title", ""), get_mapping)
+    out["sale_type"] = sale_type
+    out["demand_id"] = _resolve_demand_id(sale_type, get_mapping)
+    out["province_id"], out["district_id"], out["ward_id"] = resolve_admin_ids(
+        item.get("lat_long"), item.get("address_detail", "")
+    )
+    return out
+
+
+def iter_transform(
+    items: Iterable[dict[str, Any]],
+    chunk_size: int = 1000,
+    remap: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """
+    Transform theo lô một list / stream item, kết quả giống hệt transform_to_example_format từng item.
+    Với remap=True, item đã ở format mới cũng được tính lại các id mapping (xem _remap_item) thay vì giữ nguyên.
+
+    Trong mỗi chunk, giá và diện tích được parse theo cột; giá trị trùng (giữa các chunk) chỉ parse một
+    lần; mỗi chuỗi location khác nhau chỉ resolve một lần và các lần tra tỉnh / quận / phường trùng tham số
+    (cùng phường, khác tên đường) dùng lại kết quả. Tra theo tọa độ vẫn chạy từng item.
+    """
+    from . import mapping
+
+    area_memo: dict = {}
+    price_memo: dict = {}
+    location_memo: dict = {}
+    lookup_memo: dict = {}
+
+    def get_mapping(sheet_name, value):
+        key = ("sheet", sheet_name, value)
+        if key not in lookup_memo:
+            lookup_memo[key] = mapping.get_mapping(sheet_name, value)
+        return lookup_memo[key]
+
+    def find_ward_key_loose(json_file="", name="", province_id=None, district_id=None):
+        key = (json_file, name, province_id, district_id)
+        if key not in lookup_memo:
+            lookup_memo[key] = mapping.find_ward_key_loose(
+                json_file, name=name, province_id=province_id, district_id=district_id
+            )
+        return lookup_memo[key]
+
+    def resolve_text(location):
+        if location not in location_memo:
+            location_memo[location] = _resolve_location_text(location, get_mapping, find_ward_key_loose)
+        return location_memo[location]
+
+    def resolve_admin_ids(lat_long, location):
+        return _resolve_admin_ids(lat_long, location, resolve_text)
+
+    chunk: list[dict[str, Any]] = []
+
+    def flush() -> list[dict[str, Any]]:
+        # Đo / profile cả lô (parse cột + tra mapping) thay vì từng lần tra mapping: wrapper trên hàm tra cứu tốn
+        # nhiều hơn chính lần tra khi memo đã có
+        with metrics.timer("scraper_transform_seconds"), profiling.hot_section():
+            raw = [item for item in chunk if not _is_transformed(item)]
+            areas = iter(_parse_column(_extract_area_number, [item.get("area", "") for item in raw], area_memo))
+            prices = iter(_parse_column(_parse_number_from_text, [item.get("price", "") for item in raw], price_memo))
+            out = []
+            for item in chunk:
+                if _is_transformed(item):
+                    out.append(_remap_item(item, resolve_admin_ids, get_mapping) if remap else item)
+                else:
+                    out.append(_transform_item(item, next(areas), next(prices), resolve_admin_ids, get_mapping))
+            return out
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
+
+
+@profiling.hot
+def transform_batch(items: Iterable[dict[str, Any]], chunk_size: int = 1000) -> list[dict[str, Any]]:
+    """list(iter_transform(items)) — dùng cho backfill / re-export nhiều item một lúc."""
+    return list(iter_transform(items, chunk_size))
+
+
 # def download_image(url: str, base_folder=config.OUTPUT_DIR_IMAGES) -> str:
 #     # Parse URL -> lấy path không có domain
 #     parsed = urlparse(url)
@@ -517,41 +753,29 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
 #     return str(rel_path)
 
 
+def _dedupe_results(results: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Bỏ trùng theo pid/href (format cũ) hoặc real_estate_code/other_info (format mới), item sau thắng."""
+    unique: dict[str, dict[str, Any]] = {}
+    for item in results:
+        # fallback to object id to avoid overwriting
+        key = result_key(item) or f"tmp-{id(item)}"
+        unique[key] = item
+
+    return list(unique.values())
+
+
+@metrics.timed("scraper_save_results_seconds")
+@profiling.hot
 def save_results(
     results: list[dict[str, Any]],
     results_file: str,
     scraped_pids: set[str],
     scraped_hrefs: set[str],
 ) -> None:
-    unique: dict[str, dict[str, Any]] = {}
-    for item in results:
-        # Hỗ trợ cả format cũ và format mới để tạo key unique
-        key = None
-        
-        # Format cũ: pid hoặc href ở root level
-        if "pid" in item:
-            key = item.get("pid")
-        elif "href" in item:
-            key = item.get("href")
-        
-        # Format mới: real_estate_code hoặc href trong other_info
-        if not key:
-            key = item.get("real_estate_code")
-        if not key:
-            other_info = item.get("other_info", {})
-            if isinstance(other_info, dict):
-                key = other_info.get("href") or other_info.get("pid")
-        
-        if not key:
-            # fallback to object id to avoid overwriting
-            key = f"tmp-{id(item)}"
-        
-        unique[str(key)] = item
-
-    final = list(unique.values())
+    final = _dedupe_results(results)
     
     # Transform sang format example.json
-    transformed_data = [transform_to_example_format(item) for item in final]
+    transformed_data = transform_batch(final)
     
     # # Tải ảnh về local
     # for item in transformed_data:
@@ -561,12 +785,12 @@ def save_results(
                 # item['images_local_paths'].append(download_image(img))
                                 
                 
-    # Wrap trong object với key "data"
-    output = {"data": transformed_data}
-    
-    with open(results_file, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    # Wrap trong object với key "data"; ghi ra file tạm rồi rename để crash giữa chừng không làm hỏng file
+    serializer.write_results(results_file, transformed_data)
 
     _update_sets_from_items(final, scraped_pids, scraped_hrefs)
     print(f"Saved {len(final)} items to {results_file}")
+    parquet_export.export_results(transformed_data, results_file)
+    results_db.store_results(final, transformed_data, results_file)
+    profiling.memory_snapshot(f"save-{len(final)}")
 
@@ -0,0 +1,176 @@
+"""Tracing nhẹ theo span cho từng trang / từng item của một lần chạy.
+
+Span được ghi ra file JSONL gọn (mỗi dòng một span đã kết thúc) trong lúc chạy:
+
+    {"id": 12, "n": "navigate", "p": 3, "ts": 1532000, "d": 2410000, "t": 140213, "a": {"pid": "4123"}}
+
+ts/d tính bằng micro giây kể từ lúc bắt đầu trace. Dùng `to_chrome_trace` (hoặc
+`python -m scraper.tracing trace.jsonl`) để đổi sang Chrome trace-event format và mở bằng
+chrome://tracing hoặc Perfetto.
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+_lock = threading.Lock()
+_fh = None
+_path: Optional[str] = None
+_t0 = 0.0
+_ids = itertools.count(1)
+_current: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def trace_path_for(results_file) -> Path:
+    path = Path(results_file)
+    return path.with_name(f"{path.stem}.trace.jsonl")
+
+
+def start_trace(path) -> str:
+    """Bắt đầu ghi trace vào `path` (ghi nối tiếp nếu file đã có)."""
+    global _fh, _path, _t0
+    stop_trace()
+    path = str(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _lock:
+        _fh = open(path, "a", encoding="utf-8")
+        _path = path
+        _t0 = time.perf_counter()
+        # Dòng meta: thời điểm bắt đầu để ghép nhiều lần chạy trong cùng một file
+        _fh.write(json.dumps({"meta": "start", "epoch": time.time(), "pid": os.getpid()}) + "\n")
+    print(f"[Trace] Ghi trace vào {path}")
+    return path
+
+
+def stop_trace() -> Optional[str]:
+    global _fh, _path
+    with _lock:
+        path = _path
+        if _fh is not None:
+            _fh.close()
+        _fh = None
+        _path = None
+    return path
+
+
+def is_enabled() -> bool:
+    return _fh is not None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Span lồng nhau theo context hiện tại. Yield dict attrs để bổ sung thuộc tính trong lúc chạy.
+    Khi trace chưa bật thì gần như không tốn chi phí.
+    """
+    if _fh is None:
+        yield attrs
+        return
+
+    span_id = next(_ids)
+    parent = _current.get()
+    token = _current.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _current.reset(token)
+        record = {
+            "id": span_id,
+            "n": name,
+            "ts": int((start - _t0) * 1_000_000),
+            "d": int((end - start) * 1_000_000),
+            "t": threading.get_ident(),
+        }
+        if parent is not None:
+            record["p"] = parent
+        if attrs:
+            record["a"] = attrs
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _lock:
+            if _fh is not None:
+                _fh.write(line + "\n")
+
+
+def traced(name: str, **attrs) -> Callable:
+    """Decorator tương đương `span` cho cả hàm."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Chrome trace-event
+# ---------------------------------------------------------------------------
+
+def to_chrome_trace(trace_file, out_file=None) -> str:
+    """
+    Chuyển file JSONL sang Chrome trace-event format (complete events "X").
+    Mỗi lần chạy (dòng meta "start") là một pid riêng trong timeline.
+    """
+    out_file = str(out_file or Path(trace_file).with_suffix(".chrome.json"))
+    events: list[dict[str, Any]] = []
+    run_idx = 0
+    tids: dict[int, int] = {}
+
+    with open(trace_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+
+            if rec.get("meta") == "start":
+                run_idx += 1
+                events.append({
+                    "name": "process_name", "ph": "M", "pid": run_idx, "tid": 0,
+                    "args": {"name": f"run {run_idx} (pid {rec.get('pid')})"},
+                })
+                continue
+
+            tid = tids.setdefault(rec.get("t", 0), len(tids) + 1)
+            args = dict(rec.get("a") or {})
+            args["span_id"] = rec["id"]
+            if rec.get("p"):
+                args["parent_id"] = rec["p"]
+            events.append({
+                "name": rec["n"],
+                "cat": rec["n"].split(".", 1)[0],
+                "ph": "X",
+                "ts": rec["ts"],
+                "dur": rec["d"],
+                "pid": max(run_idx, 1),
+                "tid": tid,
+                "args": args,
+            })
+
+    with open(out_file, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return out_file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m scraper.tracing <trace.jsonl> [out.json]")
+        sys.exit(1)
+    print(to_chrome_trace(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
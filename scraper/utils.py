@@ -1,15 +1,20 @@
+import re
 import time
 from random import uniform   
-from datetime import datetime
+from datetime import datetime, timedelta
 import unicodedata
 
+from . import config, metrics
+
 def normalize_text(text):
     text = unicodedata.normalize('NFD', text)
     text = text.encode('ascii', 'ignore').decode('utf-8')
     return text.lower().strip()
 
 def human_sleep(a: float = 3, b: float = 8):
-    time.sleep(uniform(a, b))
+    seconds = uniform(a, b) * config.SLEEP_SCALE
+    time.sleep(seconds)
+    metrics.inc("scraper_sleep_seconds_total", seconds, kind="human")
 
 def decimal_to_dms(value):
     """Convert decimal degrees → DMS (độ–phút–giây)."""
@@ -56,4 +61,63 @@ def normalize_date(date_str):
         pass
 
     return None
-    
\ No newline at end of file
+
+
+_RE_RELATIVE_DATE = re.compile(r'(\d+)\s*(phút|giờ|ngày|tuần|tháng)\s*trước')
+_RE_DMY = re.compile(r'\b(\d{1,2}/\d{1,2}/\d{4})\b')
+
+
+def parse_card_date(text, today=None):
+    """
+    Parse ngày đăng hiển thị trên card của trang list.
+    Hỗ trợ:
+        - DD/MM/YYYY (thường nằm trong aria-label/tooltip)
+        - "Đăng hôm nay", "Đăng hôm qua"
+        - "Đăng 5 phút/giờ/ngày/tuần/tháng trước"
+    Trả về date hoặc None nếu không nhận dạng được.
+    """
+    if not text:
+        return None
+    today = today or datetime.today().date()
+    text_lower = str(text).strip().lower()
+
+    m = _RE_DMY.search(text_lower)
+    if m:
+        return normalize_date(m.group(1))
+
+    if "hôm nay" in text_lower:
+        return today
+    if "hôm qua" in text_lower:
+        return today - timedelta(days=1)
+
+    m = _RE_RELATIVE_DATE.search(text_lower)
+    if m:
+        n = int(m.group(1))
+        unit = m.group(2)
+        if unit in ("phút", "giờ"):
+            # Có thể lệch 1 ngày quanh nửa đêm, chấp nhận để không bỏ sót item
+            return today
+        # Với tuần/tháng lấy ngày mới nhất có thể để không loại nhầm item ở biên
+        if unit == "ngày":
+            return today - timedelta(days=n)
+        if unit == "tuần":
+            return today - timedelta(weeks=n)
+        if unit == "tháng":
+            return today - timedelta(days=28 * n)
+
+    return None
+
+
+def parse_date_bounds(filters):
+    """
+    Parse posted_date_from/posted_date_to của filters đúng một lần.
+    posted_date_to mặc định là hôm nay khi chỉ có posted_date_from.
+    Trả về (date_from, date_to), cả hai là None nếu không filter theo ngày.
+    """
+    if not filters:
+        return None, None
+    date_from = normalize_date(filters.get("posted_date_from"))
+    date_to = normalize_date(filters.get("posted_date_to"))
+    if date_from and not date_to:
+        date_to = datetime.today().date()
+    return date_from, date_to